@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark mô hình chạy song song của Scraper/Checker (process / thread / async)
+với một HTTP server giả lập chạy local: mỗi request chờ --latency ms rồi trả về
+JSON giống player response. Đo số video/giây, không cần mạng.
+
+Ví dụ:
+    python bench_concurrency.py --videos 300 --latency 200 --workers 4 32 64
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+current_dir = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(current_dir, 'core'))
+
+from ScraperChecker import EXEC_MODES, Utils, _run_tasks  # noqa: E402
+
+
+class _BenchServer(ThreadingHTTPServer):
+    # Mặc định listen backlog là 5: nhiều worker kết nối cùng lúc sẽ bị
+    # SYN retry (~1 giây) và kết quả đo lệch theo số worker
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def _make_handler(latency: float, payload_kb: int):
+    filler = "x" * (payload_kb * 1024)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            vid = self.path.rsplit("=", 1)[-1]
+            body = json.dumps({
+                "videoDetails": {"videoId": vid, "title": f"Video {vid}",
+                                 "lengthSeconds": "215", "viewCount": "12345",
+                                 "shortDescription": filler},
+                "playabilityStatus": {"status": "OK"},
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def _bench_fetch(base_url: str, vid: str) -> dict:
+    """Worker giả lập: một request HTTP + parse JSON, trả về dòng kiểu checker.
+    Không dùng yt-dlp (worker thread không tạo YoutubeDL nào); mode process vẫn
+    tính cả thời gian khởi động process con."""
+    with urllib.request.urlopen(f"{base_url}/watch?v={vid}", timeout=30) as resp:
+        data = json.loads(resp.read().decode("utf-8"))
+    details = data.get("videoDetails", {})
+    return {"ID Video": vid, "Tên Video": details.get("title"),
+            "Thời Lượng": Utils.format_duration(details.get("lengthSeconds")),
+            "Lượt View": int(details.get("viewCount", 0))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark process/thread/async cho Checker")
+    parser.add_argument("--videos", type=int, default=200, help="Số video mỗi lượt")
+    parser.add_argument("--latency", type=int, default=200, help="Độ trễ giả lập mỗi request (ms)")
+    parser.add_argument("--payload_kb", type=int, default=64, help="Kích thước response (KB)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 32], help="Các mức concurrency")
+    parser.add_argument("--modes", nargs="+", default=list(EXEC_MODES), choices=EXEC_MODES)
+    args = parser.parse_args()
+
+    server = _BenchServer(("127.0.0.1", 0), _make_handler(args.latency / 1000, args.payload_kb))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    items = [(base_url, f"vid{i:08d}") for i in range(args.videos)]
+
+    print(f"{args.videos} video, độ trễ {args.latency} ms, response {args.payload_kb} KB")
+    print(f"{'mode':<8} {'workers':>7} {'giây':>8} {'video/giây':>11}")
+    try:
+        for mode in args.modes:
+            for workers in args.workers:
+                results = []
+                t0 = time.perf_counter()
+                _run_tasks(_bench_fetch, items, results.append, mode, workers)
+                elapsed = time.perf_counter() - t0
+                assert len(results) == len(items)
+                print(f"{mode:<8} {workers:>7} {elapsed:>8.2f} {len(results) / elapsed:>11.1f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Kiểm tra daemon `cli_wrapper.py --serve`: chạy nhiều job liên tiếp trong cùng
+một process và xem tài nguyên của từng job có được trả lại không.
+
+- Checker với file ID không hợp lệ (không cần mạng) xen kẽ Scraper --incremental
+  (mở ChannelState; không có mạng thì job kết thúc sớm, vẫn đủ vòng đời)
+- Sau job đầu (khởi tạo cache, limiter...), số thread và file descriptor của
+  daemon không được tăng theo số job (file descriptor chỉ đo được qua /proc)
+- Job có -h/--help bị từ chối, không in usage vào luồng sự kiện
+
+Ví dụ:
+    python check_serve.py --jobs 10
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+class _Daemon:
+    def __init__(self, env: dict):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(current_dir, "cli_wrapper.py"), "--serve"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding="utf-8", env=env)
+        self.expect(lambda e: e.get("type") == "ready")
+
+    def send(self, command: dict):
+        self.process.stdin.write(json.dumps(command) + "\n")
+        self.process.stdin.flush()
+
+    def expect(self, match, events=None) -> dict:
+        """Đọc stdout tới sự kiện match(event); dòng nào không phải JSON là lỗi."""
+        for line in self.process.stdout:
+            event = json.loads(line)  # ValueError: có dòng lạ trong luồng sự kiện
+            if events is not None:
+                events.append(event)
+            if match(event):
+                return event
+        raise RuntimeError("Daemon đã thoát")
+
+    def run(self, job: str, argv: list) -> list:
+        events = []
+        self.send({"cmd": "run", "job": job, "argv": argv})
+        self.expect(lambda e: e.get("type") == "end" and e.get("job") == job, events)
+        return events
+
+    def usage(self) -> tuple:
+        """(số thread, số file descriptor hoặc None) của daemon lúc rảnh."""
+        time.sleep(0.5)  # thread của pool vừa shutdown kịp thoát
+        self.send({"cmd": "ping"})
+        threads = self.expect(lambda e: e.get("type") == "pong").get("threads")
+        fd_dir = f"/proc/{self.process.pid}/fd"
+        return threads, len(os.listdir(fd_dir)) if os.path.isdir(fd_dir) else None
+
+    def close(self):
+        try:
+            self.send({"cmd": "exit"})
+            self.process.stdin.close()
+            self.process.wait(timeout=10)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            self.process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kiểm tra nhiều job liên tiếp trên daemon --serve")
+    parser.add_argument("--jobs", type=int, default=6, help="Số job chạy liên tiếp")
+    parser.add_argument("--channel", default="@aio_check_serve", help="Kênh cho job Scraper")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="aio_check_serve_")
+    input_path = os.path.join(work, "ids.csv")
+    with open(input_path, "w", encoding="utf-8") as fh:
+        fh.write("ID Video\n" + "".join(f"khong-hop-le-{i}\n" for i in range(50)))
+    env = dict(os.environ, AIO_CACHE_DIR=os.path.join(work, "cache"))
+    jobs = {
+        "checker": ["--operation", "checker", "--file_path", input_path, "--mode", "thread"],
+        "scraper": ["--operation", "scraper", "--channel", args.channel, "--incremental",
+                    "--limit", "5", "--mode", "thread", "--output_dir", work],
+    }
+
+    daemon = _Daemon(env)
+    failures = []
+    try:
+        events = daemon.run("help", ["--operation", "checker", "--help"])
+        if events[-1].get("code") != 2:
+            failures.append("--help không bị từ chối")
+
+        baseline = None
+        for n in range(args.jobs):
+            kind = ("checker", "scraper")[n % 2]
+            t0 = time.perf_counter()
+            end = daemon.run(f"{kind}-{n}", jobs[kind])[-1]
+            threads, fds = daemon.usage()
+            print(f"job {n + 1:>2} {kind:<8} code={end.get('code')} "
+                  f"{time.perf_counter() - t0:6.2f}s  threads={threads} fds={fds}")
+            if end.get("code") != 0 or end.get("stopped"):
+                failures.append(f"job {n + 1} ({kind}) kết thúc với {end}")
+            # Một vòng checker + scraper để khởi tạo xong phần dùng chung
+            if n == 1:
+                baseline = (threads, fds)
+        if baseline:
+            threads, fds = daemon.usage()
+            if threads > baseline[0]:
+                failures.append(f"thread tăng từ {baseline[0]} lên {threads}")
+            if fds is not None and fds > baseline[1]:
+                failures.append(f"file descriptor tăng từ {baseline[1]} lên {fds}")
+    finally:
+        daemon.close()
+
+    for msg in failures:
+        print(f"LỖI: {msg}")
+    print("OK" if not failures else f"{len(failures)} lỗi")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
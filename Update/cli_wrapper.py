@@ -3,12 +3,19 @@
 """
 CLI Wrapper for AIO Tool - Subprocess Integration
 Provides command line interface for VCPMC Tool integration
+
+--serve keeps one process alive and runs jobs sent as JSON lines on stdin,
+so yt-dlp/pandas are imported once instead of once per operation.
 """
 
 import argparse
 import sys
 import os
 import json
+import signal
+import threading
+import time
+import uuid
 from pathlib import Path
 
 # Add core to path
@@ -43,27 +50,197 @@ def detail_callback(data: dict):
     print(f"DETAIL:{json.dumps(data)}", flush=True)
 
 
-def main():
-    if not MODULES_AVAILABLE:
-        print("ERROR:Required modules not available", file=sys.stderr)
-        sys.exit(1)
-        
+# Event protocol (--events): one JSON object per line on stdout
+#   {"v": 1, "type": ..., "ts": unix time, "job": run id, ...}
+# types: start {operation, pid} | log {lines} | progress {done, total}
+#        | detail {items: {video id: yt-dlp progress snapshot}} | result {ok, path} | error {message}
+#        --serve only: ready {pid} (job null) | end {code, stopped} after each job
+# log/progress/detail are coalesced and written every SNAPSHOT_INTERVAL seconds.
+#
+# --serve commands (one JSON object per line on stdin):
+#   {"cmd": "run", "job": id, "argv": ["--operation", "checker", ...]}
+#   {"cmd": "stop", "job": id} | {"cmd": "ping"} | {"cmd": "exit"}
+# One job runs at a time; closing stdin stops the running job and exits.
+PROTOCOL_VERSION = 1
+SNAPSHOT_INTERVAL = 0.25
+OPERATIONS = ["scraper", "checker", "downloader", "enricher"]
+
+_stdout_lock = threading.Lock()
+
+
+def write_event(kind: str, job, **fields):
+    """Write one protocol event line to stdout."""
+    event = {"v": PROTOCOL_VERSION, "type": kind, "ts": round(time.time(), 3), "job": job, **fields}
+    line = json.dumps(event, ensure_ascii=False, default=str)
+    with _stdout_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+class LegacyOutput:
+    """PREFIX:payload lines, one per callback (original format)."""
+
+    def progress(self, done: int, total: int):
+        progress_callback(done, total)
+
+    def log(self, message: str, prefix: str = ""):
+        log_callback(message, prefix)
+
+    def detail(self, data: dict):
+        detail_callback(data)
+
+    def success(self, result):
+        print(f"SUCCESS:{result or 'Operation completed'}", flush=True)
+
+    def error(self, message: str):
+        print(f"ERROR:{message}", file=sys.stderr, flush=True)
+
+    def close(self):
+        pass
+
+
+class EventOutput:
+    """Versioned NDJSON events. Callbacks only update in-memory state; a
+    background thread writes the coalesced snapshot every interval, so a
+    download reporting dozens of hooks per second costs a few lines per second."""
+
+    def __init__(self, job: str, operation: str, interval: float = SNAPSHOT_INTERVAL):
+        self.job = job
+        self._lock = threading.Lock()
+        self._logs = []
+        self._progress = None
+        self._items = {}
+        self._items_changed = False
+        self._closed = threading.Event()
+        self._emit("start", operation=operation, pid=os.getpid())
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def _emit(self, kind: str, **fields):
+        write_event(kind, self.job, **fields)
+
+    def progress(self, done: int, total: int):
+        with self._lock:
+            self._progress = (done, total)
+
+    def log(self, message: str, prefix: str = ""):
+        with self._lock:
+            self._logs.append(f"[{prefix}] {message}" if prefix else message)
+
+    def detail(self, data: dict):
+        key = str(data.get("id") or data.get("filename") or "")
+        with self._lock:
+            self._items[key] = data
+            self._items_changed = True
+
+    def flush(self):
+        with self._lock:
+            logs, self._logs = self._logs, []
+            progress, self._progress = self._progress, None
+            items = dict(self._items) if self._items_changed else None
+            self._items_changed = False
+            # Mục đã xong chỉ báo một lần
+            for key, data in list(self._items.items()):
+                if data.get("phase") != "downloading":
+                    del self._items[key]
+        if logs:
+            self._emit("log", lines=logs)
+        if progress:
+            self._emit("progress", done=progress[0], total=progress[1])
+        if items is not None:
+            self._emit("detail", items=items)
+
+    def _run(self, interval: float):
+        while not self._closed.wait(interval):
+            self.flush()
+
+    def success(self, result):
+        self.flush()
+        self._emit("result", ok=True, path=result)
+
+    def error(self, message: str):
+        self.flush()
+        self._emit("error", message=message)
+
+    def close(self):
+        self._closed.set()
+        self.flush()
+
+
+def install_stop_handlers(stop_event: threading.Event, exit_now: bool = False, out=None):
+    """Stop requests from the parent: a "STOP" line on stdin (Windows cannot
+    catch terminate()) or SIGINT/SIGTERM. Operations without stop support
+    (exit_now) quit immediately; their checkpoint journal is already on disk."""
+    out = out or LegacyOutput()
+
+    def _stop():
+        if exit_now:
+            out.log("Stopped")
+            out.close()
+            os._exit(1)
+        stop_event.set()
+
+    for name in ("SIGINT", "SIGTERM", "SIGBREAK"):
+        sig = getattr(signal, name, None)
+        if sig is not None:
+            try:
+                signal.signal(sig, lambda signum, frame: _stop())
+            except (ValueError, OSError):
+                pass
+
+    def _watch_stdin():
+        try:
+            for line in sys.stdin:
+                if line.strip().upper() == "STOP":
+                    _stop()
+                    return
+        except (OSError, ValueError):
+            pass
+
+    if sys.stdin is not None:
+        threading.Thread(target=_watch_stdin, daemon=True).start()
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="AIO YouTube Tool CLI")
-    parser.add_argument("--operation", required=True, 
-                       choices=["scraper", "checker", "downloader", "enricher"],
-                       help="Operation to perform")
+    parser.add_argument("--operation", choices=OPERATIONS,
+                       help="Operation to perform (required unless --serve)")
+    parser.add_argument("--serve", action="store_true",
+                       help="Stay alive and run jobs sent as JSON lines on stdin (implies --events)")
     
     # Common arguments
     parser.add_argument("--output_dir", default="./output", help="Output directory")
+    parser.add_argument("--events", action="store_true",
+                       help=f"Write versioned NDJSON events (protocol v{PROTOCOL_VERSION}) instead of PREFIX: lines")
+    parser.add_argument("--job_id", help="Job id echoed in every event (default: random)")
     
     # Scraper arguments
     parser.add_argument("--channel", help="YouTube channel URL/ID/@handle")
     parser.add_argument("--limit", type=int, default=200, help="Video limit for scraper")
     parser.add_argument("--include_shorts", action="store_true", help="Include YouTube Shorts")
+    parser.add_argument("--listing", choices=["innertube", "ytdlp"], default="innertube",
+                       help="Channel listing backend for scraper (innertube falls back to yt-dlp)")
+    parser.add_argument("--incremental", action="store_true",
+                       help="Only fetch videos newer than the last run and merge into its output")
+    parser.add_argument("--fast", action="store_true",
+                       help="Build scraper rows from channel listing fields (approximate dates)")
     
     # Checker arguments
     parser.add_argument("--file_path", help="Input file path for checker")
     parser.add_argument("--max_workers", type=int, default=4, help="Number of worker threads")
+    parser.add_argument("--mode", choices=["process", "thread", "async"], default="process",
+                       help="Concurrency model for scraper/checker (async runs the yt-dlp workers "
+                            "in a thread pool behind a semaphore, so it performs like thread; "
+                            "process falls back to thread unless AIO_RATE_LIMIT=0)")
+    parser.add_argument("--backend", choices=["ytdlp", "innertube"], default="ytdlp",
+                       help="Checker backend (innertube falls back to yt-dlp on failures)")
+    
+    # Metadata cache (scraper/checker/enricher)
+    parser.add_argument("--no_cache", action="store_true", help="Disable the local video metadata cache")
+    parser.add_argument("--force_refresh", action="store_true", help="Ignore cached entries and refetch")
+    parser.add_argument("--cache_ttl_hours", type=float, help="Max age of cached entries (hours)")
+    parser.add_argument("--resume", action="store_true",
+                       help="Resume an interrupted checker/enricher/downloader run from its checkpoint journal")
     
     # Downloader arguments
     parser.add_argument("--input_value", help="Input for downloader (ID/URL/file)")
@@ -73,81 +250,240 @@ def main():
     parser.add_argument("--cookies_file", help="Cookies file path")
     parser.add_argument("--proxy", help="Proxy URL")
     parser.add_argument("--enable_aria2", action="store_true", help="Enable aria2c")
+    parser.add_argument("--bandwidth", type=float,
+                       help="Total download bandwidth target in MB/s (default: adapt to measured speed)")
+    parser.add_argument("--order", choices=["input", "shortest", "largest"], default="input",
+                       help="Download order (shortest/largest probe duration/size first)")
+    parser.add_argument("--pp_workers", type=int,
+                       help="Concurrent ffmpeg post-processing jobs (default: half the CPU count)")
     parser.add_argument("--use_archive", action="store_true", default=True, help="Use download archive")
     
     # Enricher arguments
     parser.add_argument("--include_transcript", action="store_true", default=True, help="Include transcript")
     parser.add_argument("--out_excel", help="Output Excel file for enricher")
     
-    args = parser.parse_args()
-    
-    try:
-        if args.operation == "scraper":
-            if not args.channel:
-                print("ERROR:Missing channel parameter", file=sys.stderr)
-                sys.exit(1)
-                
-            result = run_scraper(
-                channel_input=args.channel,
-                out_folder=args.output_dir,
-                log_func=log_callback,
-                progress_callback=progress_callback
-            )
+    return parser
+
+
+def run_operation(args, out, stop_event: threading.Event):
+    """Run one operation; returns its result path. Raises on errors."""
+    cache_kwargs = dict(use_cache=not args.no_cache, force_refresh=args.force_refresh,
+                        cache_ttl_hours=args.cache_ttl_hours)
+    if args.operation == "scraper":
+        if not args.channel:
+            raise ValueError("Missing channel parameter")
             
-        elif args.operation == "checker":
-            if not args.file_path:
-                print("ERROR:Missing file_path parameter", file=sys.stderr)
-                sys.exit(1)
-                
-            result = run_checker(
-                fp=args.file_path,
-                max_workers=args.max_workers,
-                progress_callback=progress_callback,
-                log_func=log_callback
-            )
+        return run_scraper(
+            channel_input=args.channel,
+            out_folder=args.output_dir,
+            log_func=out.log,
+            progress_callback=out.progress,
+            stop_event=stop_event,
+            mode=args.mode,
+            max_workers=None if args.mode == "process" else args.max_workers,
+            listing=args.listing,
+            limit=args.limit,
+            incremental=args.incremental,
+            fast=args.fast,
+            **cache_kwargs
+        )
+        
+    elif args.operation == "checker":
+        if not args.file_path:
+            raise ValueError("Missing file_path parameter")
             
-        elif args.operation == "downloader":
-            if not args.input_value:
-                print("ERROR:Missing input_value parameter", file=sys.stderr)
-                sys.exit(1)
-                
-            result = run_downloader(
-                input_value=args.input_value,
-                out_folder=args.output_dir,
-                quality=args.quality,
-                audio_only=args.audio_only,
-                max_workers=args.max_workers,
-                concurrent_frags=args.concurrent_frags,
-                cookies_file=args.cookies_file,
-                proxy=args.proxy,
-                progress_callback=progress_callback,
-                detail_callback=detail_callback,
-                log_func=log_callback,
-                enable_aria2=args.enable_aria2,
-                use_archive=args.use_archive
-            )
+        return run_checker(
+            fp=args.file_path,
+            max_workers=args.max_workers,
+            progress_callback=out.progress,
+            log_func=out.log,
+            stop_event=stop_event,
+            mode=args.mode,
+            backend=args.backend,
+            resume=args.resume,
+            **cache_kwargs
+        )
+        
+    elif args.operation == "downloader":
+        if not args.input_value:
+            raise ValueError("Missing input_value parameter")
             
-        elif args.operation == "enricher":
-            if not args.input_value:
-                print("ERROR:Missing input_value parameter", file=sys.stderr)
-                sys.exit(1)
-                
-            df, result = enrich(
-                input_value=args.input_value,
-                max_workers=args.max_workers,
-                include_transcript=args.include_transcript,
-                out_excel=args.out_excel,
-                progress=progress_callback,
-                log=log_callback
-            )
+        return run_downloader(
+            input_value=args.input_value,
+            out_folder=args.output_dir,
+            quality=args.quality,
+            audio_only=args.audio_only,
+            max_workers=args.max_workers,
+            concurrent_frags=args.concurrent_frags,
+            cookies_file=args.cookies_file,
+            proxy=args.proxy,
+            progress_callback=out.progress,
+            detail_callback=out.detail,
+            log_func=out.log,
+            stop_event=stop_event,
+            enable_aria2=args.enable_aria2,
+            use_archive=args.use_archive,
+            bandwidth_mb=args.bandwidth,
+            postprocess_workers=args.pp_workers,
+            order=args.order,
+            resume=args.resume
+        )
+        
+    elif args.operation == "enricher":
+        if not args.input_value:
+            raise ValueError("Missing input_value parameter")
             
-        if result:
-            print(f"SUCCESS:{result}", flush=True)
+        df, result = enrich(
+            input_value=args.input_value,
+            max_workers=args.max_workers,
+            include_transcript=args.include_transcript,
+            out_excel=args.out_excel,
+            progress=out.progress,
+            log=out.log,
+            resume=args.resume,
+            **cache_kwargs
+        )
+        return result
+    raise ValueError(f"Unknown operation: {args.operation}")
+
+
+def _is_help_flag(arg: str) -> bool:
+    """-h/--help (or an abbreviation argparse would accept) prints usage to stdout."""
+    name = arg.split("=", 1)[0]
+    return name.startswith("-h") or (len(name) > 2 and "--help".startswith(name))
+
+
+def serve(parser: argparse.ArgumentParser):
+    """Long-lived worker: jobs arrive on stdin, events go to stdout. A stopped
+    job recycles the process (abandoned network workers may still be blocked),
+    the client starts a fresh one for the next job."""
+    lock = threading.Lock()
+    running = {}  # job id -> (operation, stop_event)
+
+    def _run_job(job: str, args, stop_event: threading.Event):
+        out = EventOutput(job, args.operation)
+        code = 0
+        try:
+            result = run_operation(args, out, stop_event)
+            out.success(result)
+        except Exception as e:
+            code = 1
+            out.error(str(e))
+        finally:
+            out.close()
+        with lock:
+            running.pop(job, None)
+        write_event("end", job, code=code, stopped=stop_event.is_set())
+        if stop_event.is_set():
+            sys.stderr.flush()
+            os._exit(0)
+
+    def _stop(job=None):
+        with lock:
+            targets = [(j, r) for j, r in running.items() if job in (None, j)]
+        for j, (operation, stop_event) in targets:
+            if operation == "enricher":
+                # No stop support: its checkpoint journal is already on disk
+                write_event("end", j, code=1, stopped=True)
+                os._exit(1)
+            stop_event.set()
+
+    def _shutdown():
+        _stop()
+        with lock:
+            idle = not running
+        if idle:
+            os._exit(0)
+
+    for name in ("SIGINT", "SIGTERM", "SIGBREAK"):
+        sig = getattr(signal, name, None)
+        if sig is not None:
+            try:
+                signal.signal(sig, lambda signum, frame: _shutdown())
+            except (ValueError, OSError):
+                pass
+
+    write_event("ready", None, pid=os.getpid())
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        if line.upper() == "STOP":
+            _stop()
+            continue
+        try:
+            command = json.loads(line)
+        except ValueError:
+            write_event("error", None, message=f"Invalid command: {line[:200]}")
+            continue
+        kind = command.get("cmd")
+        job = str(command.get("job") or uuid.uuid4().hex[:12])
+        if kind == "run":
+            argv = [str(a) for a in command.get("argv") or []]
+            try:
+                # Help would be printed into the event stream; usage errors go to stderr
+                if any(_is_help_flag(a) for a in argv):
+                    raise ValueError("-h/--help is not accepted in job arguments")
+                args = parser.parse_args(argv)
+                if not args.operation:
+                    raise ValueError("missing --operation")
+            except (SystemExit, ValueError) as e:
+                reason = e if isinstance(e, ValueError) else " ".join(argv)
+                write_event("error", job, message=f"Invalid arguments: {reason}")
+                write_event("end", job, code=2, stopped=False)
+                continue
+            stop_event = threading.Event()
+            with lock:
+                busy = bool(running)
+                if not busy:
+                    running[job] = (args.operation, stop_event)
+            if busy:
+                write_event("error", job, message="Worker busy")
+                write_event("end", job, code=1, stopped=False)
+                continue
+            threading.Thread(target=_run_job, args=(job, args, stop_event), daemon=True).start()
+        elif kind == "stop":
+            _stop(command.get("job"))
+        elif kind == "ping":
+            write_event("pong", None, threads=threading.active_count())
+        elif kind == "exit":
+            break
         else:
-            print("SUCCESS:Operation completed", flush=True)
+            write_event("error", None, message=f"Unknown command: {kind}")
+    # stdin closed (client gone) or exit: don't leave a job running unattended
+    _shutdown()
+    while True:
+        time.sleep(1)
+
+
+def main():
+    if not MODULES_AVAILABLE:
+        print("ERROR:Required modules not available", file=sys.stderr)
+        sys.exit(1)
+        
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.serve:
+        serve(parser)
+        return
+    if not args.operation:
+        parser.error("the following arguments are required: --operation")
+    out = EventOutput(args.job_id or uuid.uuid4().hex[:12], args.operation) if args.events else LegacyOutput()
+    stop_event = threading.Event()
+    install_stop_handlers(stop_event, exit_now=args.operation == "enricher", out=out)
+    
+    try:
+        result = run_operation(args, out, stop_event)
+        out.success(result)
+        out.close()
+        if stop_event.is_set():
+            # Abandoned workers may still be blocked on the network: don't wait for them
+            sys.stderr.flush()
+            os._exit(0)
             
     except Exception as e:
-        print(f"ERROR:{str(e)}", file=sys.stderr)
+        out.error(str(e))
+        out.close()
         sys.exit(1)
 
 
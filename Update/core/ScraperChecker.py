@@ -1,17 +1,78 @@
 # -*- coding: utf-8 -*-
 import os
 import re
+import time
+import asyncio
+import inspect
+import queue
+import threading
 import pandas as pd
-from datetime import datetime
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 import yt_dlp
 import multiprocessing
-from typing import Callable, Optional, Union, List, Tuple
+from typing import Callable, Dict, Iterable, Optional, Union, List, Tuple
 
 # Command line interface support
 import argparse
 import sys
 
+try:
+    from .ydl_pool import LatencyStats, YdlPool, extract_info
+    from .video_cache import KIND_INFO, CachePolicy, normalize_info
+    from .channel_state import ChannelState
+    from .checkpoint import open_journal
+    from .ordered_writer import HeldRows, OrderedExcelWriter
+    from .rate_limit import ENABLED as RATE_LIMIT_ENABLED, get_limiter
+    from .video_ids import VIDEO_ID_RE, dedupe_ids
+    from .download_scheduler import DownloadScheduler
+except ImportError:  # chạy qua cli_wrapper (core/ nằm trong sys.path)
+    from ydl_pool import LatencyStats, YdlPool, extract_info
+    from video_cache import KIND_INFO, CachePolicy, normalize_info
+    from channel_state import ChannelState
+    from checkpoint import open_journal
+    from ordered_writer import HeldRows, OrderedExcelWriter
+    from rate_limit import ENABLED as RATE_LIMIT_ENABLED, get_limiter
+    from video_ids import VIDEO_ID_RE, dedupe_ids
+    from download_scheduler import DownloadScheduler
+
+# Cách chạy song song cho scraper/checker:
+# - process: ProcessPool như trước (mỗi process import yt-dlp riêng); chỉ dùng khi
+#   tắt giới hạn tốc độ (AIO_RATE_LIMIT=0), không thì chạy thread (_effective_mode)
+# - thread: ThreadPool, phù hợp vì gần như toàn bộ thời gian là chờ mạng
+# - async: event loop + semaphore; hàm đồng bộ (yt-dlp) chạy trong thread pool
+#   nên phần parse nặng không chặn loop, hàm async được await trực tiếp.
+#   Worker của scraper/checker đều là hàm đồng bộ (yt-dlp), nên với chúng async
+#   thực chất là thread pool sau một semaphore, tốc độ như thread; scraper luôn
+#   chạy async như thread. Checker backend innertube có event loop riêng.
+EXEC_MODES = ('process', 'thread', 'async')
+DEFAULT_IO_CONCURRENCY = 32
+
+# Nguồn dữ liệu cho checker:
+# - ytdlp: trích xuất đầy đủ bằng yt-dlp cho từng ID
+# - innertube: lấy API key/context một lần rồi gọi endpoint player (yt_internal),
+#   chỉ những ID lỗi mới chạy lại bằng yt-dlp
+CHECKER_BACKENDS = ('ytdlp', 'innertube')
+# Trạng thái player là kết luận cuối cùng (không cần hỏi lại yt-dlp)
+_FINAL_PLAYABILITY = ('OK', 'ERROR')
+
+# Nguồn danh sách video của kênh cho scraper:
+# - innertube: browse + continuation (yt_internal), lỗi thì quay về yt-dlp
+# - ytdlp: extract_flat playlist uploads / tab shorts
+SCRAPER_LISTINGS = ('innertube', 'ytdlp')
+
+# Quét nhanh: dựng dòng từ các trường có sẵn trong danh sách (extract_flat /
+# innertube browse), chỉ entry thiếu trường bắt buộc mới lấy chi tiết từng video.
+# Ngày xuất bản khi đó là ước lượng từ thời gian tương đối ("2 năm trước")
+FAST_REQUIRED_FIELDS = ('title', 'duration', 'upload_date')
+
+def _import_yt_internal():
+    try:
+        from . import yt_internal
+    except ImportError:
+        import yt_internal
+    return yt_internal
+
 TOPIC_OVERRIDES = {
     "UCdW9arh-ckZrMW_wHu4xPYA": ("UCNqz53FCc3mUg5NyzHxsXGQ", "Quang Lê Official"),
 }
@@ -68,16 +129,20 @@ def _normalize_input(channel: str) -> str:
     return c
 
 def get_video_info(video_id: str) -> dict:
-    opts = {'ignoreerrors': False, 'skip_download': True, 'nocheckcertificate': True, 'quiet': True}
+    # YoutubeDL dùng lại của worker hiện tại (xem ydl_pool), qua limiter dùng chung (rate_limit)
     try:
-        with yt_dlp.YoutubeDL(opts) as ydl:
-            return ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=False)
+        return get_limiter().call(extract_info, f"https://www.youtube.com/watch?v={video_id}", "info")
     except Exception as e:
         return {"error": str(e)}
 
+# extract_flat cho danh sách kênh; approximate_date: entry kèm timestamp ước lượng
+# từ "2 years ago" (dùng cho chế độ quét nhanh)
+_FLAT_LISTING_OPTS = {'quiet': True, 'extract_flat': True, 'skip_download': True, 'ignoreerrors': True,
+                      'nocheckcertificate': True, 'extractor_args': {'youtubetab': {'approximate_date': ['']}}}
+
 def get_channel_info(channel_input: str) -> Tuple[str, list]:
     cid = _normalize_input(channel_input); entries, title = [], cid
-    ydl_opts = {'quiet': True, 'extract_flat': True, 'skip_download': True, 'ignoreerrors': True, 'nocheckcertificate': True}
+    ydl_opts = dict(_FLAT_LISTING_OPTS)
     if cid.startswith("UC"):
         pl = "UU" + cid[2:]
         try:
@@ -99,7 +164,7 @@ def get_channel_info(channel_input: str) -> Tuple[str, list]:
 
 def get_shorts_info(channel_input: str) -> Tuple[str, list]:
     cid = _normalize_input(channel_input)
-    ydl_opts = {'quiet': True, 'extract_flat': True, 'skip_download': True, 'ignoreerrors': True, 'nocheckcertificate': True}
+    ydl_opts = dict(_FLAT_LISTING_OPTS)
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             data = ydl.extract_info(f"https://www.youtube.com/channel/{cid}/shorts", download=False)
@@ -109,10 +174,291 @@ def get_shorts_info(channel_input: str) -> Tuple[str, list]:
     except Exception:
         return cid, []
 
-def _scraper_worker(entry: dict, idx: int, title: str, cid_input: str, ftype: str) -> dict:
-    vid = entry.get('id')
-    if not vid: return None
-    info = get_video_info(vid)
+def _effective_mode(mode: str, log_func: Optional[Callable], prefix: str) -> str:
+    """Limiter chỉ dùng chung trong một process: ở mode process mỗi worker process có
+    bucket riêng và giới hạn thực tế nhân theo số worker, nên khi limiter bật thì chạy thread."""
+    if mode == 'process' and RATE_LIMIT_ENABLED:
+        log_func and log_func('Giới hạn tốc độ đang bật: chạy thread thay cho process '
+                              '(đặt AIO_RATE_LIMIT=0 để dùng process)', prefix=prefix)
+        return 'thread'
+    return mode
+
+def _default_workers(mode: str, max_workers: Optional[int]) -> int:
+    if max_workers:
+        return max(1, int(max_workers))
+    return multiprocessing.cpu_count() if mode == 'process' else DEFAULT_IO_CONCURRENCY
+
+# Chu kỳ kiểm tra stop_event khi chờ kết quả (giây)
+STOP_POLL = 0.5
+
+def _stopped(stop_event: Optional[object]) -> bool:
+    return bool(stop_event and stop_event.is_set())
+
+def _deliver_done(futures: Iterable, on_result: Callable):
+    """Giao các kết quả đã xong nhưng chưa giao (dùng khi dừng giữa chừng)."""
+    for f in futures:
+        if f.done() and not f.cancelled() and f.exception() is None:
+            on_result(f.result())
+
+def _abandon_pool(executor) -> None:
+    """Bỏ pool không chờ: huỷ việc chưa chạy, dừng request đang chờ lượt ở limiter,
+    kết thúc luôn worker process (thread đang gọi mạng thì để tự kết thúc ở nền)."""
+    procs = list((getattr(executor, '_processes', None) or {}).values())
+    get_limiter().cancel()
+    executor.shutdown(wait=False, cancel_futures=True)
+    for p in procs:
+        try: p.terminate()
+        except Exception: pass
+
+def _reopen_limiter(stop_event: Optional[object]) -> None:
+    """Gọi khi lượt chạy kết thúc: _abandon_pool huỷ limiter dùng chung của process, lượt
+    chạy lỗi thì mở lại để job sau trong cùng process (daemon --serve) không bị Cancelled.
+    Bị dừng thì giữ huỷ: worker bỏ lại không gửi thêm request (process được thay sau đó)."""
+    if not _stopped(stop_event):
+        get_limiter().reopen()
+
+def _make_executor(mode: str, workers: int):
+    """Executor cho mode cùng YdlPool của nó (đóng khi executor xong). Worker process
+    không cần pool: instance mất theo process khi executor shutdown."""
+    if mode == 'process':
+        return ProcessPoolExecutor(max_workers=workers), None
+    ydls = YdlPool()
+    return ThreadPoolExecutor(max_workers=workers, initializer=ydls.bind), ydls
+
+async def _run_tasks_async(func: Callable, arg_list: List[tuple], on_result: Callable,
+                           workers: int, stop_event: Optional[object]) -> bool:
+    loop = asyncio.get_running_loop(); sem = asyncio.Semaphore(workers)
+    is_coro = inspect.iscoroutinefunction(func)
+    pool, ydls = _make_executor('thread', workers)
+    async def one(args):
+        async with sem:
+            if _stopped(stop_event): return None
+            if is_coro: return await func(*args)
+            return await loop.run_in_executor(pool, func, *args)
+    pending = {asyncio.ensure_future(one(a)) for a in arg_list}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=STOP_POLL,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                res = t.result()
+                if res is not None or not _stopped(stop_event): on_result(res)
+            if _stopped(stop_event):
+                _abandon_pool(pool); return False
+    finally:
+        for t in pending: t.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
+        ydls.close()
+    return True
+
+def _run_tasks(func: Callable, arg_list: List[tuple], on_result: Callable,
+               mode: str = 'process', workers: int = 4,
+               stop_event: Optional[object] = None) -> bool:
+    """Chạy func(*args) cho từng phần tử theo mode, gọi on_result(kết quả) theo
+    thứ tự hoàn thành. Trả về False nếu bị dừng giữa chừng: việc chưa chạy bị bỏ,
+    không chờ việc đang chạy, kết quả đã xong vẫn được giao cho on_result."""
+    if mode not in EXEC_MODES:
+        raise ValueError(f"mode phải là một trong {EXEC_MODES}")
+    if mode == 'async':
+        return asyncio.run(_run_tasks_async(func, arg_list, on_result, workers, stop_event))
+    executor, ydls = _make_executor(mode, workers)
+    try:
+        pending = {executor.submit(func, *a) for a in arg_list}
+        while pending:
+            if _stopped(stop_event):
+                _deliver_done(pending, on_result)
+                _abandon_pool(executor); return False
+            done, pending = wait(pending, timeout=STOP_POLL, return_when=FIRST_COMPLETED)
+            for f in done: on_result(f.result())
+    except BaseException:
+        _abandon_pool(executor); raise
+    finally:
+        if ydls: ydls.close()
+    executor.shutdown()
+    return True
+
+def _run_tasks_streaming(func: Callable, source: 'queue.Queue', on_result: Callable,
+                         mode: str = 'process', workers: int = 4,
+                         stop_event: Optional[object] = None,
+                         on_message: Optional[Callable] = None) -> bool:
+    """Như _run_tasks nhưng công việc đến dần qua source: ('task', args) được submit
+    ngay, ('row', kết quả) giao thẳng cho on_result, ('end', None) báo hết việc; loại
+    khác chuyển cho on_message(kind, value). Mode async chạy như thread (func đồng bộ)."""
+    if mode not in EXEC_MODES:
+        raise ValueError(f"mode phải là một trong {EXEC_MODES}")
+    executor, ydls = _make_executor(mode, workers)
+    running, ended = set(), False
+    try:
+        while not ended or running:
+            if _stopped(stop_event):
+                _deliver_done(running, on_result)
+                _abandon_pool(executor); return False
+            try:
+                kind, value = source.get_nowait() if running else source.get(timeout=0.05)
+                while True:
+                    if kind == 'task': running.add(executor.submit(func, *value))
+                    elif kind == 'row': on_result(value)
+                    elif kind == 'end': ended = True
+                    elif on_message: on_message(kind, value)
+                    kind, value = source.get_nowait()
+            except queue.Empty:
+                pass
+            if running:
+                done, running = wait(running, timeout=0.05, return_when=FIRST_COMPLETED)
+                for f in done: on_result(f.result())
+    except BaseException:
+        _abandon_pool(executor); raise
+    finally:
+        if ydls: ydls.close()
+    executor.shutdown()
+    return True
+
+def _cut_at_known(items: list, known: Optional[set]) -> list:
+    """Giữ các entry mới hơn video đã biết đầu tiên (danh sách mới nhất trước)."""
+    if not known: return items
+    for i, e in enumerate(items):
+        if e.get('id') in known: return items[:i]
+    return items
+
+class _ListingFeed:
+    """Danh sách Shorts và Video liệt kê song song nên entry đến xen kẽ.
+    Thứ tự cuối giữ như cũ: Shorts trước rồi Video, ID có ở cả hai tab tính là
+    Shorts; vị trí của Video chỉ chốt được khi tab Shorts đã liệt kê xong."""
+
+    def __init__(self, skip_ids: Iterable[str]=()):
+        self.lock = threading.Lock()
+        self.skip = set(skip_ids)
+        self.listed: Dict[str, List[str]] = {'shorts': [], 'videos': []}  # cho watermark
+        self.shorts: Dict[str, int] = {}
+        self.videos: List[str] = []; self._video_set = set()
+        self.video_pos: Dict[str, int] = {}; self._settled = 0
+        self.shorts_done = False
+        self.queued = 0; self.cached = 0; self.flat = 0
+
+    def add(self, tab: str, vid: Optional[str]) -> bool:
+        """Ghi nhận một entry; True nếu cần lấy video này (chưa gửi lần nào)."""
+        if not vid: return False
+        with self.lock:
+            self.listed[tab].append(vid)
+            if vid in self.skip or vid in self.shorts: return False
+            if tab == 'shorts':
+                self.shorts[vid] = len(self.shorts)
+                # Đã gửi từ tab Video: không lấy lại, position() đổi thành Shorts
+                if vid in self._video_set: return False
+            else:
+                if vid in self._video_set: return False
+                self._video_set.add(vid); self.videos.append(vid)
+            self.queued += 1
+            return True
+
+    def finish_shorts(self):
+        with self.lock: self.shorts_done = True
+
+    def position(self, vid: str) -> Optional[Tuple[int, str]]:
+        """(vị trí tính từ 0, hình thức) của video; None nếu chưa chốt được."""
+        with self.lock:
+            if vid in self.shorts: return self.shorts[vid], 'Shorts'
+            if not self.shorts_done: return None
+            while self._settled < len(self.videos):
+                v = self.videos[self._settled]; self._settled += 1
+                if v not in self.shorts: self.video_pos[v] = len(self.video_pos)
+            pos = self.video_pos.get(vid)
+            return None if pos is None else (len(self.shorts) + pos, 'Video')
+
+def _flat_to_info(entry: dict, title: str, channel_id: Optional[str]) -> dict:
+    """info kiểu yt-dlp dựng từ entry của danh sách phẳng (extract_flat / innertube)."""
+    info = {k: entry[k] for k in ('id', 'title', 'duration', 'view_count', 'upload_date',
+                                  'channel_id', 'uploader', 'channel_url', 'uploader_url')
+            if entry.get(k) not in (None, '', 'N/A')}
+    if 'upload_date' not in info and entry.get('timestamp'):
+        info['upload_date'] = datetime.fromtimestamp(int(entry['timestamp']), timezone.utc).strftime('%Y%m%d')
+    info.setdefault('uploader', title)
+    if channel_id: info.setdefault('channel_id', channel_id)
+    return info
+
+def _start_listing(feed: _ListingFeed, channel_input: str, listing: str, limit: Optional[int],
+                   known: Dict[str, set], lookup: Callable[[str], Optional[dict]],
+                   source: 'queue.Queue', stop_event: Optional[object]=None,
+                   log_func: Optional[Callable]=None, fast: bool=False) -> threading.Thread:
+    """Liệt kê tab Shorts và Video cùng lúc trong một thread riêng, đẩy vào source
+    ngay khi có entry: ('title', tên kênh), ('task', args của _scraper_worker) hoặc
+    ('row', dòng dựng từ cache / từ chính entry khi quét nhanh), cuối cùng ('end', None).
+    known: {tab: ID đã biết} - dừng tab khi gặp video đã biết (chế độ delta)."""
+    stopped = lambda: bool(stop_event and stop_event.is_set())
+    norm = _normalize_input(channel_input)
+    channel_id = norm if norm.startswith('UC') else None
+
+    def emit(tab, ftype, entry, title):
+        vid = entry.get('id')
+        if not feed.add(tab, vid): return
+        info = lookup(vid)
+        if info is not None:
+            feed.cached += 1; source.put(('row', _scraper_row(0, vid, info, title, channel_input, ftype))); return
+        if fast:
+            info = _flat_to_info(entry, title, channel_id)
+            if all(info.get(k) is not None for k in FAST_REQUIRED_FIELDS):
+                feed.flat += 1; source.put(('row', _scraper_row(0, vid, info, title, channel_input, ftype))); return
+        source.put(('task', (entry, 0, title, channel_input, ftype)))
+
+    async def one_tab(tab, ftype, yt_internal, ctx):
+        count, failed = 0, False
+        if ctx:
+            key, context, cid, title = ctx
+            gen = yt_internal.browse_channel_items(cid, key, context, tab, limit)
+            try:
+                async for it in gen:
+                    if stopped() or it['id'] in known.get(tab, ()): break
+                    emit(tab, ftype, it, title); count += 1
+            except Exception as e:
+                failed = True
+                log_func and log_func(f'Innertube lỗi khi liệt kê tab {tab} ({e})', prefix='Scraper')
+            finally:
+                await gen.aclose()
+            if count or stopped() or (known.get(tab) and not failed): return
+        fetch = get_shorts_info if tab == 'shorts' else get_channel_info
+        title, entries = await asyncio.to_thread(fetch, channel_input)
+        entries = _cut_at_known(entries, known.get(tab))
+        if limit: entries = entries[:limit]
+        if entries: source.put(('title', title))
+        for e in entries:
+            if stopped(): break
+            emit(tab, ftype, e, title)
+
+    async def run():
+        nonlocal channel_id
+        yt_internal = ctx = None
+        if listing == 'innertube':
+            try:
+                yt_internal = _import_yt_internal()
+                ctx = await yt_internal.discover_channel(channel_input.strip())
+                channel_id = ctx[2]; source.put(('title', ctx[3]))
+            except Exception as e:
+                log_func and log_func(f'Innertube không liệt kê được kênh ({e}), chuyển sang yt-dlp', prefix='Scraper')
+
+        async def tab_task(tab, ftype):
+            try:
+                await one_tab(tab, ftype, yt_internal, ctx)
+            finally:
+                if tab == 'shorts': feed.finish_shorts()
+
+        for err in await asyncio.gather(tab_task('shorts', 'Shorts'), tab_task('videos', 'Video'),
+                                        return_exceptions=True):
+            if err: log_func and log_func(f'Lỗi liệt kê kênh: {err}', prefix='Scraper')
+
+    def main():
+        try:
+            asyncio.run(run())
+        except Exception as e:
+            log_func and log_func(f'Lỗi liệt kê kênh: {e}', prefix='Scraper')
+        finally:
+            feed.finish_shorts()
+            log_func and log_func(f'Tổng số video: {feed.queued}', prefix='Scraper')
+            source.put(('end', None))
+
+    thread = threading.Thread(target=main, name='scraper-listing', daemon=True)
+    thread.start(); return thread
+
+def _scraper_row(idx: int, vid: str, info: Optional[dict], title: str, cid_input: str, ftype: str) -> dict:
     if not info or 'error' in info:
         return {'Số thứ tự': idx,'Tên Kênh': title,'ID Kênh': cid_input,'Tên Video': 'N/A',
                 'ID Video': vid,'Link Video': f'https://www.youtube.com/watch?v={vid}',
@@ -126,38 +472,176 @@ def _scraper_worker(entry: dict, idx: int, title: str, cid_input: str, ftype: st
             'Ngày xuất bản': Utils.format_date(info.get('upload_date')),
             'Lượt xem': info.get('view_count', 'N/A'),'Tình trạng': 'OK','Hình thức': ftype}
 
+def _scraper_worker(entry: dict, idx: int, title: str, cid_input: str, ftype: str) -> dict:
+    vid = entry.get('id')
+    if not vid: return None
+    t0 = time.perf_counter(); info = get_video_info(vid); latency = time.perf_counter() - t0
+    row = _scraper_row(idx, vid, info, title, cid_input, ftype); row['_latency'] = latency
+    row['_rate'] = get_limiter().describe()
+    # Trường chuẩn hoá để process điều phối ghi vào cache
+    if info and 'error' not in info: row['_info'] = normalize_info(info)
+    return row
+
+class _RateReport:
+    """Trạng thái limiter mới nhất do worker gửi kèm kết quả (cột _rate, kể cả khi
+    worker ở process khác); add() trả về dòng cần log sau mỗi `every` kết quả."""
+
+    def __init__(self, every: int = 50):
+        self.every, self.text, self.count = every, None, 0
+
+    def add(self, res: Optional[dict]) -> Optional[str]:
+        text = res.pop('_rate', None) if res else None
+        if text: self.text = text
+        self.count += 1
+        return self.text if self.text and self.count % self.every == 0 else None
+
+    def final(self) -> str:
+        return self.text or get_limiter().describe()
+
+class _CacheWriter:
+    """Gom info mới lấy (cột _info của kết quả worker) và ghi cache theo lô."""
+
+    def __init__(self, policy: CachePolicy, kind: str, batch: int = 100):
+        self.policy, self.kind, self.batch = policy, kind, batch
+        self.pending = {}
+
+    def add(self, res: dict):
+        info = res.pop('_info', None)
+        if info is not None:
+            self.pending[str(res.get('ID Video')).strip()] = info
+            if len(self.pending) >= self.batch: self.flush()
+
+    def flush(self):
+        self.policy.store(self.pending, self.kind); self.pending = {}
+
 def run_scraper(channel_input: str, out_folder: str,
                 log_func: Optional[Callable]=None,
                 progress_callback: Optional[Callable[[int, int], None]]=None,
-                stop_event: Optional[object]=None) -> Optional[str]:
-    s_title, s_items = get_shorts_info(channel_input)
-    u_title, u_items = get_channel_info(channel_input)
-    if not (s_items or u_items):
-        log_func and log_func('Không thể lấy video.', prefix='Scraper'); return None
-    title = s_title if s_items else u_title
-    args, idx = [], 1
-    for e in s_items: args.append((e, idx, title, channel_input, 'Shorts')); idx += 1
-    for e in u_items: args.append((e, idx, title, channel_input, 'Video')); idx += 1
-    total = len(args); log_func and log_func(f'Tổng số video: {total}', prefix='Scraper')
-    if progress_callback: progress_callback(0, total)
-    results = []
-    with ProcessPoolExecutor(max_workers=multiprocessing.cpu_count()) as executor:
-        futures = {executor.submit(_scraper_worker, *a): a for a in args}
-        done = 0
-        for f in as_completed(futures):
-            if stop_event and stop_event.is_set():
-                executor.shutdown(cancel_futures=True); return None
-            res = f.result()
-            if res: results.append(res)
-            done += 1
-            if progress_callback: progress_callback(done, total)
-            log_func and log_func(f'Đã xử lý {done}/{total}', prefix='Scraper')
-    df = pd.DataFrame(results)
-    if df.empty: return None
-    df['p'] = df['Hình thức'].apply(lambda x: 0 if x == 'Shorts' else 1)
-    df = df.sort_values(['ID Video','p']).drop_duplicates('ID Video').drop('p', axis=1)
-    safe = Utils.sanitize_filename(title); os.makedirs(out_folder, exist_ok=True)
-    path = os.path.join(out_folder, f"{safe}_Videos.xlsx"); df.to_excel(path, index=False)
+                stop_event: Optional[object]=None,
+                mode: str='process', max_workers: Optional[int]=None,
+                use_cache: bool=True, force_refresh: bool=False,
+                cache_ttl_hours: Optional[float]=None,
+                listing: str='innertube', limit: Optional[int]=None,
+                incremental: bool=False, fast: bool=False) -> Optional[str]:
+    get_limiter().reopen()
+    mode = _effective_mode(mode, log_func, 'Scraper')
+    # Chế độ delta: chỉ lấy video mới hơn watermark rồi gộp vào file lần trước.
+    # Kết nối SQLite của ChannelState đóng khi xong job (daemon chạy nhiều job liên tiếp)
+    state = None
+    if incremental:
+        try:
+            state = ChannelState()
+        except Exception as e:
+            log_func and log_func(f'Không đọc được trạng thái kênh ({e}), chạy đầy đủ', prefix='Scraper')
+    try:
+        return _scrape_channel(channel_input, out_folder, log_func, progress_callback, stop_event,
+                               mode, max_workers, use_cache, force_refresh, cache_ttl_hours,
+                               listing, limit, state, fast)
+    finally:
+        if state is not None: state.close()
+
+def _scrape_channel(channel_input, out_folder, log_func, progress_callback, stop_event,
+                    mode, max_workers, use_cache, force_refresh, cache_ttl_hours,
+                    listing, limit, state: Optional[ChannelState], fast) -> Optional[str]:
+    state_key, prev_path, known = _normalize_input(channel_input), None, {}
+    if state is not None:
+        try:
+            prev = state.get(state_key) or {}
+            if prev.get('output_path') and os.path.exists(prev['output_path']):
+                prev_path = prev['output_path']
+                known = {tab: set(ids) for tab, ids in prev.get('known', {}).items()}
+                log_func and log_func(f'Delta: chỉ lấy video mới hơn lần chạy trước ({os.path.basename(prev_path)})', prefix='Scraper')
+        except Exception as e:
+            log_func and log_func(f'Không đọc được trạng thái kênh ({e}), chạy đầy đủ', prefix='Scraper')
+            state = None
+
+    # Delta: số thứ tự của video mới nối tiếp file cũ, video đã có trong file cũ thì bỏ qua
+    old, offset = None, 0
+    if prev_path:
+        old = pd.read_excel(prev_path)
+        if 'Số thứ tự' in old.columns and len(old):
+            offset = int(pd.to_numeric(old['Số thứ tự'], errors='coerce').max() or 0)
+    feed = _ListingFeed(old['ID Video'].astype(str) if old is not None else ())
+    latency = LatencyStats(); rates = _RateReport(); done = 0
+    pub_dates = list(old['Ngày xuất bản'].astype(str)) if old is not None else []
+    workers = _default_workers(mode, max_workers); t0 = time.perf_counter()
+    log_func and log_func(f'Chế độ {mode}, {workers} worker', prefix='Scraper')
+    policy = CachePolicy('scraper', use_cache, force_refresh, cache_ttl_hours)
+    writer = _CacheWriter(policy, KIND_INFO)
+
+    # Kết quả ghi dần theo thứ tự liệt kê; file cũ (delta) đứng trước.
+    # File mở khi biết tên kênh (trước entry đầu tiên của danh sách)
+    cols = ['Số thứ tự','Tên Kênh','ID Kênh','Tên Video','ID Video','Link Video',
+            'Thời gian','Ngày xuất bản','Lượt xem','Tình trạng','Hình thức']
+    out, held = None, HeldRows()  # Video chờ tab Shorts xong, quá giới hạn thì dồn ra đĩa
+
+    def on_message(kind, value):
+        nonlocal out
+        if kind == 'title' and out is None:
+            path = os.path.join(out_folder, f"{Utils.sanitize_filename(value)}_Videos.xlsx")
+            out = OrderedExcelWriter(path, cols)
+            if old is not None: out.write_rows(old.to_dict('records'))
+
+    def place(res):
+        p = feed.position(res['ID Video'])
+        if p is None: held.add(res); return
+        res['Số thứ tự'] = offset + p[0] + 1; res['Hình thức'] = p[1]
+        out.put(p[0], res); pub_dates.append(res['Ngày xuất bản'])
+
+    def flush_held():
+        if held and feed.shorts_done:
+            for r in held.pop_all(): place(r)
+
+    def on_result(res):
+        nonlocal done
+        rate_line = rates.add(res)
+        if res:
+            latency.add(res.pop('_latency', None)); writer.add(res); place(res)
+        flush_held(); done += 1
+        if progress_callback: progress_callback(done, feed.queued)
+        log_func and log_func(f'Đã xử lý {done}/{feed.queued}', prefix='Scraper')
+        if rate_line: log_func and log_func(rate_line, prefix='Scraper')
+
+    # Liệt kê hai tab song song; video được lấy ngay khi entry đầu tiên tới
+    source = queue.Queue()
+    lookup = lambda vid: policy.lookup([vid], KIND_INFO).get(vid)
+    _start_listing(feed, channel_input, listing, limit, known, lookup, source, stop_event, log_func, fast)
+    try:
+        ok = _run_tasks_streaming(_scraper_worker, source, on_result, mode, workers, stop_event, on_message)
+        if not ok: feed.finish_shorts()  # dừng: chốt vị trí theo phần đã liệt kê
+        flush_held()
+    except BaseException:
+        if out: out.abort()
+        raise
+    finally:
+        writer.flush()
+        held.close()
+        _reopen_limiter(stop_event)
+    for msg in policy.finish(): log_func and log_func(msg, prefix='Scraper')
+    if feed.cached: log_func and log_func(f'Cache: dùng lại {feed.cached}/{feed.queued} video', prefix='Scraper')
+    if fast: log_func and log_func(f'Quét nhanh: {feed.flat}/{feed.queued} video lấy từ danh sách, '
+                                   f'{feed.queued - feed.flat - feed.cached} video lấy chi tiết', prefix='Scraper')
+    if not ok and out and done:
+        # Dừng giữa chừng: vẫn ghi phần đã lấy, không cập nhật watermark để lần sau lấy tiếp
+        path = out.close()
+        log_func and log_func(f'Đã dừng: ghi {done}/{feed.queued} video vào {path}', prefix='Scraper')
+        return path
+    if not ok or not feed.queued:
+        if out: out.abort()
+        if ok and prev_path:
+            log_func and log_func('Không có video mới.', prefix='Scraper')
+            state.update(state_key, {}, prev_path); return prev_path
+        if ok: log_func and log_func('Không thể lấy video.', prefix='Scraper')
+        return None
+    elapsed = time.perf_counter() - t0
+    log_func and log_func(latency.summary(), prefix='Scraper')
+    log_func and log_func(rates.final(), prefix='Scraper')
+    log_func and log_func(f'Tốc độ: {done / elapsed if elapsed else 0:.1f} video/giây', prefix='Scraper')
+    path = out.close()
+    if prev_path: log_func and log_func(f'Delta: thêm {feed.queued} video mới, tổng {out.written}', prefix='Scraper')
+    if state is not None:
+        dates = pd.to_datetime(pd.Series(pub_dates, dtype=object), format='%d/%m/%Y', errors='coerce').dropna()
+        state.update(state_key, feed.listed, path, dates.max().strftime('%d/%m/%Y') if len(dates) else None)
     log_func and log_func(f'Xong: {path}', prefix='Scraper'); return path
 
 def read_input_file(fp: str) -> Optional[pd.DataFrame]:
@@ -166,40 +650,204 @@ def read_input_file(fp: str) -> Optional[pd.DataFrame]:
     if ext == '.csv': return pd.read_csv(fp)
     return None
 
-def _checker_worker(item: Tuple[int, str]) -> dict:
-    idx, vid = item; info = get_video_info(vid)
-    status = 'OK' if info and 'error' not in info else f"Error: {info.get('error','N/A') if info else 'N/A'}"
-    return {'index': idx,'ID Kênh': Utils.extract_channel_id(info) if info and 'error' not in info else 'N/A',
+def _checker_row(idx: int, vid: str, info: Optional[dict]) -> dict:
+    ok = bool(info) and 'error' not in info
+    status = 'OK' if ok else f"Error: {info.get('error','N/A') if info else 'N/A'}"
+    duration = info.get('duration') if ok else None
+    return {'index': idx,'ID Kênh': Utils.extract_channel_id(info) if ok else 'N/A',
             'Tên Kênh': info.get('uploader','N/A') if info else 'N/A','ID Video': vid,
             'Tên Video': info.get('title','N/A') if info else 'N/A',
-            'Thời Lượng': Utils.format_duration(info.get('duration')) if info else 'N/A',
+            'Thời Lượng': Utils.format_duration(duration) if info else 'N/A',
             'Ngày Xuất Bản': Utils.format_date(info.get('upload_date')) if info else 'N/A',
             'Lượt View': info.get('view_count','N/A') if info else 'N/A',
-            'Tình trạng': status,'Hình thức': 'Shorts' if info and info.get('duration',0)<=60 else 'Video'}
+            'Tình trạng': status,
+            'Hình thức': ('Shorts' if (duration or 0) <= 60 else 'Video') if ok else 'N/A'}
+
+def _checker_worker(item: Tuple[int, str]) -> dict:
+    idx, vid = item
+    t0 = time.perf_counter(); info = get_video_info(vid); latency = time.perf_counter() - t0
+    row = _checker_row(idx, vid, info); row['_latency'] = latency
+    row['_rate'] = get_limiter().describe()
+    if info and 'error' not in info: row['_info'] = normalize_info(info)
+    return row
+
+def _player_to_info(data: dict) -> Optional[dict]:
+    """Chuyển player response về dạng info chuẩn hoá (như yt-dlp) hoặc {'error': lý do};
+    None nếu cần chạy lại bằng yt-dlp."""
+    if 'error' in data: return None
+    playability = data.get('playabilityStatus') or {}
+    status = playability.get('status')
+    if status not in _FINAL_PLAYABILITY: return None
+    if status != 'OK':
+        return {'error': playability.get('reason') or status}
+    details = data.get('videoDetails')
+    if not details: return None
+    micro = (data.get('microformat') or {}).get('playerMicroformatRenderer') or {}
+    try: duration = int(details.get('lengthSeconds'))
+    except (TypeError, ValueError): duration = None
+    try: views = int(details.get('viewCount'))
+    except (TypeError, ValueError): views = None
+    publish = micro.get('publishDate') or micro.get('uploadDate')
+    info = {'id': details.get('videoId') or data.get('videoId'), 'title': details.get('title'),
+            'uploader': details.get('author'), 'channel_id': details.get('channelId'),
+            'duration': duration, 'view_count': views,
+            'upload_date': publish[:10].replace('-', '') if publish else None}
+    return {k: v for k, v in info.items() if v is not None}
+
+def _player_to_row(idx: int, vid: str, data: dict) -> Optional[dict]:
+    """Chuyển player response sang dòng checker; None nếu cần chạy lại bằng yt-dlp."""
+    info = _player_to_info(data)
+    if info is None: return None
+    row = _checker_row(idx, vid, info)
+    if 'error' not in info: row['_info'] = info
+    return row
+
+def _run_innertube_checker(items: List[Tuple[int, str]], concurrency: int,
+                           on_result: Callable, log_func: Optional[Callable]=None,
+                           stop_event: Optional[object]=None) -> List[Tuple[int, str]]:
+    """Kiểm tra qua endpoint player; trả về các item cần chạy lại bằng yt-dlp."""
+    try:
+        yt_internal = _import_yt_internal()
+    except ImportError as e:
+        log_func and log_func(f'Không dùng được innertube ({e}), chuyển sang yt-dlp', prefix='Checker')
+        return list(items)
+
+    by_vid = {}
+    for idx, vid in items:
+        by_vid.setdefault(str(vid).strip(), []).append(idx)
+    fallback: List[Tuple[int, str]] = []; resolved = set()
+
+    def handle(data: dict):
+        vid = data.get('videoId')
+        for idx in by_vid.get(vid, []):
+            if stop_event and stop_event.is_set(): return
+            row = _player_to_row(idx, vid, data)
+            if row is None: fallback.append((idx, vid))
+            else: resolved.add(idx); on_result(row)
+
+    async def main():
+        key, context = await yt_internal.autodiscover(yt_internal.HOME_URL)
+        log_func and log_func(f'Innertube: {len(by_vid)} ID, {concurrency} request đồng thời', prefix='Checker')
+        work = asyncio.ensure_future(yt_internal.player_info_many(
+            list(by_vid), key, context, concurrency=concurrency, on_result=handle))
+        while not (await asyncio.wait({work}, timeout=STOP_POLL))[0]:
+            if _stopped(stop_event):
+                work.cancel()  # huỷ cả các request đang chờ phản hồi
+                return
+        work.result()
+
+    try:
+        asyncio.run(main())
+    except Exception as e:
+        log_func and log_func(f'Innertube lỗi ({e}), chuyển sang yt-dlp', prefix='Checker')
+        return [it for it in items if it[0] not in resolved]
+    if fallback:
+        log_func and log_func(f'{len(fallback)} ID chạy lại bằng yt-dlp', prefix='Checker')
+    return fallback
 
 def run_checker(fp: str, max_workers: int=4,
                 progress_callback: Optional[Callable[[int, int], None]]=None,
                 log_func: Optional[Callable]=None,
-                stop_event: Optional[object]=None) -> Optional[str]:
+                stop_event: Optional[object]=None,
+                mode: str='process', backend: str='ytdlp',
+                use_cache: bool=True, force_refresh: bool=False,
+                cache_ttl_hours: Optional[float]=None, resume: bool=False) -> Optional[str]:
+    get_limiter().reopen()
+    mode = _effective_mode(mode, log_func, 'Checker')
     df_in = read_input_file(fp)
     if df_in is None or 'ID Video' not in df_in.columns:
         log_func and log_func("File không hợp lệ hoặc thiếu cột 'ID Video'.", prefix='Checker'); return None
     items = list(df_in['ID Video'].items())
-    total = len(items); results = []
-    if progress_callback: progress_callback(0, total)
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(_checker_worker, it): it for it in items}
-        done = 0
-        for f in as_completed(futures):
-            if stop_event and stop_event.is_set():
-                executor.shutdown(cancel_futures=True); return None
-            res = f.result(); results.append(res); done += 1
-            if progress_callback: progress_callback(done, total)
-            log_func and log_func(f'Checker {done}/{total}', prefix='Checker')
-    df_out = pd.DataFrame(results); df_out.insert(0, 'Số thứ tự', range(1, len(df_out)+1))
+    total = len(items); del df_in
+    # Vị trí dòng trong file đầu vào: file kết quả giữ đúng thứ tự này
+    pos_of = {str(idx): p for p, (idx, _) in enumerate(items)}
+    # Chuẩn hoá ID (URL, shorts...), mỗi ID chỉ gửi một lần
+    ids = dedupe_ids((v for _, v in items), (idx for idx, _ in items))
+    log_func and log_func(ids.summary(), prefix='Checker')
+    raw_of = dict(items)
+    items = [(idx, vid) for vid in ids.unique for idx in ids.rows[vid]]
+    out_path = os.path.splitext(fp)[0] + '_checked.xlsx'
     cols = ['Số thứ tự','ID Kênh','Tên Kênh','ID Video','Tên Video','Thời Lượng','Ngày Xuất Bản','Lượt View','Tình trạng','Hình thức']
-    df_out = df_out[cols]; out_path = os.path.splitext(fp)[0] + '_checked.xlsx'
-    df_out.to_excel(out_path, index=False); return out_path
+    out = OrderedExcelWriter(out_path, cols)
+
+    def emit(res):
+        p = pos_of[str(res['index'])]; out.put(p, {**res, 'Số thứ tự': p + 1})
+
+    # Nhật ký tạm: kết quả ghi ra đĩa ngay khi có; resume bỏ qua dòng đã xong
+    journal = open_journal(out_path, resume, log_func, 'Checker')
+    resumed = 0
+    if journal and journal.rows:
+        key = lambda idx, vid: (str(idx), str(vid))
+        wanted = {key(idx, vid) for idx, vid in items}; seen = set()
+        for r in journal.rows:
+            k = key(r.get('index'), r.get('ID Video'))
+            if k in wanted and k not in seen: seen.add(k); emit(r)
+        journal.rows = []; resumed = len(seen)
+        items = [it for it in items if key(*it) not in seen]
+    # Dòng không có ID hợp lệ: ghi ngay, không gọi mạng
+    for idx in ids.invalid:
+        emit(_checker_row(idx, raw_of[idx], {'error': 'ID không hợp lệ'}))
+    groups: Dict[str, List[int]] = {}
+    for idx, vid in items: groups.setdefault(vid, []).append(idx)
+    items = [(idxs[0], vid) for vid, idxs in groups.items()]
+    if progress_callback: progress_callback(resumed + len(ids.invalid), total)
+    latency = LatencyStats(); rates = _RateReport(); done = resumed + len(ids.invalid)
+    workers = _default_workers(mode, max_workers); t0 = time.perf_counter()
+    log_func and log_func(f'Chế độ {mode}, {workers} worker', prefix='Checker')
+
+    policy = CachePolicy('checker', use_cache, force_refresh, cache_ttl_hours)
+    writer = _CacheWriter(policy, KIND_INFO)
+
+    def on_result(res):
+        nonlocal done
+        rate_line = rates.add(res)
+        latency.add(res.pop('_latency', None)); writer.add(res)
+        # Chia kết quả cho mọi dòng gốc trùng ID
+        for idx in groups.get(res['ID Video'], [res['index']]):
+            row = {**res, 'index': idx}; emit(row); done += 1
+            if journal: journal.append(row)
+        if progress_callback: progress_callback(done, total)
+        log_func and log_func(f'Checker {done}/{total}', prefix='Checker')
+        if rate_line: log_func and log_func(rate_line, prefix='Checker')
+
+    pending = items
+    cached = policy.lookup((vid for _, vid in items), KIND_INFO)
+    if cached:
+        log_func and log_func(f'Cache: dùng lại {sum(v in cached for _, v in items)}/{len(items)} video', prefix='Checker')
+        for idx, vid in items:
+            if vid in cached: on_result(_checker_row(idx, vid, cached[vid]))
+        pending = [it for it in items if it[1] not in cached]
+    ok = True
+    try:
+        if pending and backend == 'innertube':
+            pending = _run_innertube_checker(pending, _default_workers('async', max_workers),
+                                             on_result, log_func, stop_event)
+            ok = not _stopped(stop_event)
+        if ok and pending:
+            ok = _run_tasks(_checker_worker, [(it,) for it in pending], on_result, mode, workers, stop_event)
+    except BaseException:
+        out.abort(); raise
+    finally:
+        writer.flush()
+        if journal: journal.close()
+        _reopen_limiter(stop_event)
+    for msg in policy.finish(): log_func and log_func(msg, prefix='Checker')
+    if not ok:
+        # Dừng giữa chừng: ghi phần đã xong, nhật ký giữ lại để resume
+        if not done:
+            out.abort(); return None
+        out.close()
+        log_func and log_func(f'Đã dừng: ghi {done}/{total} kết quả vào {out_path}', prefix='Checker')
+        if journal:
+            log_func and log_func('Chạy lại với resume để kiểm tra nốt phần còn lại', prefix='Checker')
+        return out_path
+    elapsed = time.perf_counter() - t0
+    log_func and log_func(latency.summary(), prefix='Checker')
+    log_func and log_func(rates.final(), prefix='Checker')
+    log_func and log_func(f'Tốc độ: {rates.count / elapsed if elapsed else 0:.1f} video/giây', prefix='Checker')
+    out.close()
+    if journal: journal.discard()
+    return out_path
 
 def _build_ydl_opts_for_download(
     out_folder: str,
@@ -253,6 +901,47 @@ def _build_ydl_opts_for_download(
         })
     return ydl_opts
 
+_archive_lock = threading.Lock()
+
+# Lý do của video bị bỏ khi dừng; manifest ghi 'cancelled' để resume làm lại
+CANCELLED = 'Cancelled by user'
+
+class _PostProcessJob:
+    """Phần hậu xử lý (ffmpeg merge, metadata, thumbnail, tách audio) của một lượt
+    tải, giữ lại để chạy ở pool riêng trong khi slot mạng nhận video tiếp theo."""
+
+    def __init__(self, ydl, archive_path: Optional[str] = None):
+        self.ydl, self.archive_path = ydl, archive_path
+        self.info: Optional[dict] = None
+        self.calls: List[tuple] = []
+        self._post_process = ydl.post_process
+        ydl.post_process = self._capture
+
+    def _capture(self, filename, info, files_to_move=None):
+        info['filepath'] = filename
+        self.calls.append((filename, info, files_to_move))
+        return info
+
+    def run(self) -> Tuple[bool, Optional[str], Optional[str]]:
+        try:
+            path = None
+            for filename, info, files_to_move in self.calls:
+                path = self._post_process(filename, info, files_to_move).get('filepath') or path
+            # archive chỉ ghi khi file cuối đã xong (lần sau không bỏ qua video hỏng)
+            if self.archive_path and self.info and self.info.get('id'):
+                line = yt_dlp.utils.make_archive_id(self.info.get('extractor_key') or 'Youtube', self.info['id'])
+                with _archive_lock, open(self.archive_path, 'a', encoding='utf-8') as fh:
+                    fh.write(line + '\n')
+            return True, path, None
+        except Exception as e:
+            return False, None, f'Hậu xử lý: {e}'
+        finally:
+            self.ydl.close()
+
+    def discard(self) -> None:
+        """Bỏ job chưa chạy (bị dừng): file đã tải giữ lại, lần resume tải/ghép lại."""
+        self.ydl.close()
+
 def download_video(
     video: str, out_folder: str = 'downloads',
     quality: str = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best',
@@ -265,8 +954,13 @@ def download_video(
     retries: int = 10, fragment_retries: int = 10,
     sleep_interval: Optional[float] = None, max_sleep_interval: Optional[float] = None,
     progress_callback: Optional[Callable[[dict], None]] = None,
-    log_func: Optional[Callable[[str], None]] = None, stop_event: Optional[object] = None
+    log_func: Optional[Callable[[str], None]] = None, stop_event: Optional[object] = None,
+    lease: Optional[object] = None,
+    postprocess: Optional[Callable[[_PostProcessJob], None]] = None
 ) -> Tuple[bool, Optional[str], Optional[str]]:
+    """lease: slot của DownloadScheduler (số mảnh, ratelimit chỉnh trong lúc tải).
+    postprocess: nhận phần hậu xử lý để chạy ở nơi khác (trả về ngay sau khi tải
+    xong, đường dẫn None); None = chạy luôn trong lượt tải như trước."""
     if not video: return False, None, 'Thiếu video ID/URL'
     url = f'https://www.youtube.com/watch?v={video}' if re.match(r'^[0-9A-Za-z_-]{11}$', video) else video
     ydl_opts = _build_ydl_opts_for_download(
@@ -278,11 +972,14 @@ def download_video(
         retries=retries, fragment_retries=fragment_retries, sleep_interval=sleep_interval, max_sleep_interval=max_sleep_interval
     )
 
+    last_log = [0.0]
+
     def _hook(d):
         if stop_event and hasattr(stop_event, "is_set") and stop_event.is_set():
-            raise yt_dlp.utils.DownloadError("Cancelled by user")
+            raise yt_dlp.utils.DownloadError(CANCELLED)
+        if lease: lease.report(d)
         if progress_callback:
-            payload = {'phase': d.get('status')}
+            payload = {'phase': d.get('status'), 'id': (d.get('info_dict') or {}).get('id') or video}
             if d.get('status') == 'downloading':
                 total = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
                 downloaded = d.get('downloaded_bytes') or 0
@@ -293,7 +990,9 @@ def download_video(
                 payload.update({'filename': d.get('filename')})
             try: progress_callback(payload)
             except Exception: pass
-        if log_func and d.get('status') == 'downloading':
+        # Dòng log tiến độ tối đa mỗi giây một lần (hook được gọi hàng chục lần/giây)
+        if log_func and d.get('status') == 'downloading' and time.monotonic() - last_log[0] >= 1.0:
+            last_log[0] = time.monotonic()
             info = []
             total = d.get('total_bytes') or d.get('total_bytes_estimate')
             if total and d.get('downloaded_bytes'):
@@ -305,9 +1004,17 @@ def download_video(
             if info: log_func('[Downloader] ' + ' | '.join(info))
 
     ydl_opts['progress_hooks'] = [_hook]
+    if lease: lease.bind(ydl_opts)
+    if postprocess: ydl_opts.pop('download_archive', None)  # ghi sau khi hậu xử lý xong
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        ydl = yt_dlp.YoutubeDL(ydl_opts)
+        job = _PostProcessJob(ydl, download_archive_path) if postprocess else None
+        try:
             info = ydl.extract_info(url, download=True)
+            if job and job.calls:
+                job.info = info; ydl = None  # job đóng ydl khi chạy xong
+                postprocess(job)
+                return True, None, None
             out_path = None
             if info:
                 if '_filename' in info: out_path = info.get('_filename')
@@ -319,6 +1026,8 @@ def download_video(
                         f"{Utils.sanitize_filename(info.get('title',''))} [{info.get('id','')}].{ext}"
                     )
             return True, out_path, None
+        finally:
+            if ydl is not None: ydl.close()
     except Exception as e:
         if log_func: log_func(f'[Downloader] Lỗi: {e}')
         return False, None, str(e)
@@ -343,6 +1052,67 @@ def _expand_video_ids_from_url(url: str) -> List[str]:
         pass
     return ids
 
+# File đã tải xong: "<uploader> - <title> [<id>].<ext>" (bỏ qua .part, .f137.mp4...)
+_DOWNLOADED_FILE_RE = re.compile(r'\[([0-9A-Za-z_-]{11})\]\.([A-Za-z0-9]+)$')
+_AUDIO_EXTS = {'mp3', 'm4a', 'opus', 'ogg', 'aac', 'wav', 'flac'}
+_VIDEO_EXTS = {'mp4', 'mkv', 'webm', 'mov', 'flv', 'avi'}
+
+def _known_downloads(out_folder: str, archive_path: Optional[str], audio_only: bool) -> Dict[str, Optional[str]]:
+    """Video đã tải: {ID: đường dẫn file (None nếu chỉ có trong archive)}.
+    Đọc một lần trước khi chia việc để ID đã có không chiếm slot worker."""
+    known: Dict[str, Optional[str]] = {}
+    if archive_path and os.path.exists(archive_path):
+        with open(archive_path, encoding='utf-8', errors='ignore') as fh:
+            for line in fh:
+                parts = line.split()
+                if len(parts) == 2 and parts[0] == 'youtube': known[parts[1]] = None
+    exts = _AUDIO_EXTS if audio_only else _VIDEO_EXTS
+    try:
+        with os.scandir(out_folder) as it:
+            for entry in it:
+                m = _DOWNLOADED_FILE_RE.search(entry.name)
+                if m and m.group(2).lower() in exts and entry.is_file():
+                    known[m.group(1)] = entry.path
+    except OSError:
+        pass
+    return known
+
+DOWNLOAD_ORDERS = ('input', 'shortest', 'largest')
+
+def _probe_download_meta(ids: List[str], stop_event: Optional[object] = None) -> Dict[str, dict]:
+    """Thời lượng / dung lượng dự kiến của từng video để sắp thứ tự tải.
+    Dùng lại info trong cache (thời lượng không đổi), phần còn lại lấy song song."""
+    policy = CachePolicy('downloader')
+    meta = {vid: {'duration': info.get('duration')}
+            for vid, info in policy.lookup(ids, KIND_INFO).items()}
+    missing = [vid for vid in ids if vid not in meta and VIDEO_ID_RE.match(vid)]
+    fresh = {}
+    def probe(vid):
+        if _stopped(stop_event): return vid, None
+        return vid, get_video_info(vid)
+    ydls = YdlPool()
+    try:
+        with ThreadPoolExecutor(max_workers=min(DEFAULT_IO_CONCURRENCY, max(1, len(missing))),
+                                initializer=ydls.bind) as ex:
+            for vid, info in ex.map(probe, missing):
+                if not info or 'error' in info: continue
+                meta[vid] = {'duration': info.get('duration'),
+                             'size': info.get('filesize') or info.get('filesize_approx')}
+                fresh[vid] = normalize_info(info)
+    finally:
+        ydls.close()
+    policy.store(fresh, KIND_INFO)
+    return meta
+
+def _order_for_download(ids: List[str], meta: Dict[str, dict], order: str) -> List[str]:
+    """Sắp theo dung lượng nếu mọi video đều biết, không thì theo thời lượng;
+    video không rõ luôn xếp cuối."""
+    field = 'size' if ids and all(meta.get(v, {}).get('size') for v in ids) else 'duration'
+    known = [v for v in ids if meta.get(v, {}).get(field)]
+    unknown = [v for v in ids if not meta.get(v, {}).get(field)]
+    known.sort(key=lambda v: meta[v][field], reverse=(order == 'largest'))
+    return known + unknown
+
 def run_downloader(
     input_value: Union[str, List[str]], out_folder: str,
     quality: str = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best',
@@ -351,8 +1121,20 @@ def run_downloader(
     progress_callback: Optional[Callable[[int, int], None]] = None,
     detail_callback: Optional[Callable[[dict], None]] = None,
     log_func: Optional[Callable[[str, str], None]] = None,
-    stop_event: Optional[object] = None, enable_aria2: bool = False, use_archive: bool = True
+    stop_event: Optional[object] = None, enable_aria2: bool = False, use_archive: bool = True,
+    bandwidth_mb: Optional[float] = None, postprocess_workers: Optional[int] = None,
+    order: str = 'input', resume: bool = False
 ) -> Optional[str]:
+    """max_workers: số lượt tải song song tối đa (trần MAX_DOWNLOAD_WORKERS);
+    bandwidth_mb: băng thông tổng mục tiêu (MB/s), None = tự dò theo tốc độ đo được;
+    postprocess_workers: số job ffmpeg chạy cùng lúc (mặc định nửa số CPU). Tải và
+    hậu xử lý là hai chặng nối tiếp: slot mạng nhận video tiếp ngay khi tải xong.
+    order: 'input' | 'shortest' | 'largest' (theo metadata lấy khi lập kế hoạch).
+    Manifest (ID, thời lượng/dung lượng, trạng thái, đường dẫn) ghi dần vào nhật ký
+    cạnh Download_Report.xlsx; resume=True bỏ qua video đã xong, không dò lại."""
+    if order not in DOWNLOAD_ORDERS:
+        raise ValueError(f"order phải là một trong {DOWNLOAD_ORDERS}")
+    get_limiter().reopen()  # _probe_download_meta đi qua limiter
     os.makedirs(out_folder, exist_ok=True)
     archive_path = os.path.join(out_folder, 'download_archive.txt') if use_archive else None
 
@@ -377,39 +1159,133 @@ def run_downloader(
     else:
         _log('Input không hợp lệ'); return None
 
-    total = len(id_list)
+    # Chuẩn hoá + khử trùng: mỗi video chỉ tải một lần, báo cáo giữ mọi dòng gốc
+    uniq = dedupe_ids(id_list, keep_urls=True)
+    if uniq.duplicates or uniq.invalid: _log(uniq.summary())
+    ids = uniq.unique; total = len(ids)
     if total == 0:
         _log('Không có mục nào để tải'); return None
     if progress_callback: progress_callback(0, total)
 
-    results, done_counter = [], 0
+    outcome: Dict[str, Tuple[bool, Optional[str], Optional[str]]] = {}
+    done_counter = 0
 
-    def _task(vid):
-        return download_video(
-            vid, out_folder=out_folder, quality=quality, audio_only=audio_only,
-            concurrent_frags=concurrent_frags, cookies_file=cookies_file, proxy=proxy,
-            progress_callback=detail_callback, log_func=_log, stop_event=stop_event,
-            download_archive_path=archive_path, enable_aria2=enable_aria2
-        )
-
-    if total == 1 or max_workers <= 1:
-        ok, path, err = _task(id_list[0]); done_counter += 1
+    # Đã có trong archive / thư mục đích: báo bỏ qua ngay, không vào pool
+    known = _known_downloads(out_folder, archive_path, audio_only)
+    skipped = {vid: known[vid] for vid in ids if vid in known}
+    if skipped:
+        _log(f'Bỏ qua {len(skipped)}/{total} video đã tải trước đó')
+        ids = [vid for vid in ids if vid not in skipped]
+        done_counter = len(skipped)
         if progress_callback: progress_callback(done_counter, total)
-        results.append({'ID/URL': id_list[0], 'Trạng thái': 'OK' if ok else f'Error: {err}', 'Đường dẫn': path})
-    else:
-        workers = max(1, min(max_workers, 4))
-        with ThreadPoolExecutor(max_workers=workers) as ex:
-            futures = {ex.submit(_task, vid): vid for vid in id_list}
-            for fut in as_completed(futures):
-                vid = futures[fut]
-                ok, path, err = fut.result(); done_counter += 1
-                if progress_callback: progress_callback(done_counter, total)
-                results.append({'ID/URL': vid, 'Trạng thái': 'OK' if ok else f'Error: {err}', 'Đường dẫn': path})
-
-    if total == 1: return None
+
+    # Manifest của lượt tải: mỗi video một dòng khi lập kế hoạch và khi xong
+    out_report = os.path.join(out_folder, 'Download_Report.xlsx')
+    manifest = open_journal(out_report, resume, lambda m, prefix='': _log(m)) if len(id_list) > 1 else None
+    meta: Dict[str, dict] = {}
+    if manifest and manifest.rows:
+        for r in manifest.rows: meta.setdefault(r.get('id'), {}).update(r)
+        manifest.rows = []
+        finished = [vid for vid in ids if meta.get(vid, {}).get('state') == 'done']
+        for vid in finished: outcome[vid] = (True, meta[vid].get('path'), None)
+        ids = [vid for vid in ids if vid not in outcome]
+        done_counter += len(finished)
+        if progress_callback and finished: progress_callback(done_counter, total)
+    if order != 'input' and ids:
+        unplanned = [vid for vid in ids if 'duration' not in meta.get(vid, {})]
+        if unplanned:
+            _log(f'Lập kế hoạch: lấy thời lượng/dung lượng {len(unplanned)} video')
+            for vid, m in _probe_download_meta(unplanned, stop_event).items():
+                meta.setdefault(vid, {}).update(m)
+                if manifest: manifest.append({'id': vid, 'state': 'planned', **m})
+        ids = _order_for_download(ids, meta, order)
+        _log(f'Thứ tự tải: {"ngắn/nhỏ trước" if order == "shortest" else "dài/lớn trước"}')
+    elif manifest:
+        for vid in ids:
+            if vid not in meta: manifest.append({'id': vid, 'state': 'planned'})
+
+    scheduler = DownloadScheduler(max_workers, concurrent_frags,
+                                  bandwidth_mb * 1024 * 1024 if bandwidth_mb else None, _log)
+    _log(scheduler.describe())
+    # ffmpeg chạy thành process con nên thread là đủ, không bị GIL giới hạn
+    pp_workers = max(1, postprocess_workers or (os.cpu_count() or 2) // 2)
+    pp_pool = ThreadPoolExecutor(max_workers=pp_workers)
+    record_lock = threading.Lock()
+    pp_jobs: Dict[str, tuple] = {}  # vid -> (future, job) của hậu xử lý
+
+    def _record(vid, res):
+        nonlocal done_counter
+        with record_lock:
+            outcome[vid] = res; done_counter += 1
+            if manifest:
+                state = 'done' if res[0] else 'cancelled' if CANCELLED in (res[2] or '') else 'error'
+                manifest.append({'id': vid, 'state': state, 'path': res[1], 'error': res[2]})
+            if progress_callback: progress_callback(done_counter, total)
+
+    def _postprocess(vid, job):
+        if _stopped(stop_event):
+            job.discard(); _record(vid, (False, None, CANCELLED)); return
+        ok, path, err = job.run()
+        if not ok: _log(f'Lỗi: {err}')
+        _record(vid, (ok, path, err))
+
+    def _task(vid):
+        lease = scheduler.acquire(vid, stop_event)
+        if lease is None: _record(vid, (False, None, CANCELLED)); return
+        handed = []
+        try:
+            res = download_video(
+                vid, out_folder=out_folder, quality=quality, audio_only=audio_only,
+                concurrent_frags=lease.frags, cookies_file=cookies_file, proxy=proxy,
+                progress_callback=detail_callback, log_func=_log, stop_event=stop_event,
+                download_archive_path=archive_path, enable_aria2=enable_aria2, lease=lease,
+                postprocess=handed.append
+            )
+        finally:
+            scheduler.release(lease)
+        if handed: pp_jobs[vid] = (pp_pool.submit(_postprocess, vid, handed[0]), handed[0])
+        else: _record(vid, res)
+
+    failed = False
+    try:
+        if len(ids) <= 1 or scheduler.max_workers <= 1:
+            for vid in ids:
+                if stop_event and stop_event.is_set(): break
+                _task(vid)
+        else:
+            # Pool đủ số luồng tối đa; scheduler quyết định bao nhiêu lượt được tải cùng lúc
+            with ThreadPoolExecutor(max_workers=min(scheduler.max_workers, len(ids))) as ex:
+                for fut in [ex.submit(_task, vid) for vid in ids]: fut.result()
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        # Chờ các job ffmpeg đang chạy; dừng/lỗi thì bỏ các job còn trong hàng đợi
+        pp_pool.shutdown(wait=True, cancel_futures=failed or _stopped(stop_event))
+        for vid, (fut, job) in pp_jobs.items():
+            if fut.cancelled():
+                job.discard(); _record(vid, (False, None, CANCELLED))
+        if failed and manifest: manifest.close()  # giữ lại để resume
+
+    if scheduler.peak_bps: _log(f'Tốc độ tổng cao nhất: {scheduler.peak_bps / 1024 / 1024:.2f} MB/s')
+    if len(id_list) == 1: return None
+    vid_at = {pos: vid for vid, positions in uniq.rows.items() for pos in positions}
+    results = []
+    for pos, raw in enumerate(id_list):
+        vid = vid_at.get(pos)
+        if vid in skipped:
+            results.append({'ID/URL': raw, 'Trạng thái': 'Bỏ qua: đã tải', 'Đường dẫn': skipped[vid]}); continue
+        ok, path, err = outcome.get(vid, (False, None, 'ID không hợp lệ' if vid is None else 'Chưa tải'))
+        results.append({'ID/URL': raw, 'Trạng thái': 'OK' if ok else f'Error: {err}', 'Đường dẫn': path})
     try:
         df_out = pd.DataFrame(results); df_out.insert(0, 'Số thứ tự', range(1, len(df_out)+1))
-        out_report = os.path.join(out_folder, 'Download_Report.xlsx'); df_out.to_excel(out_report, index=False)
-        _log(f'Đã lưu báo cáo: {out_report}'); return out_report
+        df_out.to_excel(out_report, index=False)
+        _log(f'Đã lưu báo cáo: {out_report}')
     except Exception as e:
-        _log(f'Lỗi lưu báo cáo: {e}'); return None
+        _log(f'Lỗi lưu báo cáo: {e}'); out_report = None
+    if manifest:
+        if out_report and not _stopped(stop_event) and all(r[0] for r in outcome.values()):
+            manifest.discard()
+        else:
+            manifest.close(); _log('Manifest còn giữ lại: chạy lại với resume để tải tiếp phần chưa xong')
+    return out_report
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+core/channel_state.py
+Lưu "watermark" của từng kênh cho chế độ scrape tăng dần (delta):
+các video ID mới nhất đã thấy ở mỗi tab (shorts/videos), ngày xuất bản mới
+nhất và file kết quả lần trước.
+
+Lưu nhiều ID gần nhất thay vì chỉ một ID, để video mới nhất bị xoá/ẩn
+thì lần sau vẫn nhận ra được điểm dừng.
+Dùng chung file SQLite với video_cache (bảng riêng).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from .video_cache import default_cache_path
+except ImportError:  # chạy qua cli_wrapper (core/ nằm trong sys.path)
+    from video_cache import default_cache_path
+
+# Số ID mới nhất giữ lại cho mỗi tab
+KNOWN_IDS_PER_TAB = 50
+
+
+class ChannelState:
+    """Watermark theo kênh: {'known': {tab: [id mới nhất trước]}, 'newest_id',
+    'newest_date', 'output_path', 'updated_at'}"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_cache_path()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS channel_state ("
+                " channel_key TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)")
+            self._conn.commit()
+
+    def get(self, channel_key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM channel_state WHERE channel_key = ?", (channel_key,)).fetchone()
+        if not row:
+            return None
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            return None
+
+    def update(self, channel_key: str, listed: Dict[str, Iterable[str]],
+               output_path: str, newest_date: Optional[str] = None) -> dict:
+        """
+        Ghi watermark mới. listed: {tab: ID vừa liệt kê, mới nhất trước}; các ID
+        đã biết trước đó được nối phía sau rồi cắt còn KNOWN_IDS_PER_TAB.
+        """
+        prev = self.get(channel_key) or {}
+        known: Dict[str, List[str]] = {}
+        for tab in set(prev.get("known", {})) | set(listed):
+            ids = list(listed.get(tab, [])) + list(prev.get("known", {}).get(tab, []))
+            known[tab] = list(dict.fromkeys(i for i in ids if i))[:KNOWN_IDS_PER_TAB]
+
+        heads = [ids[0] for ids in (list(listed.get(t, [])) for t in ("videos", "shorts")) if ids]
+        data = {
+            "known": known,
+            "newest_id": heads[0] if heads else prev.get("newest_id"),
+            "newest_date": newest_date or prev.get("newest_date"),
+            "output_path": output_path,
+            "updated_at": time.time(),
+        }
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO channel_state (channel_key, data, updated_at) VALUES (?, ?, ?)",
+                (channel_key, json.dumps(data, ensure_ascii=False), data["updated_at"]))
+            self._conn.commit()
+        return data
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+core/checkpoint.py
+Nhật ký tạm (JSONL) cho các lượt chạy dài của Checker và Enricher.
+
+- Mỗi kết quả được ghi thêm một dòng ngay khi có, nên dừng giữa chừng
+  (stop_event) hoặc crash thì phần đã xong vẫn còn trên đĩa
+- Chạy lại với resume=True: đọc nhật ký, bỏ qua các video đã xong
+- Chạy xong: gộp nhật ký vào file Excel cuối rồi xoá nhật ký
+
+Dòng cuối bị ghi dở (crash khi đang ghi) được bỏ qua khi đọc.
+"""
+import json
+import os
+import threading
+from typing import List, Optional
+
+# Số dòng giữa hai lần fsync (flush luôn chạy sau mỗi dòng)
+FSYNC_EVERY = 100
+
+JOURNAL_SUFFIX = ".partial.jsonl"
+
+
+def journal_path_for(output_path: str) -> str:
+    """Nhật ký nằm cạnh file kết quả: <tên file>.partial.jsonl"""
+    return os.path.splitext(output_path)[0] + JOURNAL_SUFFIX
+
+
+class CheckpointJournal:
+    """Ghi/đọc nhật ký kết quả dạng JSONL, an toàn khi gọi từ nhiều thread."""
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending_sync = 0
+        self.rows: List[dict] = self._load() if resume else []
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # resume: ghi tiếp; không resume: bắt đầu nhật ký mới
+        self._fh = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def _load(self) -> List[dict]:
+        if not os.path.exists(self.path):
+            return []
+        rows = []
+        with open(self.path, encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    continue
+        return rows
+
+    def append(self, row: dict) -> None:
+        line = json.dumps(row, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._fh is None:
+                return
+            self._fh.write(line + "\n")
+            self._fh.flush()
+            self._pending_sync += 1
+            if self._pending_sync >= FSYNC_EVERY:
+                os.fsync(self._fh.fileno())
+                self._pending_sync = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is None:
+                return
+            try:
+                self._fh.flush()
+                os.fsync(self._fh.fileno())
+            finally:
+                self._fh.close()
+                self._fh = None
+
+    def discard(self) -> None:
+        """Đóng và xoá nhật ký (gọi sau khi đã ghi file kết quả cuối)."""
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def open_journal(output_path: Optional[str], resume: bool,
+                 log_func=None, prefix: str = "") -> Optional[CheckpointJournal]:
+    """Mở nhật ký cho output_path; None nếu không có đường dẫn hoặc không ghi được."""
+    if not output_path:
+        return None
+    try:
+        journal = CheckpointJournal(journal_path_for(output_path), resume)
+    except OSError as e:
+        if log_func:
+            log_func(f"Không mở được nhật ký tạm ({e}), chạy không checkpoint", prefix=prefix)
+        return None
+    if journal.rows and log_func:
+        log_func(f"Tiếp tục: đã có {len(journal.rows)} kết quả từ lần chạy trước", prefix=prefix)
+    return journal
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+core/download_scheduler.py
+Điều phối số lượt tải song song và số mảnh (fragment) theo băng thông tổng.
+
+- Mỗi lượt tải xin một slot (lease); bắt đầu 2 slot, số slot mở thay đổi theo
+  tốc độ tổng đo được từ progress hook của mọi lượt đang tải
+- Có mục tiêu băng thông (target_bps): chia đều mục tiêu cho các lượt đang tải
+  (ratelimit của yt-dlp, cập nhật ngay trong lúc tải), còn dư thì mở thêm slot
+- Không có mục tiêu: mở thêm slot khi tổng tốc độ còn tăng, bớt khi mạng đã
+  bão hoà (thêm luồng mà tổng tốc độ giảm)
+- Tổng số mảnh đồng thời giữ quanh MAX_TOTAL_FRAGS, chia cho số slot
+
+aria2c tự quản lý kết nối nên không nhận ratelimit cập nhật giữa chừng.
+"""
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# Trần số lượt tải song song (giới hạn của người dùng không vượt quá)
+MAX_DOWNLOAD_WORKERS = 16
+# Tổng số mảnh tải đồng thời của mọi lượt (4 luồng x 8 mảnh như mặc định cũ)
+MAX_TOTAL_FRAGS = 32
+# Mỗi lượt tải không nên bị chia ít hơn mức này khi có mục tiêu băng thông
+MIN_SHARE_BPS = 256 * 1024
+ADJUST_INTERVAL = 2.0
+SPEED_STALE = 5.0
+
+
+class DownloadLease:
+    """Slot của một lượt tải: số mảnh được cấp, ratelimit hiện tại, báo tốc độ."""
+
+    def __init__(self, scheduler: "DownloadScheduler", key: str, frags: int):
+        self.scheduler = scheduler
+        self.key = key
+        self.frags = frags
+        self.ratelimit: Optional[int] = None
+        self._opts: Optional[dict] = None
+
+    def bind(self, ydl_opts: dict) -> dict:
+        """Gắn ydl_opts của lượt tải để scheduler chỉnh ratelimit trong lúc tải."""
+        self._opts = ydl_opts
+        ydl_opts['concurrent_fragment_downloads'] = self.frags
+        self._apply()
+        return ydl_opts
+
+    def _apply(self) -> None:
+        if self._opts is None:
+            return
+        if self.ratelimit:
+            self._opts['ratelimit'] = self.ratelimit
+        else:
+            self._opts.pop('ratelimit', None)
+
+    def report(self, d: dict) -> None:
+        """Gọi từ progress hook của yt-dlp."""
+        if d.get('status') == 'downloading':
+            self.scheduler.report(self.key, d.get('speed') or 0)
+
+
+class DownloadScheduler:
+    """Cấp slot tải theo băng thông tổng; an toàn khi gọi từ nhiều thread."""
+
+    def __init__(self, max_workers: int, concurrent_frags: int = 8,
+                 target_bps: Optional[float] = None, log_func: Optional[Callable[[str], None]] = None):
+        self.max_workers = max(1, min(int(max_workers), MAX_DOWNLOAD_WORKERS))
+        self.max_frags = max(1, int(concurrent_frags))
+        self.target = float(target_bps) if target_bps else None
+        self.limit = min(2, self.max_workers)
+        self.log_func = log_func
+        self.active: Dict[str, DownloadLease] = {}
+        self.waiting = 0
+        self.peak_bps = 0.0
+        self._speeds: Dict[str, tuple] = {}
+        self._best = 0.0
+        self._last_adjust = 0.0
+        self._cond = threading.Condition()
+
+    # --- slot ---
+    def acquire(self, key: str, stop_event: Optional[object] = None) -> Optional[DownloadLease]:
+        """Chờ tới khi có slot; None nếu bị dừng trong lúc chờ."""
+        with self._cond:
+            self.waiting += 1
+            try:
+                while len(self.active) >= int(self.limit):
+                    if stop_event and stop_event.is_set():
+                        return None
+                    self._cond.wait(0.5)
+            finally:
+                self.waiting -= 1
+            frags = max(1, min(self.max_frags, MAX_TOTAL_FRAGS // max(1, int(self.limit))))
+            lease = DownloadLease(self, key, frags)
+            self.active[key] = lease
+            self._rebalance()
+            return lease
+
+    def release(self, lease: DownloadLease) -> None:
+        with self._cond:
+            self.active.pop(lease.key, None)
+            self._speeds.pop(lease.key, None)
+            self._rebalance()
+            self._cond.notify_all()
+
+    # --- đo và điều chỉnh ---
+    def total_speed(self) -> float:
+        now = time.monotonic()
+        return sum(s for s, t in list(self._speeds.values()) if now - t <= SPEED_STALE)
+
+    def report(self, key: str, speed: float) -> None:
+        with self._cond:
+            now = time.monotonic()
+            self._speeds[key] = (float(speed), now)
+            if now - self._last_adjust < ADJUST_INTERVAL:
+                return
+            self._last_adjust = now
+            total = self.total_speed()
+            self.peak_bps = max(self.peak_bps, total)
+            old = int(self.limit)
+            busy = len(self.active) >= old and self.waiting > 0
+            if self.target:
+                # Mỗi lượt ít nhất MIN_SHARE_BPS; còn dư băng thông và có việc chờ thì mở thêm
+                cap = max(1, int(self.target // MIN_SHARE_BPS))
+                if total < 0.85 * self.target and busy:
+                    self.limit = min(self.max_workers, cap, old + 1)
+                elif old > cap:
+                    self.limit = cap
+            else:
+                if total > self._best * 1.1:
+                    self._best = total
+                    if busy:
+                        self.limit = min(self.max_workers, old + 1)
+                elif total < self._best * 0.7 and old > 1 and len(self.active) >= old:
+                    # Thêm luồng mà tổng tốc độ giảm: mạng đã bão hoà
+                    self.limit = old - 1
+                    self._best = total
+            if int(self.limit) != old:
+                self._rebalance()
+                self._cond.notify_all()
+                if self.log_func:
+                    self.log_func(self.describe())
+
+    def _rebalance(self) -> None:
+        """Chia mục tiêu băng thông cho các lượt đang tải (gọi khi giữ _cond)."""
+        share = int(self.target / max(1, len(self.active))) if self.target else None
+        for lease in self.active.values():
+            lease.ratelimit = share
+            lease._apply()
+
+    def describe(self) -> str:
+        text = (f"Tải: {int(self.limit)}/{self.max_workers} luồng, "
+                f"{self.total_speed() / 1024 / 1024:.2f} MB/s")
+        if self.target:
+            text += f" (mục tiêu {self.target / 1024 / 1024:.2f} MB/s)"
+        return text
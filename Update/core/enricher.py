@@ -13,11 +13,24 @@ from __future__ import annotations
 import os
 import re
 import json
+import time
 from typing import Optional, List, Dict, Tuple, Iterable, Union
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import pandas as pd
-import yt_dlp
+
+try:
+    from .ydl_pool import LatencyStats, YdlPool, extract_info
+    from .video_cache import KIND_DETAIL, CachePolicy
+    from .checkpoint import open_journal
+    from .rate_limit import get_limiter
+    from .video_ids import dedupe_ids, normalize_video_id
+except ImportError:  # chạy qua cli_wrapper (core/ nằm trong sys.path)
+    from ydl_pool import LatencyStats, YdlPool, extract_info
+    from video_cache import KIND_DETAIL, CachePolicy
+    from checkpoint import open_journal
+    from rate_limit import get_limiter
+    from video_ids import dedupe_ids, normalize_video_id
 
 
 def _read_ids(input_value: Union[str, List[str]]) -> List[str]:
@@ -69,14 +82,12 @@ def _extract_detail(url_or_id: str, include_transcript: bool = True) -> Dict:
     """Lấy metadata chi tiết 1 video bằng yt-dlp (không tải).
        Trả về dict đã chuẩn hoá các field nâng cao."""
     url = _to_watch_url(url_or_id)
-    opts = {
-        "quiet": True,
-        "skip_download": True,
-        "nocheckcertificate": True,
-        "ignoreerrors": True,
-    }
-    with yt_dlp.YoutubeDL(opts) as ydl:
-        info = ydl.extract_info(url, download=False)
+    # YoutubeDL dùng lại của thread hiện tại (xem ydl_pool), qua limiter dùng chung (rate_limit).
+    # Profile "detail" để lỗi nổi lên cho limiter; lỗi sau khi hết lượt thử thành dòng error
+    try:
+        info = get_limiter().call(extract_info, url, "detail")
+    except Exception as e:
+        return {"id": url_or_id, "error": str(e)}
 
     if not info:
         return {"id": url_or_id, "error": "Không lấy được metadata"}
@@ -138,6 +149,13 @@ def _extract_detail(url_or_id: str, include_transcript: bool = True) -> Dict:
     return out
 
 
+def _timed_detail(url_or_id: str, include_transcript: bool) -> Tuple[Dict, float]:
+    """_extract_detail kèm thời gian xử lý (giây) của video."""
+    t0 = time.perf_counter()
+    data = _extract_detail(url_or_id, include_transcript)
+    return data, time.perf_counter() - t0
+
+
 def _format_duration(seconds: Optional[Union[int, float]]) -> str:
     if seconds is None:
         return "N/A"
@@ -171,6 +189,11 @@ def _maybe_extract_id_from_url(url: str) -> Optional[str]:
     return m.group(1) if m else None
 
 
+def _cache_key(url_or_id: str) -> str:
+    """Khóa cache: video ID nếu nhận ra được, không thì chính chuỗi đầu vào."""
+    return normalize_video_id(url_or_id) or url_or_id
+
+
 def enrich(
     input_value: Union[str, List[str]],
     max_workers: int = 8,
@@ -178,37 +201,111 @@ def enrich(
     out_excel: Optional[str] = None,
     progress: Optional[callable] = None,
     log: Optional[callable] = None,
+    use_cache: bool = True,
+    force_refresh: bool = False,
+    cache_ttl_hours: Optional[float] = None,
+    resume: bool = False,
 ) -> Tuple[pd.DataFrame, Optional[str]]:
     """Batch enrichment:
-       - Đọc ID/URL từ file/list
-       - Đa luồng lấy metadata chi tiết bằng yt-dlp
+       - Đọc ID/URL từ file/list, chuẩn hoá về video ID; mỗi ID chỉ lấy một
+         lần, kết quả nhân lại cho mọi dòng trùng
+       - Có out_excel: kết quả ghi dần vào nhật ký tạm cạnh file Excel;
+         resume=True bỏ qua các video đã xong ở lần chạy trước
+       - Video còn hạn trong cache (video_cache) được dùng lại, không gọi mạng
+       - Đa luồng lấy metadata chi tiết bằng yt-dlp cho phần còn lại
        - Xuất DataFrame và (tuỳ chọn) file Excel.
     """
-    ids = _read_ids(input_value)
-    total = len(ids)
+    get_limiter().reopen()
+    raw_ids = _read_ids(input_value)
+    uniq = dedupe_ids(raw_ids, keep_urls=True)
+    ids = uniq.unique
+    total = len(raw_ids)
     if progress:
         progress(0, total)
     if log:
-        log(f"Bắt đầu enrich {total} video...", prefix="Enricher")
+        log(f"Bắt đầu enrich {total} video ({uniq.summary()})...", prefix="Enricher")
 
     rows: List[Dict] = []
     done = 0
+    latency = LatencyStats()
+
+    def add_rows(vid: str, data: Dict) -> None:
+        # một kết quả cho mọi dòng gốc cùng ID
+        nonlocal done
+        for _ in uniq.rows[vid]:
+            rows.append(dict(data))
+            done += 1
+
+    for pos in uniq.invalid:
+        rows.append({"id": raw_ids[pos], "error": "ID không hợp lệ"})
+        done += 1
+
+    journal = open_journal(out_excel, resume, log, "Enricher")
+    if journal and journal.rows:
+        finished = {}
+        for r in journal.rows:
+            finished.setdefault(r.pop("_key", None), r)
+        remaining = []
+        for vid in ids:
+            data = finished.pop(_cache_key(vid), None)
+            if data is None:
+                remaining.append(vid)
+            else:
+                add_rows(vid, data)
+        ids = remaining
+
+    policy = CachePolicy("enricher", use_cache, force_refresh, cache_ttl_hours)
+    cached = policy.lookup((_cache_key(v) for v in ids), KIND_DETAIL)
+    if include_transcript:
+        # Bản ghi lấy khi không kèm transcript thì không dùng được
+        cached = {k: v for k, v in cached.items() if "transcript_text" in v}
+    pending = []
+    for vid in ids:
+        data = cached.get(_cache_key(vid))
+        if data is None:
+            pending.append(vid)
+            continue
+        add_rows(vid, data)
+    if cached and log:
+        log(f"Cache: dùng lại {len(ids) - len(pending)}/{len(ids)} video", prefix="Enricher")
+    if progress and done:
+        progress(done, total)
+
+    fresh: Dict[str, Dict] = {}
     workers = max(1, min(max_workers, 16))
-    with ThreadPoolExecutor(max_workers=workers) as ex:
-        futures = {ex.submit(_extract_detail, vid, include_transcript): vid for vid in ids}
-        for fut in as_completed(futures):
-            vid = futures[fut]
-            try:
-                data = fut.result()
-                rows.append(data)
-            except Exception as e:
-                rows.append({"id": vid, "error": str(e)})
-            finally:
-                done += 1
+    ydls = YdlPool()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, initializer=ydls.bind) as ex:
+            futures = {ex.submit(_timed_detail, vid, include_transcript): vid for vid in pending}
+            for n, fut in enumerate(as_completed(futures), 1):
+                vid = futures[fut]
+                try:
+                    data, elapsed = fut.result()
+                    latency.add(elapsed)
+                    if "error" not in data:
+                        fresh[_cache_key(vid)] = data
+                except Exception as e:
+                    data = {"id": vid, "error": str(e)}
+                add_rows(vid, data)
+                if journal:
+                    journal.append({**data, "_key": _cache_key(vid)})
                 if progress:
                     progress(done, total)
-                if log and done % 10 == 0:
+                if log and n % 10 == 0:
                     log(f"Đã enrich {done}/{total}", prefix="Enricher")
+                if log and n % 50 == 0:
+                    log(get_limiter().describe(), prefix="Enricher")
+    finally:
+        ydls.close()
+        if journal:
+            journal.close()
+    policy.store(fresh, KIND_DETAIL)
+    for msg in policy.finish():
+        if log:
+            log(msg, prefix="Enricher")
+    if log:
+        log(latency.summary(), prefix="Enricher")
+        log(get_limiter().describe(), prefix="Enricher")
 
     # Lưu DataFrame
     df = pd.DataFrame(rows)
@@ -233,6 +330,8 @@ def enrich(
             os.makedirs(os.path.dirname(out_excel) or ".", exist_ok=True)
             df.to_excel(out_excel, index=False)
             saved_path = out_excel
+            if journal:
+                journal.discard()
             if log:
                 log(f"Đã lưu: {saved_path}", prefix="Enricher")
         except Exception as e:
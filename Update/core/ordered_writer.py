@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+core/ordered_writer.py
+Ghi kết quả Checker/Scraper ra Excel theo đúng thứ tự đầu vào, ngay trong
+lúc chạy.
+
+- Worker trả kết quả theo thứ tự hoàn thành; put(pos, row) giữ các dòng đến
+  sớm trong bộ đệm sắp xếp lại, dòng nào tới lượt thì ghi ngay ra đĩa
+- Bộ đệm có giới hạn: vượt max_buffer thì dồn phần đang chờ sang SQLite tạm
+  (một video chậm không kéo cả chục nghìn dòng nằm trong RAM)
+- Workbook write-only của openpyxl: dòng đã ghi không giữ trong bộ nhớ
+- Ghi vào file tạm cạnh file đích, xong mới thay thế (file cũ còn nguyên nếu dừng giữa chừng)
+- HeldRows: dòng chưa biết vị trí (Video chờ tab Shorts liệt kê xong), cùng
+  giới hạn bộ nhớ và cách dồn sang SQLite tạm
+"""
+import json
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+DEFAULT_MAX_BUFFER = 2000
+
+# Giống header mặc định của DataFrame.to_excel
+_HEADER_FONT = Font(bold=True)
+_HEADER_BORDER = Border(left=Side(style='thin'), right=Side(style='thin'),
+                        top=Side(style='thin'), bottom=Side(style='thin'))
+_HEADER_ALIGN = Alignment(horizontal='center', vertical='top')
+
+
+def _open_spill(schema: str):
+    fd, path = tempfile.mkstemp(suffix=".sqlite3", prefix="aio_reorder_")
+    os.close(fd)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute(schema)
+    return conn, path
+
+
+def _drop_spill(conn: sqlite3.Connection, path: str) -> None:
+    conn.close()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _clean(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+class OrderedExcelWriter:
+    """put(pos, row) theo thứ tự bất kỳ, file ra theo thứ tự pos (0, 1, 2...)."""
+
+    def __init__(self, path: str, columns: List[str], max_buffer: int = DEFAULT_MAX_BUFFER):
+        self.path = path
+        self.columns = list(columns)
+        self.max_buffer = max(1, max_buffer)
+        self.written = 0
+        self._next = 0
+        self._buffer: Dict[int, dict] = {}
+        self._spill: Optional[sqlite3.Connection] = None
+        self._spill_path: Optional[str] = None
+        self._spill_count = 0
+        self._lock = threading.Lock()
+
+        folder = os.path.dirname(path) or "."
+        os.makedirs(folder, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(suffix=".xlsx", prefix=".~", dir=folder)
+        os.close(fd)
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet("Sheet1")
+        header = []
+        for name in self.columns:
+            cell = WriteOnlyCell(self._ws, value=name)
+            cell.font, cell.border, cell.alignment = _HEADER_FONT, _HEADER_BORDER, _HEADER_ALIGN
+            header.append(cell)
+        self._ws.append(header)
+
+    def _write(self, row: dict) -> None:
+        self._ws.append([_clean(row.get(c)) for c in self.columns])
+        self.written += 1
+
+    def write_rows(self, rows: Iterable[dict]) -> None:
+        """Ghi thẳng các dòng không thuộc luồng sắp xếp (vd. dòng cũ khi gộp delta)."""
+        with self._lock:
+            for row in rows:
+                self._write(row)
+
+    def put(self, pos: int, row: dict) -> None:
+        with self._lock:
+            if pos < self._next:
+                return
+            self._buffer[pos] = row
+            self._drain()
+            if len(self._buffer) > self.max_buffer:
+                self._spill_buffer()
+
+    def skip(self, pos: int) -> None:
+        """Vị trí sẽ không có kết quả (worker trả None): không chờ nữa."""
+        self.put(pos, None)
+
+    def _drain(self) -> None:
+        while True:
+            if self._next in self._buffer:
+                row = self._buffer.pop(self._next)
+            elif self._spill_count:
+                row = self._pop_spilled(self._next)
+                if row is False:
+                    return
+            else:
+                return
+            if row is not None:
+                self._write(row)
+            self._next += 1
+
+    def _spill_buffer(self) -> None:
+        if self._spill is None:
+            self._spill, self._spill_path = _open_spill(
+                "CREATE TABLE rows (pos INTEGER PRIMARY KEY, data TEXT)")
+        self._spill.executemany(
+            "INSERT OR REPLACE INTO rows (pos, data) VALUES (?, ?)",
+            [(p, json.dumps(r, ensure_ascii=False, default=str)) for p, r in self._buffer.items()])
+        self._spill.commit()
+        self._spill_count += len(self._buffer)
+        self._buffer.clear()
+
+    def _pop_spilled(self, pos: int):
+        found = self._spill.execute("SELECT data FROM rows WHERE pos = ?", (pos,)).fetchone()
+        if not found:
+            return False
+        self._spill.execute("DELETE FROM rows WHERE pos = ?", (pos,))
+        self._spill_count -= 1
+        return json.loads(found[0])
+
+    def _close_spill(self) -> None:
+        if self._spill is not None:
+            _drop_spill(self._spill, self._spill_path)
+            self._spill = None
+
+    def close(self) -> str:
+        """Ghi nốt các dòng còn chờ (bỏ qua vị trí thiếu), lưu và thay file đích."""
+        with self._lock:
+            if self._spill_count:
+                self._spill_buffer()
+                for _, data in self._spill.execute("SELECT pos, data FROM rows ORDER BY pos"):
+                    row = json.loads(data)
+                    if row is not None:
+                        self._write(row)
+            else:
+                for pos in sorted(self._buffer):
+                    if self._buffer[pos] is not None:
+                        self._write(self._buffer[pos])
+            self._buffer.clear()
+            self._close_spill()
+            self._wb.save(self._tmp_path)
+            os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        """Bỏ file tạm, giữ nguyên file đích (gọi khi bị dừng giữa chừng)."""
+        with self._lock:
+            self._buffer.clear()
+            self._close_spill()
+            try:
+                self._ws.close()  # đóng file tạm của sheet write-only
+            except Exception:
+                pass
+            try:
+                os.remove(self._tmp_path)
+            except OSError:
+                pass
+
+
+class HeldRows:
+    """Dòng chờ chốt vị trí, lấy lại theo thứ tự add(); quá max_buffer dòng
+    thì phần trong RAM dồn sang SQLite tạm."""
+
+    def __init__(self, max_buffer: int = DEFAULT_MAX_BUFFER):
+        self.max_buffer = max(1, max_buffer)
+        self._rows: List[dict] = []
+        self._spill: Optional[sqlite3.Connection] = None
+        self._spill_path: Optional[str] = None
+        self._spill_count = 0
+
+    def __len__(self) -> int:
+        return len(self._rows) + self._spill_count
+
+    def add(self, row: dict) -> None:
+        self._rows.append(row)
+        if len(self._rows) > self.max_buffer:
+            if self._spill is None:
+                self._spill, self._spill_path = _open_spill(
+                    "CREATE TABLE rows (seq INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT)")
+            self._spill.executemany(
+                "INSERT INTO rows (data) VALUES (?)",
+                [(json.dumps(r, ensure_ascii=False, default=str),) for r in self._rows])
+            self._spill.commit()
+            self._spill_count += len(self._rows)
+            self._rows = []
+
+    def pop_all(self) -> Iterator[dict]:
+        """Lấy hết (phần đã dồn ra đĩa trước, theo thứ tự add) và làm rỗng.
+        Phần trên đĩa đọc từng lô để không nạp lại cả bảng một lần."""
+        rows, self._rows = self._rows, []
+        if self._spill_count:
+            spill, path = self._spill, self._spill_path
+            self._spill, self._spill_path, self._spill_count = None, None, 0
+            try:
+                cursor = spill.execute("SELECT data FROM rows ORDER BY seq")
+                while True:
+                    batch = cursor.fetchmany(self.max_buffer)
+                    if not batch:
+                        break
+                    for (data,) in batch:
+                        yield json.loads(data)
+            finally:
+                _drop_spill(spill, path)
+        yield from rows
+
+    def close(self) -> None:
+        self._rows = []
+        if self._spill is not None:
+            _drop_spill(self._spill, self._spill_path)
+            self._spill, self._spill_path, self._spill_count = None, None, 0
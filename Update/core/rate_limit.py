@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+core/rate_limit.py
+Giới hạn tốc độ gọi YouTube dùng chung cho mọi worker trong process
+(get_video_info, enricher._extract_detail, yt_internal._post_json).
+
+- Token bucket: tối đa `rate` request/giây, cho phép dồn `burst` request
+- AIMD: mỗi request thành công tăng nhẹ rate và số request đồng thời
+  (+1 mỗi "vòng"), gặp 429 / trang "xác nhận không phải bot" thì giảm một nửa
+- Bị chặn: mọi worker cùng tạm dừng một khoảng backoff mũ có jitter, request
+  bị chặn được thử lại tối đa max_retries lần
+
+Dừng giữa chừng: cancel() làm mọi lần chờ lượt (kể cả đang backoff) thoát
+ngay bằng Cancelled; reopen() khi bắt đầu lượt chạy mới.
+
+Mỗi process có limiter riêng; vì vậy khi limiter bật, scraper/checker chạy
+thread thay cho mode process (ScraperChecker._effective_mode).
+Đặt AIO_RATE_LIMIT=0 để tắt; AIO_RATE / AIO_RATE_MAX đổi rate đầu / trần.
+"""
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from typing import Callable, Optional
+
+DEFAULT_RATE = float(os.environ.get("AIO_RATE", "10"))
+MAX_RATE = float(os.environ.get("AIO_RATE_MAX", "50"))
+MIN_RATE = 0.2
+MAX_CONCURRENCY = 64
+ENABLED = os.environ.get("AIO_RATE_LIMIT", "1") != "0"
+
+_THROTTLE_RE = re.compile(
+    r"\b429\b|too many requests|not a bot|không phải là bot|unusual traffic|rate.?limit", re.I)
+
+
+class Throttled(Exception):
+    """YouTube trả về trang/response chặn dù HTTP không lỗi (vd. bot-check)."""
+
+
+class Cancelled(Exception):
+    """Lượt chạy đã bị dừng (limiter.cancel()), không gửi request nữa."""
+
+
+def is_throttled(error) -> bool:
+    """Lỗi (exception hoặc chuỗi) có phải do bị YouTube giới hạn không."""
+    if isinstance(error, Throttled):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status == 429:
+        return True
+    return bool(_THROTTLE_RE.search(str(error or "")))
+
+
+class RateLimiter:
+    """Token bucket + AIMD, an toàn khi gọi từ nhiều thread và từ event loop."""
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: Optional[float] = None,
+                 min_rate: float = MIN_RATE, max_rate: float = MAX_RATE,
+                 max_concurrency: int = MAX_CONCURRENCY, max_retries: int = 4,
+                 backoff_base: float = 2.0, backoff_cap: float = 120.0):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, rate))
+        self.min_rate, self.max_rate = min_rate, max_rate
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base, self.backoff_cap = backoff_base, backoff_cap
+        self.in_flight = 0
+        self.throttle_count = 0
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._streak = 0
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    # --- token bucket ---
+    def _try_acquire(self) -> float:
+        """Lấy một lượt; trả về 0 nếu được, không thì số giây nên chờ."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self.in_flight >= int(self.limit):
+                return 0.05
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+            self.in_flight += 1
+            return 0.0
+
+    def acquire(self) -> None:
+        while True:
+            if self._cancelled.is_set():
+                raise Cancelled("Đã dừng")
+            wait = self._try_acquire()
+            if not wait:
+                return
+            self._cancelled.wait(min(wait, 0.5))
+
+    async def acquire_async(self) -> None:
+        while True:
+            if self._cancelled.is_set():
+                raise Cancelled("Đã dừng")
+            wait = self._try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(min(wait, 0.5))
+
+    # --- AIMD ---
+    def release(self, throttled: bool = False) -> float:
+        """Trả lượt; throttled=True thì giảm rate và tạm dừng. Trả về số giây backoff."""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            now = time.monotonic()
+            if not throttled:
+                self._streak = 0
+                self.rate = min(self.max_rate, self.rate + 1.0 / self.rate)
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+                return 0.0
+            self.throttle_count += 1
+            self._streak += 1
+            # Nhiều worker cùng dính 429 một lúc: chỉ giảm một lần mỗi đợt
+            if now - self._last_decrease > 1.0:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.limit = max(1.0, self.limit / 2)
+                self._tokens = min(self._tokens, 0.0)
+                self._last_decrease = now
+            delay = min(self.backoff_cap, self.backoff_base * 2 ** (self._streak - 1))
+            delay = delay / 2 + random.uniform(0, delay / 2)
+            self._paused_until = max(self._paused_until, now + delay)
+            return delay
+
+    # --- dừng ---
+    def cancel(self) -> None:
+        """Dừng lượt chạy: request đang chờ lượt/backoff thoát ngay bằng Cancelled."""
+        self._cancelled.set()
+
+    def reopen(self) -> None:
+        """Cho phép gửi request lại (đầu mỗi lượt chạy); bỏ khoảng tạm dừng cũ."""
+        with self._lock:
+            self._cancelled.clear()
+            self._paused_until = 0.0
+            self.in_flight = 0
+
+    # --- gọi có thử lại ---
+    def call(self, func: Callable, *args, **kwargs):
+        """func(*args) trong giới hạn; bị chặn thì chờ backoff rồi thử lại."""
+        attempt = 0
+        while True:
+            self.acquire()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                throttled = is_throttled(e)
+                self.release(throttled)
+                if throttled and attempt < self.max_retries:
+                    attempt += 1
+                    continue
+                raise
+            self.release(False)
+            return result
+
+    async def call_async(self, func: Callable, *args, **kwargs):
+        attempt = 0
+        while True:
+            await self.acquire_async()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                throttled = is_throttled(e)
+                self.release(throttled)
+                if throttled and attempt < self.max_retries:
+                    attempt += 1
+                    continue
+                raise
+            self.release(False)
+            return result
+
+    def describe(self) -> str:
+        with self._lock:
+            paused = max(0.0, self._paused_until - time.monotonic())
+            text = (f"Giới hạn: {self.rate:.1f} req/giây, tối đa {int(self.limit)} đồng thời, "
+                    f"bị chặn {self.throttle_count} lần")
+        return text + (f", đang tạm dừng {paused:.0f} giây" if paused >= 1 else "")
+
+
+class _NoLimit:
+    """Thay cho RateLimiter khi AIO_RATE_LIMIT=0."""
+    throttle_count = 0
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def reopen(self) -> None:
+        self._cancelled.clear()
+
+    def call(self, func, *args, **kwargs):
+        if self._cancelled.is_set():
+            raise Cancelled("Đã dừng")
+        return func(*args, **kwargs)
+
+    async def call_async(self, func, *args, **kwargs):
+        if self._cancelled.is_set():
+            raise Cancelled("Đã dừng")
+        return await func(*args, **kwargs)
+
+    def describe(self) -> str:
+        return "Giới hạn: tắt"
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def get_limiter():
+    """Limiter dùng chung của process hiện tại."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = RateLimiter() if ENABLED else _NoLimit()
+        return _default
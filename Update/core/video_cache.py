@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+core/video_cache.py
+Cache metadata video dùng chung cho Scraper, Checker và Enricher (SQLite).
+
+- Khóa: (video_id, kind). kind = "info" (trường chuẩn hoá dùng cho
+  Scraper/Checker) hoặc "detail" (kết quả của enricher)
+- Mỗi bản ghi lưu thời điểm lấy; mỗi thao tác có hạn dùng riêng (TTL_HOURS)
+- force_refresh bỏ qua cache khi đọc nhưng vẫn ghi kết quả mới
+- Giới hạn số bản ghi: vượt max_entries thì xoá các bản ghi cũ nhất
+
+Đường dẫn mặc định: ~/.aio_tool/video_cache.sqlite3 (đổi bằng AIO_CACHE_DIR).
+Chỉ process điều phối đọc/ghi cache; worker không chạm vào SQLite.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+KIND_INFO = "info"
+KIND_DETAIL = "detail"
+
+# Hạn dùng mặc định (giờ) theo thao tác
+TTL_HOURS: Dict[str, float] = {
+    "scraper": 24 * 7,     # metadata kênh ít đổi
+    "checker": 24,         # tình trạng video cần mới hơn
+    "enricher": 24 * 30,   # tags/chapters/description hầu như không đổi
+}
+
+DEFAULT_MAX_ENTRIES = 200_000
+
+# Các trường của yt-dlp info giữ lại cho Scraper/Checker
+INFO_FIELDS = (
+    "id", "title", "uploader", "channel_id", "owner_channel_id", "uploader_id",
+    "uploader_url", "channel_url", "duration", "upload_date", "view_count",
+    "webpage_url",
+)
+
+
+def default_cache_path() -> str:
+    folder = os.environ.get("AIO_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".aio_tool")
+    return os.path.join(folder, "video_cache.sqlite3")
+
+
+def normalize_info(info: dict) -> dict:
+    """Rút gọn info của yt-dlp về các trường cần thiết (bỏ formats, thumbnails...)."""
+    return {k: info.get(k) for k in INFO_FIELDS if info.get(k) is not None}
+
+
+class VideoCache:
+    """Cache SQLite theo video ID, an toàn khi gọi từ nhiều thread."""
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path or default_cache_path()
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS videos ("
+                " video_id TEXT NOT NULL, kind TEXT NOT NULL, data TEXT NOT NULL,"
+                " fetched_at REAL NOT NULL, PRIMARY KEY (video_id, kind))")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_videos_fetched ON videos(fetched_at)")
+            self._conn.commit()
+
+    def get_many(self, video_ids: Iterable[str], kind: str,
+                 max_age_hours: Optional[float] = None) -> Dict[str, dict]:
+        """Trả về {video_id: data} cho các ID còn hạn (max_age_hours=None: không giới hạn)."""
+        ids = list(dict.fromkeys(str(v) for v in video_ids if v))
+        cutoff = time.time() - max_age_hours * 3600 if max_age_hours is not None else 0
+        found: Dict[str, dict] = {}
+        with self._lock:
+            # SQLite giới hạn số tham số mỗi câu lệnh -> truy vấn theo lô
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT video_id, data FROM videos WHERE kind = ? AND fetched_at >= ?"
+                    f" AND video_id IN ({marks})", [kind, cutoff, *chunk]).fetchall()
+                for vid, data in rows:
+                    try:
+                        found[vid] = json.loads(data)
+                    except ValueError:
+                        continue
+        return found
+
+    def get(self, video_id: str, kind: str, max_age_hours: Optional[float] = None) -> Optional[dict]:
+        return self.get_many([video_id], kind, max_age_hours).get(str(video_id))
+
+    def put_many(self, items: Dict[str, dict], kind: str) -> None:
+        now = time.time()
+        rows = [(str(vid), kind, json.dumps(data, ensure_ascii=False, default=str), now)
+                for vid, data in items.items() if vid]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO videos (video_id, kind, data, fetched_at) VALUES (?, ?, ?, ?)",
+                rows)
+            self._conn.commit()
+
+    def put(self, video_id: str, kind: str, data: dict) -> None:
+        self.put_many({video_id: data}, kind)
+
+    def evict(self) -> int:
+        """Xoá bản ghi cũ nhất khi vượt max_entries. Trả về số bản ghi đã xoá."""
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+            extra = count - self.max_entries
+            if extra <= 0:
+                return 0
+            self._conn.execute(
+                "DELETE FROM videos WHERE rowid IN ("
+                " SELECT rowid FROM videos ORDER BY fetched_at ASC LIMIT ?)", (extra,))
+            self._conn.commit()
+            return extra
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_default: Optional[VideoCache] = None
+_default_lock = threading.Lock()
+
+
+def get_cache() -> Optional[VideoCache]:
+    """Cache mặc định của process; None nếu không mở được (ổ đĩa chỉ đọc...)."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            try:
+                _default = VideoCache()
+            except Exception:
+                return None
+        return _default
+
+
+class CachePolicy:
+    """Cách một lượt chạy dùng cache: bật/tắt, hạn dùng, có làm mới hay không."""
+
+    def __init__(self, operation: str, use_cache: bool = True, force_refresh: bool = False,
+                 ttl_hours: Optional[float] = None):
+        self.operation = operation
+        self.use_cache = use_cache
+        self.force_refresh = force_refresh
+        self.ttl_hours = TTL_HOURS.get(operation) if ttl_hours is None else ttl_hours
+        self.cache = get_cache() if use_cache else None
+
+    def lookup(self, video_ids: Iterable[str], kind: str) -> Dict[str, dict]:
+        if self.cache is None or self.force_refresh:
+            return {}
+        return self.cache.get_many(video_ids, kind, self.ttl_hours)
+
+    def store(self, items: Dict[str, dict], kind: str) -> None:
+        if self.cache is not None and items:
+            self.cache.put_many(items, kind)
+
+    def finish(self) -> List[str]:
+        """Gọi cuối lượt chạy: dọn cache theo giới hạn kích thước."""
+        if self.cache is None:
+            return []
+        removed = self.cache.evict()
+        return [f"Cache: xoá {removed} bản ghi cũ"] if removed else []
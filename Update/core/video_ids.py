@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+core/video_ids.py
+Chuẩn hoá và khử trùng video ID trước khi gửi đi (Checker, Enricher, Downloader).
+
+- Nhận ID 11 ký tự hoặc URL watch / shorts / youtu.be / embed / live
+- Bỏ ô trống, 'nan', chuỗi không nhận ra được ID
+- Mỗi ID chỉ gửi mạng một lần; kết quả chia lại cho mọi dòng gốc trùng ID
+
+Danh sách đối tác thường lặp lại một video hàng chục lần.
+"""
+import math
+import re
+from typing import Dict, Iterable, List, Optional
+
+VIDEO_ID_RE = re.compile(r"^[0-9A-Za-z_-]{11}$")
+_URL_ID_RE = re.compile(
+    r"(?:[?&]v=|youtu\.be/|/shorts/|/embed/|/live/|/v/)([0-9A-Za-z_-]{11})(?![0-9A-Za-z_-])")
+
+
+def normalize_video_id(value) -> Optional[str]:
+    """ID 11 ký tự lấy từ ID/URL; None nếu trống, NaN hoặc không hợp lệ."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    s = str(value).strip()
+    if not s or s.lower() in ("nan", "none"):
+        return None
+    if VIDEO_ID_RE.match(s):
+        return s
+    m = _URL_ID_RE.search(s)
+    return m.group(1) if m else None
+
+
+class UniqueIds:
+    """Kết quả khử trùng: unique (ID theo thứ tự gặp đầu tiên), rows {ID: [khoá
+    dòng gốc]}, invalid [khoá dòng không có ID hợp lệ]."""
+
+    def __init__(self):
+        self.unique: List[str] = []
+        self.rows: Dict[str, List] = {}
+        self.invalid: List = []
+        self.total = 0
+
+    @property
+    def duplicates(self) -> int:
+        return self.total - len(self.invalid) - len(self.unique)
+
+    def summary(self) -> str:
+        text = f"{len(self.unique)} ID duy nhất / {self.total} dòng"
+        if self.duplicates:
+            text += f", {self.duplicates} dòng trùng"
+        if self.invalid:
+            text += f", {len(self.invalid)} dòng không có ID hợp lệ"
+        return text
+
+
+def dedupe_ids(values: Iterable, keys: Optional[Iterable] = None,
+               keep_urls: bool = False) -> UniqueIds:
+    """Chuẩn hoá từng giá trị; keys là khoá của từng dòng (mặc định 0, 1, 2...).
+    keep_urls: URL không nhận ra ID (trang khác, playlist...) giữ nguyên làm khoá
+    thay vì coi là không hợp lệ (yt-dlp vẫn có thể xử lý)."""
+    result = UniqueIds()
+    keys = iter(keys) if keys is not None else None
+    for pos, value in enumerate(values):
+        key = next(keys) if keys is not None else pos
+        result.total += 1
+        vid = normalize_video_id(value)
+        if vid is None and keep_urls and str(value).strip().lower().startswith(("http://", "https://")):
+            vid = str(value).strip()
+        if vid is None:
+            result.invalid.append(key)
+            continue
+        if vid not in result.rows:
+            result.rows[vid] = []
+            result.unique.append(vid)
+        result.rows[vid].append(key)
+    return result
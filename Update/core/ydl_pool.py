@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+core/ydl_pool.py
+Dùng lại YoutubeDL cho mỗi worker (thread hoặc process) thay vì mở mới cho
+từng video: extractor, cookie jar và HTTP session chỉ khởi tạo một lần.
+
+- get_ydl(profile): instance riêng của thread hiện tại, tạo lần đầu khi gọi
+- YdlPool: instance của các thread trong một executor; pool.bind làm
+  initializer (không tạo sẵn gì), pool.close() đóng hết khi executor xong,
+  nên process chạy lâu (cli_wrapper --serve) không dồn instance qua các lượt
+- Thread không gắn pool (hoặc worker process): instance nằm trong
+  threading.local, mất theo thread
+- LatencyStats: đo độ trễ từng video để so sánh trước/sau
+
+Đặt biến môi trường AIO_YDL_REUSE=0 để quay lại cách cũ (mỗi video một
+YoutubeDL) khi cần đo so sánh.
+"""
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import yt_dlp
+
+# Các bộ tuỳ chọn dùng chung, giữ nguyên như khi còn tạo YoutubeDL tại chỗ
+PROFILES: Dict[str, dict] = {
+    # get_video_info (Scraper/Checker)
+    "info": {'ignoreerrors': False, 'skip_download': True, 'nocheckcertificate': True, 'quiet': True},
+    # enricher._extract_detail. Không dùng ignoreerrors: với nó yt-dlp nuốt lỗi và trả
+    # None, rate_limit không thấy được 429/bot-check để giảm tốc và thử lại. Lỗi còn lại
+    # được _extract_detail đổi thành dòng {'error': ...} như trước
+    "detail": {"quiet": True, "skip_download": True, "nocheckcertificate": True, "ignoreerrors": False},
+}
+
+REUSE_ENABLED = os.environ.get("AIO_YDL_REUSE", "1") != "0"
+
+_local = threading.local()
+
+
+class YdlPool:
+    """YoutubeDL dùng lại theo thread cho các worker của một executor.
+
+    Dùng: pool = YdlPool(); ThreadPoolExecutor(..., initializer=pool.bind);
+    xong thì pool.close(). Thread gọi get_ydl sau khi pool đã đóng (worker bị
+    bỏ lại khi dừng) nhận instance tạm, không giữ lại."""
+
+    def __init__(self):
+        self._ydls: Dict[Tuple[int, str], yt_dlp.YoutubeDL] = {}
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def bind(self) -> None:
+        """Initializer của executor: gắn pool cho thread worker (YoutubeDL tạo khi cần)."""
+        _local.pool = self
+
+    def get(self, profile: str = "info") -> yt_dlp.YoutubeDL:
+        key = (threading.get_ident(), profile)
+        with self._lock:
+            ydl = self._ydls.get(key)
+            closed = self.closed
+        if ydl is not None:
+            return ydl
+        ydl = yt_dlp.YoutubeDL(dict(PROFILES[profile]))
+        if not closed:
+            with self._lock:
+                if not self.closed:
+                    ydl = self._ydls.setdefault(key, ydl)
+        return ydl
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ydls)
+
+    def close(self) -> None:
+        """Đóng mọi instance của pool (gọi sau khi executor đã shutdown)."""
+        with self._lock:
+            self.closed = True
+            instances = list(self._ydls.values())
+            self._ydls.clear()
+        for ydl in instances:
+            try:
+                ydl.close()
+            except Exception:
+                pass
+
+
+def get_ydl(profile: str = "info") -> yt_dlp.YoutubeDL:
+    """YoutubeDL của thread hiện tại cho profile, tạo một lần rồi dùng lại."""
+    pool = getattr(_local, "pool", None)
+    if pool is not None:
+        return pool.get(profile)
+    cache = getattr(_local, "ydls", None)
+    if cache is None:
+        cache = _local.ydls = {}
+    ydl = cache.get(profile)
+    if ydl is None:
+        ydl = cache[profile] = yt_dlp.YoutubeDL(dict(PROFILES[profile]))
+    return ydl
+
+
+def extract_info(url: str, profile: str = "info") -> Optional[dict]:
+    """extract_info(download=False) bằng instance dùng lại của worker."""
+    if not REUSE_ENABLED:
+        with yt_dlp.YoutubeDL(dict(PROFILES[profile])) as ydl:
+            return ydl.extract_info(url, download=False)
+    return get_ydl(profile).extract_info(url, download=False)
+
+
+class LatencyStats:
+    """Gom độ trễ (giây) của từng video để log tóm tắt cuối mỗi lượt chạy."""
+
+    def __init__(self):
+        self._values: List[float] = []
+        self._lock = threading.Lock()
+
+    def add(self, seconds: Optional[float]) -> None:
+        if seconds is None:
+            return
+        with self._lock:
+            self._values.append(float(seconds))
+
+    def summary(self) -> str:
+        with self._lock:
+            values = sorted(self._values)
+        if not values:
+            return "Chưa có số liệu độ trễ"
+
+        def pct(p: float) -> float:
+            return values[min(len(values) - 1, int(p * len(values)))] * 1000
+
+        mode = "dùng lại" if REUSE_ENABLED else "tạo mới mỗi video"
+        avg = sum(values) / len(values) * 1000
+        return (f"Độ trễ mỗi video ({len(values)} video, YoutubeDL {mode}): "
+                f"TB {avg:.0f} ms, p50 {pct(0.5):.0f} ms, p95 {pct(0.95):.0f} ms")
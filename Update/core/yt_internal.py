@@ -5,11 +5,21 @@ Gọi YouTube Internal API (youtubei) + tự động lấy INNERTUBE_API_KEY / C
 Yêu cầu: httpx
 """
 from __future__ import annotations
-import re, json, asyncio
-from typing import Optional, List, Dict, Tuple
+import re, json, time, asyncio, html as _html
+from typing import Optional, List, Dict, Tuple, Callable, AsyncIterator
 import httpx
 
+try:
+    from .rate_limit import Throttled, get_limiter, is_throttled
+except ImportError:  # chạy qua cli_wrapper (core/ nằm trong sys.path)
+    from rate_limit import Throttled, get_limiter, is_throttled
+
 API_BASE = "https://www.youtube.com/youtubei/v1"
+HOME_URL = "https://www.youtube.com/"
+
+def _client(proxy: Optional[str]=None, cookies: Optional[dict]=None) -> httpx.AsyncClient:
+    # httpx chỉ nhận proxy ở cấp client, không nhận theo từng request
+    return httpx.AsyncClient(http2=True, cookies=cookies, proxy=proxy)
 
 def _build_channel_url(channel: str) -> str:
     s = channel.strip()
@@ -22,16 +32,48 @@ def _build_channel_url(channel: str) -> str:
     # tên c/ user/ không hỗ trợ auto, cứ trả thẳng (YT redirect được)
     return f"https://www.youtube.com/{s}"
 
+async def _fetch_html(url: str, proxy: Optional[str]=None, cookies: Optional[dict]=None) -> str:
+    async with _client(proxy, cookies) as session:
+        r = await session.get(url, timeout=30, follow_redirects=True)
+        r.raise_for_status()
+        return r.text
+
 async def autodiscover(channel: str, proxy: Optional[str]=None, cookies: Optional[dict]=None) -> Tuple[str, Dict]:
     """
     Lấy (api_key, context) từ HTML kênh.
     """
     url = _build_channel_url(channel)
-    async with httpx.AsyncClient(http2=True, cookies=cookies) as session:
-        r = await session.get(url, proxy=proxy, timeout=30)
-        r.raise_for_status()
-        html = r.text
+    html = await _fetch_html(url, proxy, cookies)
+    return _parse_innertube_config(html, url)
+
+async def discover_channel(channel: str, proxy: Optional[str]=None,
+                           cookies: Optional[dict]=None) -> Tuple[str, Dict, str, str]:
+    """
+    Như autodiscover nhưng trả thêm channel ID (UC...) và tên kênh,
+    để dùng được cả @handle/URL làm browseId.
+    Returns: (api_key, context, channel_id, title)
+    """
+    url = _build_channel_url(channel)
+    html = await _fetch_html(url, proxy, cookies)
+    key, ctx = _parse_innertube_config(html, url)
 
+    channel_id = channel.strip() if channel.strip().startswith("UC") else None
+    if not channel_id:
+        for pat in (r'"externalId":"(UC[0-9A-Za-z_-]{22})"',
+                    r'<link rel="canonical" href="https://www\.youtube\.com/channel/(UC[0-9A-Za-z_-]{22})"',
+                    r'"channelId":"(UC[0-9A-Za-z_-]{22})"'):
+            m = re.search(pat, html)
+            if m:
+                channel_id = m.group(1)
+                break
+    if not channel_id:
+        raise RuntimeError("Không tìm thấy channel ID trong HTML kênh")
+
+    m = re.search(r'<meta property="og:title" content="([^"]*)"', html)
+    title = _html.unescape(m.group(1)) if m else channel_id
+    return key, ctx, channel_id, title
+
+def _parse_innertube_config(html: str, url: str) -> Tuple[str, Dict]:
     key = None
     ctx = None
 
@@ -63,64 +105,207 @@ async def autodiscover(channel: str, proxy: Optional[str]=None, cookies: Optiona
 
     return key, ctx
 
-async def _post_json(session: httpx.AsyncClient, endpoint: str, payload: dict, key: str, proxy: Optional[str]=None):
+async def _post_json(session: httpx.AsyncClient, endpoint: str, payload: dict, key: str):
+    """POST youtubei qua limiter dùng chung (429 / bot-check: backoff rồi thử lại)."""
     params = {"key": key}
-    r = await session.post(f"{API_BASE}/{endpoint}", params=params, json=payload, proxy=proxy, timeout=30)
-    r.raise_for_status()
-    return r.json()
+
+    async def once():
+        r = await session.post(f"{API_BASE}/{endpoint}", params=params, json=payload, timeout=30)
+        r.raise_for_status()
+        data = r.json()
+        # Bot-check trả về 200 kèm playabilityStatus, không phải mã lỗi HTTP
+        reason = (data.get("playabilityStatus") or {}).get("reason") or ""
+        if reason and is_throttled(reason):
+            raise Throttled(reason)
+        return data
+
+    return await get_limiter().call_async(once)
+
+def _renderer(item: dict) -> dict:
+    """Renderer của một ô video: grid cũ, richGrid (video) hoặc Shorts."""
+    if "gridVideoRenderer" in item:
+        return item["gridVideoRenderer"]
+    content = item.get("richItemRenderer", {}).get("content", {})
+    return (content.get("videoRenderer") or content.get("reelItemRenderer")
+            or content.get("shortsLockupViewModel") or {})
 
 def _extract_title(item: dict) -> str:
-    r = (item.get("gridVideoRenderer") or item.get("richItemRenderer", {}).get("content", {}).get("videoRenderer") or {})
-    title = r.get("title", {}).get("runs", [{}])[0].get("text") or r.get("headline", {}).get("simpleText")
+    r = _renderer(item)
+    title = (r.get("title", {}).get("runs", [{}])[0].get("text") or r.get("headline", {}).get("simpleText")
+             or r.get("overlayMetadata", {}).get("primaryText", {}).get("content"))
     return title or "N/A"
 
 def _extract_video_id(item: dict) -> Optional[str]:
-    r = item.get("gridVideoRenderer") or item.get("richItemRenderer", {}).get("content", {}).get("videoRenderer")
+    r = _renderer(item)
     if not r: return None
-    return r.get("videoId")
+    return (r.get("videoId")
+            or r.get("onTap", {}).get("innertubeCommand", {}).get("reelWatchEndpoint", {}).get("videoId"))
+
+# Thời gian tương đối ("2 years ago" / "2 năm trước") -> số giây
+_TIME_UNITS = {"second": 1, "giây": 1, "minute": 60, "phút": 60, "hour": 3600, "giờ": 3600,
+               "day": 86400, "ngày": 86400, "week": 604800, "tuần": 604800,
+               "month": 30 * 86400, "tháng": 30 * 86400, "year": 365 * 86400, "năm": 365 * 86400}
+# Hậu tố lượt xem rút gọn (en: K/M/B, vi: N/Tr/T)
+_COUNT_SUFFIX = {"k": 1e3, "n": 1e3, "m": 1e6, "tr": 1e6, "b": 1e9, "t": 1e9}
+
+def _text(obj: dict) -> str:
+    if not obj: return ""
+    return obj.get("simpleText") or "".join(r.get("text", "") for r in obj.get("runs", [])) or obj.get("content", "")
+
+def _parse_length(text: str) -> Optional[int]:
+    parts = text.strip().split(":") if text else []
+    if not parts or not all(p.isdigit() for p in parts): return None
+    secs = 0
+    for p in parts: secs = secs * 60 + int(p)
+    return secs
+
+def _parse_count(text: str) -> Optional[int]:
+    m = re.search(r"(\d[\d.,]*)\s*(k|n|m|tr|b|t)?(?![a-zà-ỹ])", (text or "").lower())
+    if not m: return None
+    num, suffix = m.group(1), m.group(2)
+    if suffix:
+        try:
+            return int(float(num.replace(",", ".")) * _COUNT_SUFFIX[suffix])
+        except ValueError:
+            return None
+    return int(re.sub(r"\D", "", num))
+
+def _parse_relative_date(text: str) -> Optional[str]:
+    """'2 years ago' / '2 năm trước' -> 'YYYYMMDD' (ước lượng)."""
+    m = re.search(r"(\d+)\s*(" + "|".join(_TIME_UNITS) + r")", (text or "").lower())
+    if not m: return None
+    ts = time.time() - int(m.group(1)) * _TIME_UNITS[m.group(2)]
+    return time.strftime("%Y%m%d", time.gmtime(ts))
+
+def _extract_flat_fields(item: dict) -> dict:
+    """Thời lượng, lượt xem và ngày đăng (ước lượng, từ thời gian tương đối) có
+    sẵn trong ô video; trường không đọc được thì bỏ trống."""
+    r = _renderer(item)
+    fields = {
+        "duration": _parse_length(_text(r.get("lengthText"))),
+        "view_count": _parse_count(_text(r.get("viewCountText"))
+                                   or _text(r.get("overlayMetadata", {}).get("secondaryText"))),
+        "upload_date": _parse_relative_date(_text(r.get("publishedTimeText"))),
+    }
+    return {k: v for k, v in fields.items() if v is not None}
+
+def _extract_continuation(items: List[dict]) -> Optional[str]:
+    for it in items:
+        cont = it.get("continuationItemRenderer")
+        if cont:
+            return (cont.get("continuationEndpoint", {}).get("continuationCommand", {}).get("token"))
+    return None
+
+def _first_page_items(data: dict) -> Tuple[List[dict], Optional[str]]:
+    """Danh sách ô video của trang đầu (tab đang chọn) và token trang kế."""
+    tabs = data.get("contents", {}).get("twoColumnBrowseResultsRenderer", {}).get("tabs", [])
+    content = {}
+    for t in tabs:
+        tr = t.get("tabRenderer") or {}
+        if tr.get("selected") and tr.get("content"):
+            content = tr["content"]
+            break
+    # Bố cục mới: richGridRenderer, token nằm ở phần tử cuối
+    grid = content.get("richGridRenderer")
+    if grid:
+        items = grid.get("contents", [])
+        return items, _extract_continuation(items)
+    # Bố cục cũ: sectionList > itemSection > gridRenderer
+    for sec in content.get("sectionListRenderer", {}).get("contents", []):
+        for c in sec.get("itemSectionRenderer", {}).get("contents", []):
+            gr = c.get("gridRenderer")
+            if gr:
+                items = gr.get("items", [])
+                token = _extract_continuation(items)
+                if not token:
+                    conts = gr.get("continuations") or [{}]
+                    token = conts[0].get("nextContinuationData", {}).get("continuation")
+                return items, token
+    return [], None
+
+def _continuation_items(data: dict) -> Tuple[List[dict], Optional[str]]:
+    items: List[dict] = []
+    for action in data.get("onResponseReceivedActions", []) or []:
+        block = (action.get("appendContinuationItemsAction")
+                 or action.get("reloadContinuationItemsCommand") or {})
+        items.extend(block.get("continuationItems", []) or [])
+    return items, _extract_continuation(items)
+
+TAB_PARAMS = {"videos": "EgZ2aWRlb3M", "shorts": "EgZzaG9ydHM"}
 
 async def browse_channel_items(channel: str, key: str, context: dict, tab: str="videos",
-                               limit: int=200, proxy: Optional[str]=None, cookies: Optional[dict]=None) -> List[dict]:
+                               limit: Optional[int]=200, proxy: Optional[str]=None,
+                               cookies: Optional[dict]=None) -> AsyncIterator[dict]:
     """
-    Trả về danh sách item: {'id': videoId, 'title': title}
+    Async generator, lần lượt yield {'id': videoId, 'title': title, ...} của kênh
+    (channel là channel ID UC...), kèm duration/view_count/upload_date nếu ô
+    video có (xem _extract_flat_fields). Đi theo continuation token qua mọi trang;
+    trang kế được tải trước trong lúc trang hiện tại đang được xử lý.
+    Dừng đúng ở `limit` video (None: lấy hết).
+        async for item in browse_channel_items(...): ...
     """
-    items: List[dict] = []
-    payload = {"context": context, "browseId": channel, "params": "EgZ2aWRlb3M" if tab=="videos" else "EgZzaG9ydHM"}
-    async with httpx.AsyncClient(http2=True, cookies=cookies) as session:
-        data = await _post_json(session, "browse", payload, key, proxy)
-        contents = (data.get("contents", {}).get("twoColumnBrowseResultsRenderer", {})
-                    .get("tabs", [])[0].get("tabRenderer", {}).get("content", {})
-                    .get("sectionListRenderer", {}).get("contents", [])[0]
-                    .get("itemSectionRenderer", {}).get("contents", []))
-        grids = []
-        for c in contents:
-            gr = c.get("gridRenderer", {}) or c.get("richGridRenderer", {})
-            if gr:
-                grids = gr.get("items", [])
-                break
-        for it in grids:
-            vid = _extract_video_id(it)
-            if vid:
-                items.append({"id": vid, "title": _extract_title(it)})
-            if len(items) >= limit:
-                break
-    return items[:limit]
+    if limit is not None and limit <= 0:
+        return
+    payload = {"context": context, "browseId": channel, "params": TAB_PARAMS.get(tab, TAB_PARAMS["videos"])}
+    seen = set()
+    async with _client(proxy, cookies) as session:
+        data = await _post_json(session, "browse", payload, key)
+        items, token = _first_page_items(data)
+        while True:
+            # Tải trước trang kế, song song với việc yield trang hiện tại
+            prefetch = None
+            if token:
+                prefetch = asyncio.ensure_future(_post_json(
+                    session, "browse", {"context": context, "continuation": token}, key))
+            try:
+                for it in items:
+                    vid = _extract_video_id(it)
+                    if not vid or vid in seen:
+                        continue
+                    seen.add(vid)
+                    yield {"id": vid, "title": _extract_title(it), **_extract_flat_fields(it)}
+                    if limit is not None and len(seen) >= limit:
+                        return
+                if prefetch is None:
+                    return
+                data = await prefetch
+                prefetch = None
+                items, token = _continuation_items(data)
+            finally:
+                if prefetch is not None:
+                    if prefetch.done() and not prefetch.cancelled():
+                        prefetch.exception()  # tránh cảnh báo exception chưa được lấy
+                    else:
+                        prefetch.cancel()
+
+async def list_channel_items(channel: str, key: str, context: dict, tab: str="videos",
+                             limit: Optional[int]=200, proxy: Optional[str]=None,
+                             cookies: Optional[dict]=None) -> List[dict]:
+    """Gom browse_channel_items thành list."""
+    return [it async for it in browse_channel_items(channel, key, context, tab, limit, proxy, cookies)]
 
 async def player_info_many(video_ids: List[str], key: str, context: dict, proxy: Optional[str]=None,
-                           cookies: Optional[dict]=None, concurrency: int=20) -> List[dict]:
+                           cookies: Optional[dict]=None, concurrency: int=20,
+                           on_result: Optional[Callable[[dict], None]]=None) -> List[dict]:
+    """
+    Gọi endpoint player cho nhiều video, tối đa `concurrency` request cùng lúc.
+    Mỗi kết quả luôn có 'videoId'; lỗi mạng/HTTP trả về {'videoId', 'error'}.
+    on_result (nếu có) được gọi ngay khi từng video xong, để báo tiến độ.
+    """
     import asyncio as _asyncio
     sem = _asyncio.Semaphore(concurrency)
     results: List[dict] = []
-    async with httpx.AsyncClient(http2=True, cookies=cookies) as session:
+    async with _client(proxy, cookies) as session:
         async def fetch(vid):
             async with sem:
                 payload = {"context": context, "videoId": vid}
                 try:
-                    data = await _post_json(session, "player", payload, key, proxy)
-                    if "videoDetails" not in data:
-                        data["videoId"] = vid
-                    results.append(data)
+                    data = await _post_json(session, "player", payload, key)
+                    data["videoId"] = vid
                 except Exception as e:
-                    results.append({"videoId": vid, "error": str(e)})
+                    data = {"videoId": vid, "error": str(e)}
+                results.append(data)
+                if on_result:
+                    on_result(data)
         await _asyncio.gather(*(fetch(v) for v in video_ids))
     return results
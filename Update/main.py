@@ -167,8 +167,9 @@ def main(page: ft.Page):
         expand=True
     )
     audio_only = ft.Checkbox(label="Chỉ âm thanh (MP3)", value=False)
-    threads = ft.Slider(min=1, max=4, divisions=3, value=2, label="{value} luồng")
+    threads = ft.Slider(min=1, max=16, divisions=15, value=2, label="tối đa {value} luồng")
     con_frags = ft.Slider(min=1, max=16, divisions=15, value=8, label="{value} mảnh/luồng")
+    bandwidth = ft.Slider(min=0, max=100, divisions=20, value=0, label="{value} MB/s (0 = tự dò)")
 
     downloader_out = ft.TextField(label="Thư mục tải về", expand=True, value=output_dir, disabled=True, filled=True)
     downloader_browse_out = ft.OutlinedButton("Chọn thư mục...", icon=Icons.FOLDER,
@@ -188,7 +189,7 @@ def main(page: ft.Page):
     downloader_panel = ft.Column([
         group_tile(Icons.LINK, "Đầu vào", ft.Row([downloader_input, downloader_pick_file], spacing=8), expanded=True),
         group_tile(Icons.SETTINGS, "Tuỳ chọn tải", ft.Row([quality, audio_only], spacing=8), expanded=True),
-        group_tile(Icons.SPEED, "Hiệu năng", ft.Row([threads, con_frags], spacing=8), expanded=False),
+        group_tile(Icons.SPEED, "Hiệu năng", ft.Row([threads, con_frags, bandwidth], spacing=8), expanded=False),
         group_tile(Icons.SECURITY, "Cookies & Proxy", ft.Row([cookies_text, cookies_pick, proxy_text], spacing=8), expanded=False),
         group_tile(Icons.TUNE, "Khác", ft.Row([use_archive, use_aria2], spacing=16), expanded=False),
         group_tile(Icons.FOLDER, "Thư mục tải về", ft.Row([downloader_out, downloader_browse_out], spacing=8), expanded=True),
@@ -281,7 +282,7 @@ def main(page: ft.Page):
                         cookies_file=cookies_text.value or None, proxy=proxy_text.value or None,
                         progress_callback=overall_progress, detail_callback=detail_progress,
                         log_func=log, enable_aria2=use_aria2.value, use_archive=use_archive.value,
-                        stop_event=stop_event
+                        stop_event=stop_event, bandwidth_mb=float(bandwidth.value) or None
                     )
                 if res: log(f"File kết quả: {res}", "[System]")
                 if stop_event.is_set(): log("Đã huỷ theo yêu cầu.", "[System]")
@@ -3,6 +3,10 @@ import pandas as pd
 from openpyxl import load_workbook
 from openpyxl.styles import Font, Border, Side, PatternFill
 
+from .hyperlink import (
+    DEFAULT_HYPERLINK_MODE, HYPERLINK_TEXT, apply_hyperlink,
+    build_watch_urls, normalize_mode)
+
 
 def read_input_excel(path: str):
     try:
@@ -13,7 +17,8 @@ def read_input_excel(path: str):
 
 
 def write_output_excel(df: pd.DataFrame, path: str,
-                       auto_backup: bool) -> bool:
+                       auto_backup: bool,
+                       hyperlink_mode: str = DEFAULT_HYPERLINK_MODE) -> bool:
     try:
         # Ghi dữ liệu thô vào file Excel
         with pd.ExcelWriter(path, engine='openpyxl') as writer:
@@ -51,6 +56,7 @@ def write_output_excel(df: pd.DataFrame, path: str,
                 cell.border = thin_border
 
         # --- LOGIC THÊM HYPERLINK ---
+        hyperlink_mode = normalize_mode(hyperlink_mode)
         # 1. Tìm vị trí cột "ID Video"
         id_video_col_index = None
         for i, cell in enumerate(ws[1]):  # Duyệt qua hàng header
@@ -58,19 +64,14 @@ def write_output_excel(df: pd.DataFrame, path: str,
                 id_video_col_index = i + 1  # openpyxl dùng chỉ số từ 1
                 break
 
-        # 2. Thêm hyperlink nếu tìm thấy cột
-        if id_video_col_index:
-            for row in ws.iter_rows(
+        # 2. Thêm hyperlink nếu tìm thấy cột (URL được tạo một lần cho cả cột)
+        if id_video_col_index and hyperlink_mode != HYPERLINK_TEXT:
+            urls = build_watch_urls(df["ID Video"]).tolist()
+            for url, row in zip(urls, ws.iter_rows(
                     min_row=2,
                     min_col=id_video_col_index,
-                    max_col=id_video_col_index):
-                for cell in row:
-                    video_id = cell.value
-                    # Kiểm tra ID hợp lệ (là chuỗi và dài 11 ký tự)
-                    if video_id and isinstance(
-                            video_id, str) and len(video_id) == 11:
-                        cell.hyperlink = f"https://www.youtube.com/watch?v={video_id}"
-                        cell.font = hyperlink_font  # Áp dụng font màu xanh cho hyperlink
+                    max_col=id_video_col_index)):
+                apply_hyperlink(row[0], url, hyperlink_mode, hyperlink_font)
 
         wb.save(path)
         return True
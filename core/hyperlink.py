@@ -0,0 +1,148 @@
+# vcpmctool/core/hyperlink.py
+"""
+Tạo link YouTube hàng loạt (vector hóa bằng pandas) và gắn hyperlink vào
+worksheet theo chế độ cấu hình được.
+
+Các chế độ:
+- "relationship": cell.hyperlink như trước (mỗi link là một relationship,
+  chậm khi file có hàng trăm nghìn link)
+- "formula": ghi công thức =HYPERLINK(url, text), không tạo relationship
+- "text": chỉ ghi URL/ID dạng chữ, không tạo link
+
+Lưu ý: ô công thức không có giá trị cache cho tới khi Excel tính lại, nên
+pandas/openpyxl đọc lại file chưa mở bằng Excel sẽ thấy ô trống;
+dùng restore_formula_text() sau khi đọc để lấy lại giá trị hiển thị.
+"""
+import re
+
+import pandas as pd
+from openpyxl import load_workbook
+
+HYPERLINK_RELATIONSHIP = "relationship"
+HYPERLINK_FORMULA = "formula"
+HYPERLINK_TEXT = "text"
+HYPERLINK_MODES = (HYPERLINK_RELATIONSHIP, HYPERLINK_FORMULA, HYPERLINK_TEXT)
+DEFAULT_HYPERLINK_MODE = HYPERLINK_RELATIONSHIP
+
+WATCH_URL_PREFIX = "https://www.youtube.com/watch?v="
+
+# "mm:ss" hoặc "hh:mm:ss" ở phần bắt đầu của khoảng thời gian
+_START_TIME_PATTERN = r"^(?:(\d+):)?(\d+):(\d+)$"
+_FORMULA_PATTERN = re.compile(r'^=HYPERLINK\("(?:[^"]|"")*","((?:[^"]|"")*)"\)$')
+
+
+def _clean(values) -> pd.Series:
+    """Chuyển về Series chuỗi đã strip, NaN/None thành chuỗi rỗng."""
+    series = pd.Series(values) if not isinstance(values, pd.Series) else values
+    return series.where(series.notna(), "").astype(str).str.strip()
+
+
+def build_watch_urls(video_ids) -> pd.Series:
+    """
+    Tạo link xem video cho cả cột ID một lần.
+    ID không hợp lệ (khác 11 ký tự) cho chuỗi rỗng.
+    """
+    ids = _clean(video_ids)
+    return (WATCH_URL_PREFIX + ids).where(ids.str.len() == 11, "")
+
+
+def build_timestamp_urls(video_ids, time_ranges) -> pd.Series:
+    """
+    Tạo link YouTube có timestamp (&t=<giây>s) cho cả cột một lần.
+
+    Giữ nguyên quy tắc của cách làm từng dòng trước đây:
+    - thiếu ID/thời gian hoặc ID không đủ 11 ký tự -> ""
+    - thời gian không phải khoảng "bắt đầu - kết thúc" hoặc không parse được
+      -> link không có timestamp
+    """
+    ids = _clean(video_ids)
+    ranges = _clean(time_ranges).reset_index(drop=True)
+    ids = ids.reset_index(drop=True)
+
+    base = WATCH_URL_PREFIX + ids
+    start = ranges.str.split("-", n=1).str[0].str.strip()
+    parts = start.str.extract(_START_TIME_PATTERN)
+    hours = pd.to_numeric(parts[0], errors="coerce").fillna(0)
+    seconds = (hours * 3600
+               + pd.to_numeric(parts[1], errors="coerce") * 60
+               + pd.to_numeric(parts[2], errors="coerce"))
+
+    has_range = ranges.str.contains("-", regex=False)
+    has_seconds = has_range & seconds.notna()
+    seconds_str = seconds.fillna(0).astype("int64").astype(str)
+
+    urls = base.where(~has_seconds, base + "&t=" + seconds_str + "s")
+    valid = (ids != "") & (ranges != "") & (ids.str.len() == 11)
+    result = urls.where(valid, "")
+    if isinstance(video_ids, pd.Series):
+        result.index = video_ids.index
+    return result
+
+
+def _formula(url: str, text) -> str:
+    """Công thức HYPERLINK() với dấu nháy kép được escape theo kiểu Excel."""
+    safe_url = url.replace('"', '""')
+    safe_text = str(text).replace('"', '""')
+    return f'=HYPERLINK("{safe_url}","{safe_text}")'
+
+
+def apply_hyperlink(cell, url: str, mode: str, font=None) -> None:
+    """
+    Gắn link vào một ô theo chế độ đã chọn.
+    Ô giữ nguyên giá trị hiển thị hiện có (ID hoặc URL).
+    """
+    if not url:
+        return
+    if mode == HYPERLINK_FORMULA:
+        cell.value = _formula(url, cell.value if cell.value else url)
+    elif mode == HYPERLINK_RELATIONSHIP:
+        cell.hyperlink = url
+    else:
+        return
+    if font is not None:
+        cell.font = font
+
+
+def formula_display_text(value):
+    """Lấy text hiển thị từ công thức =HYPERLINK(); giá trị khác giữ nguyên."""
+    if isinstance(value, str):
+        m = _FORMULA_PATTERN.match(value)
+        if m:
+            return m.group(1).replace('""', '"')
+    return value
+
+
+def restore_formula_text(df: pd.DataFrame, path: str,
+                         columns=("ID Video",)) -> pd.DataFrame:
+    """
+    Điền lại các ô bị đọc thành rỗng vì là công thức HYPERLINK() chưa được
+    Excel tính (file ghi ở chế độ "formula"). Chỉ đọc lại sheet đầu tiên khi
+    cột có ô trống, nên không tốn thêm chi phí với file thông thường.
+    """
+    targets = [c for c in columns if c in df.columns and df[c].isna().any()]
+    if not targets:
+        return df
+
+    wb = load_workbook(path, read_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(v).strip() if v is not None else "" for v in next(rows, ())]
+        positions = {c: header.index(c) for c in targets if c in header}
+        restored = {c: [] for c in positions}
+        for _, row in zip(range(len(df)), rows):
+            for c, pos in positions.items():
+                restored[c].append(formula_display_text(row[pos]) if pos < len(row) else None)
+    finally:
+        wb.close()
+
+    for c, values in restored.items():
+        values = (values + [None] * len(df))[:len(df)]
+        fallback = pd.Series(values, index=df.index)
+        df[c] = df[c].where(df[c].notna(), fallback)
+    return df
+
+
+def normalize_mode(mode) -> str:
+    """Trả về chế độ hợp lệ, mặc định là relationship."""
+    mode = str(mode or "").strip().lower()
+    return mode if mode in HYPERLINK_MODES else DEFAULT_HYPERLINK_MODE
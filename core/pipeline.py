@@ -1,7 +1,9 @@
 # vcpmctool/core/pipeline.py (Phiên bản cuối cùng)
 import pandas as pd
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 from .excel_io import read_input_excel, write_output_excel
+from .hyperlink import DEFAULT_HYPERLINK_MODE
+from .royalty.processor import RoyaltyProcessor
 from .processing_steps import row_processor, column_mapper
 from services.file_utils import generate_output_name
 from services.logger import Logger
@@ -14,7 +16,9 @@ def process_files(
         # royalty_rate đã được loại bỏ
         logger: Logger,
         auto_backup: bool = True,
-        auto_proper: bool = True
+        auto_proper: bool = True,
+        hyperlink_mode: str = DEFAULT_HYPERLINK_MODE,
+        write_output: bool = True
 ) -> Tuple[pd.DataFrame, bool]:
     all_outputs = []
     overall_success = True
@@ -84,8 +88,12 @@ def process_files(
 
     final_df = final_df[final_ordered_cols + extra_final_cols]
 
+    if not write_output:
+        return final_df, overall_success
+
     output_path = generate_output_name(input_paths[0], "_Ket_qua.xlsx")
-    write_success = write_output_excel(final_df, output_path, auto_backup)
+    write_success = write_output_excel(
+        final_df, output_path, auto_backup, hyperlink_mode)
 
     if not write_success:
         logger.error("Write failed - check if output file is open.")
@@ -94,3 +102,44 @@ def process_files(
         logger.info(f"Output saved to {output_path}")
 
     return final_df, overall_success
+
+
+def process_files_with_royalty(
+        input_paths: List[str],
+        initial_term: int,
+        ext_term: int,
+        royalty_dict: Dict[str, Tuple[int, int, int]],
+        logger: Logger,
+        auto_proper: bool = True,
+        hyperlink_mode: str = DEFAULT_HYPERLINK_MODE,
+        output_path: Optional[str] = None,
+        aliases: Optional[Dict[str, str]] = None
+) -> Tuple[pd.DataFrame, bool]:
+    """
+    Xử lý chính + tính nhuận bút trong một lượt: DataFrame từ process_files
+    được chuyển thẳng sang RoyaltyProcessor (không ghi *_Ket_qua.xlsx rồi đọc
+    lại), dùng cùng thời hạn initial_term/ext_term, và chỉ ghi file một lần.
+    """
+    final_df, overall_success = process_files(
+        input_paths, initial_term, ext_term, logger,
+        auto_proper=auto_proper, hyperlink_mode=hyperlink_mode, write_output=False)
+    if final_df.empty:
+        return final_df, False
+
+    # Ô rỗng của pipeline tương ứng ô trống (NaN) khi đọc lại từ Excel
+    royalty_input = final_df.where(final_df != "")
+
+    processor = RoyaltyProcessor(
+        royalty_dict, hyperlink_mode=hyperlink_mode,
+        initial_term=initial_term, ext_term=ext_term, aliases=aliases)
+    result_df = processor.process_dataframe(royalty_input, log_callback=logger.info)
+
+    if not output_path:
+        output_path = generate_output_name(input_paths[0], "_Ket_qua_NhuanBut.xlsx")
+    if not processor.write_result(result_df, output_path):
+        logger.error("Write failed - check if output file is open.")
+        overall_success = False
+    else:
+        logger.info(f"Output saved to {output_path}")
+
+    return result_df, overall_success
@@ -0,0 +1,269 @@
+# vcpmctool/core/royalty/batch.py
+"""
+Xử lý nhuận bút hàng loạt: nhiều file đầu vào, một bảng mức nhuận bút,
+chạy song song trên nhiều process và xuất thêm file tổng hợp.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.styles import Font, Border, Side, PatternFill
+
+from .processor import STREAMING_ROW_THRESHOLD, RoyaltyProcessor
+from ..hyperlink import DEFAULT_HYPERLINK_MODE
+
+OUTPUT_SUFFIX = "_NhuanBut_Premium.xlsx"
+SUMMARY_FILENAME = "Tong_hop_NhuanBut.xlsx"
+
+SUMMARY_COLUMNS = [
+    "STT",
+    "File đầu vào",
+    "Số dòng",
+    "Tổng mức nhuận bút",
+    "Tổng nhuận bút gia hạn",
+    "Số dòng lỗi",
+    "Loại hình chưa khớp",
+    "Trạng thái",
+    "File kết quả"]
+
+
+def _path_key(path) -> str:
+    """So sánh đường dẫn như hệ điều hành (Windows không phân biệt hoa/thường)"""
+    return os.path.normcase(os.path.abspath(str(path)))
+
+
+def collect_input_files(source: Union[str, Iterable[str]]) -> List[str]:
+    """
+    Nhận một thư mục hoặc danh sách file, trả về danh sách file Excel cần xử lý.
+    Bỏ qua file tạm của Excel (~$...) và các file kết quả đã sinh trước đó.
+    """
+    if isinstance(source, (str, Path)) and os.path.isdir(source):
+        candidates = sorted(
+            str(p) for p in Path(source).iterdir()
+            if p.suffix.lower() in (".xlsx", ".xls"))
+    elif isinstance(source, (str, Path)):
+        candidates = [str(source)]
+    else:
+        candidates = [str(p) for p in source]
+
+    files = []
+    seen = set()
+    for path in candidates:
+        name = Path(path).name
+        if name.startswith("~$") or name.endswith(OUTPUT_SUFFIX) or name == SUMMARY_FILENAME:
+            continue
+        key = _path_key(path)
+        if key in seen:
+            continue
+        seen.add(key)
+        files.append(path)
+    return files
+
+
+def build_output_path(input_path: str, output_dir: Optional[str] = None) -> str:
+    """File kết quả cạnh file gốc (hoặc trong output_dir nếu có)"""
+    path = Path(input_path)
+    folder = Path(output_dir) if output_dir else path.parent
+    return str(folder / f"{path.stem}{OUTPUT_SUFFIX}")
+
+
+def build_output_paths(files: List[str], output_dir: Optional[str] = None) -> Dict[str, str]:
+    """
+    File kết quả cho cả lô, không trùng nhau: A.xls và A.xlsx cùng thư mục, hoặc
+    file cùng tên ở nhiều thư mục khi có output_dir, sẽ ghi đè lên nhau.
+    File bị trùng thêm phần mở rộng gốc vào tên (A_xls_NhuanBut_Premium.xlsx),
+    vẫn trùng thì thêm số thứ tự (_2, _3...).
+    """
+    targets = {path: build_output_path(path, output_dir) for path in files}
+    counts: Dict[str, int] = {}
+    for target in targets.values():
+        key = _path_key(target)
+        counts[key] = counts.get(key, 0) + 1
+
+    used = {_path_key(t) for t in targets.values() if counts[_path_key(t)] == 1}
+    for path in files:
+        if counts[_path_key(targets[path])] == 1:
+            continue
+        source = Path(path)
+        folder = Path(targets[path]).parent
+        stem = f"{source.stem}_{source.suffix.lstrip('.').lower()}"
+        candidate, n = folder / f"{stem}{OUTPUT_SUFFIX}", 1
+        while _path_key(candidate) in used:
+            n += 1
+            candidate = folder / f"{stem}_{n}{OUTPUT_SUFFIX}"
+        used.add(_path_key(candidate))
+        targets[path] = str(candidate)
+    return targets
+
+
+def _process_file_worker(royalty_dict: Dict[str, Tuple[int, int, int]],
+                         hyperlink_mode: str,
+                         input_path: str,
+                         output_path: str,
+                         aliases: Optional[Dict[str, str]] = None) -> Dict:
+    """Chạy trong process con: xử lý một file và trả về dòng tổng hợp"""
+    processor = RoyaltyProcessor(royalty_dict, hyperlink_mode=hyperlink_mode, aliases=aliases)
+    try:
+        row_count, _ = RoyaltyProcessor.inspect_file(input_path)
+    except Exception:
+        row_count = 0
+    # File rất lớn: xử lý theo lô để nhiều process chạy song song không hết RAM
+    if row_count >= STREAMING_ROW_THRESHOLD:
+        success, message = processor.process_file_streaming(input_path, output_path)
+    else:
+        success, message = processor.process_file(input_path, output_path)
+    summary = {"rows": 0, "base_total": 0, "renewal_total": 0, "error_rows": 0,
+               "unmatched_usage": []}
+    summary.update(processor.last_summary)
+    summary.update({
+        "input": input_path,
+        "output": output_path if success else "",
+        "success": success,
+        "message": message,
+    })
+    return summary
+
+
+def _write_summary(results: List[Dict], summary_path: str) -> bool:
+    """Ghi file tổng hợp cho cả lô"""
+    try:
+        rows = []
+        for i, res in enumerate(results, start=1):
+            rows.append({
+                "STT": i,
+                "File đầu vào": Path(res["input"]).name,
+                "Số dòng": res["rows"],
+                "Tổng mức nhuận bút": res["base_total"],
+                "Tổng nhuận bút gia hạn": res["renewal_total"],
+                "Số dòng lỗi": res["error_rows"],
+                "Loại hình chưa khớp": "; ".join(
+                    f"{usage} ({count})" for usage, count in res.get("unmatched_usage", [])),
+                "Trạng thái": "OK" if res["success"] else res["message"].splitlines()[0],
+                "File kết quả": res["output"],
+            })
+        df = pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+        total = {col: "" for col in SUMMARY_COLUMNS}
+        total.update({
+            "File đầu vào": "TỔNG CỘNG",
+            "Số dòng": int(df["Số dòng"].sum()),
+            "Tổng mức nhuận bút": int(df["Tổng mức nhuận bút"].sum()),
+            "Tổng nhuận bút gia hạn": int(df["Tổng nhuận bút gia hạn"].sum()),
+            "Số dòng lỗi": int(df["Số dòng lỗi"].sum()),
+        })
+        df = pd.concat([df, pd.DataFrame([total])], ignore_index=True)
+
+        with pd.ExcelWriter(summary_path, engine='openpyxl') as writer:
+            df.to_excel(writer, sheet_name='Tổng hợp', index=False)
+
+        wb = load_workbook(summary_path)
+        ws = wb['Tổng hợp']
+        font = Font(name='Times New Roman', size=12)
+        bold_font = Font(name='Times New Roman', size=12, bold=True)
+        thin_border = Border(
+            left=Side(style='thin'), right=Side(style='thin'),
+            top=Side(style='thin'), bottom=Side(style='thin'))
+        yellow_fill = PatternFill(
+            start_color="FFFF00", end_color="FFFF00", fill_type="solid")
+
+        for row in ws.iter_rows():
+            for cell in row:
+                cell.font = font
+                cell.border = thin_border
+                if isinstance(cell.value, (int, float)):
+                    cell.number_format = '#,##0'
+        for cell in ws[1]:
+            cell.fill = yellow_fill
+        for cell in ws[ws.max_row]:
+            cell.font = bold_font
+            cell.fill = yellow_fill
+        for column_cells in ws.columns:
+            length = max(len(str(cell.value or '')) for cell in column_cells)
+            ws.column_dimensions[column_cells[0].column_letter].width = min(length + 2, 70)
+
+        wb.save(summary_path)
+        return True
+    except Exception as e:
+        print(f"Lỗi khi ghi file tổng hợp: {e}")
+        return False
+
+
+def process_batch(
+        royalty_dict: Dict[str, Tuple[int, int, int]],
+        source: Union[str, Iterable[str]],
+        output_dir: Optional[str] = None,
+        summary_path: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        hyperlink_mode: str = DEFAULT_HYPERLINK_MODE,
+        progress_callback: Optional[Callable] = None,
+        log_callback: Optional[Callable] = None,
+        aliases: Optional[Dict[str, str]] = None
+) -> Tuple[bool, str, List[Dict]]:
+    """
+    Xử lý nhiều file với cùng một bảng mức nhuận bút.
+    - source: thư mục hoặc danh sách file Excel
+    - Mỗi file được xử lý trong một process riêng, ghi ra file kết quả riêng
+    - Cuối cùng ghi file tổng hợp (mặc định Tong_hop_NhuanBut.xlsx)
+    Returns: (success, message, results) - results theo thứ tự file đầu vào
+    """
+    files = collect_input_files(source)
+    if not files:
+        return False, "❌ Không tìm thấy file Excel nào để xử lý", []
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    if not summary_path:
+        summary_dir = output_dir or str(Path(files[0]).parent)
+        summary_path = str(Path(summary_dir) / SUMMARY_FILENAME)
+
+    total = len(files)
+    workers = max(1, min(max_workers or os.cpu_count() or 1, total))
+    outputs = build_output_paths(files, output_dir)
+    if log_callback:
+        log_callback(f"📚 Xử lý hàng loạt {total} file với {workers} process...")
+        for path in files:
+            if outputs[path] != build_output_path(path, output_dir):
+                log_callback(f"⚠️ Trùng tên file kết quả: {Path(path).name} → {Path(outputs[path]).name}")
+    if progress_callback:
+        progress_callback(0.0)
+
+    results: Dict[str, Dict] = {}
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                _process_file_worker, dict(royalty_dict), hyperlink_mode,
+                path, outputs[path], dict(aliases or {})): path
+            for path in files
+        }
+        for fut in as_completed(futures):
+            path = futures[fut]
+            try:
+                res = fut.result()
+            except Exception as e:
+                res = {"input": path, "output": "", "success": False,
+                       "message": f"❌ Lỗi không xác định: {e}",
+                       "rows": 0, "base_total": 0, "renewal_total": 0, "error_rows": 0,
+                       "unmatched_usage": []}
+            results[path] = res
+            done += 1
+            if progress_callback:
+                progress_callback(done / total * 100)
+            if log_callback:
+                status = "✅" if res["success"] else "❌"
+                log_callback(f"{status} [{done}/{total}] {Path(path).name}")
+
+    ordered = [results[path] for path in files]
+    failed = [r for r in ordered if not r["success"]]
+    summary_ok = _write_summary(ordered, summary_path)
+    if log_callback and summary_ok:
+        log_callback(f"📊 File tổng hợp: {summary_path}")
+
+    message = (f"✅ Đã xử lý {total - len(failed)}/{total} file"
+               f"\n\n📊 File tổng hợp:\n{summary_path if summary_ok else 'Lỗi khi ghi file tổng hợp'}")
+    if failed:
+        message += "\n\n❌ File lỗi:\n" + "\n".join(
+            f"• {Path(r['input']).name}" for r in failed)
+    return not failed and summary_ok, message, ordered
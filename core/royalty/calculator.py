@@ -5,18 +5,24 @@ Module tính toán nhuận bút dựa trên logic từ excel_module.py
 """
 import pandas as pd
 from datetime import datetime
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
+
+from .rate_table import RateTable
 
 
 class RoyaltyCalculator:
     """Lớp tính toán nhuận bút cho các loại hình sử dụng"""
 
-    def __init__(self, royalty_dict: Dict[str, Tuple[int, int, int]]):
+    def __init__(self, royalty_dict: Dict[str, Tuple[int, int, int]],
+                 aliases: Optional[Dict[str, str]] = None,
+                 fold_diacritics: bool = True):
         """
         Khởi tạo với dictionary mức nhuận bút
         royalty_dict: {usage_type: (full_fee, half_fee, renew_fee)}
+        aliases / fold_diacritics: xem RateTable
         """
-        self.royalty_dict = {k.lower(): v for k, v in royalty_dict.items()}
+        self.rate_table = RateTable(
+            royalty_dict, aliases=aliases, fold_diacritics=fold_diacritics)
 
     def parse_duration_to_seconds(self, duration_str: str) -> int:
         """Chuyển đổi chuỗi thời lượng thành giây"""
@@ -53,14 +59,14 @@ class RoyaltyCalculator:
         """
         Tính mức nhuận bút cơ bản
         Returns: (fee, error_message)
+        Loại hình không có trong bảng trả về (0, "") và được đếm trong
+        rate_table.unmatched để báo cáo tổng hợp một lần cho cả file.
         """
-        usage_key = str(usage_type).strip().lower()
-
-        # Kiểm tra loại hình có trong dictionary không
-        if usage_key not in self.royalty_dict:
-            return 0, f"Loại hình '{usage_type}' không có trong bảng mức nhuận bút"
+        rates = self.rate_table.resolve(usage_type)
+        if rates is None:
+            return 0, ""
 
-        init_fee, half_fee, renew_fee = self.royalty_dict[usage_key]
+        init_fee, half_fee, renew_fee = rates
 
         # Tính toán dựa trên thời lượng
         total_seconds = self.parse_duration_to_seconds(duration)
@@ -3,76 +3,70 @@
 Module xử lý file Excel cho tính nhuận bút
 Đã sửa: Chỉ tính mức nhuận bút gia hạn khi có ngày gia hạn tương ứng
 Thêm mới: Cột Link YouTube với timestamp ở cuối
+Thêm mới: Chế độ streaming (process_file_streaming) cho file rất lớn
 """
+import pickle
+import tempfile
+
 import pandas as pd
-from openpyxl import load_workbook
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Border, Side, Alignment, PatternFill
-from typing import Dict, Tuple, Callable, Optional
+from openpyxl.utils import get_column_letter
+from typing import Dict, Iterator, List, Tuple, Callable, Optional
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 
 from .calculator import RoyaltyCalculator
 from ..datefmt import parse_date, to_ddmmyyyy
+from ..hyperlink import (
+    DEFAULT_HYPERLINK_MODE, HYPERLINK_TEXT, apply_hyperlink,
+    build_timestamp_urls, build_watch_urls, formula_display_text,
+    normalize_mode, restore_formula_text)
 
+LINK_COLUMN = 'Link YouTube Timestamp'
 
-class RoyaltyProcessor:
-    """Xử lý file Excel với tính toán nhuận bút"""
-
-    def __init__(self, royalty_dict: Dict[str, Tuple[int, int, int]]):
-        self.calculator = RoyaltyCalculator(royalty_dict)
-        self.errors = []
-
-    def _create_youtube_link_with_timestamp(self, video_id: str, time_range: str) -> str:
-        """
-        Tạo link YouTube với timestamp từ ID và khoảng thời gian
-
-        Args:
-            video_id: YouTube video ID (11 ký tự)
-            time_range: Chuỗi thời gian dạng "mm:ss - mm:ss" hoặc "hh:mm:ss - hh:mm:ss"
-
-        Returns:
-            Link YouTube với timestamp
-        """
-        if not video_id or pd.isna(video_id) or not time_range or pd.isna(time_range):
-            return ""
+# Cột do bước tính nhuận bút có thể thêm vào (chỉ khi có dòng sinh ra cột đó)
+COMPUTED_COLUMNS = (
+    ['Thời lượng', 'Thời hạn kết thúc']
+    + [f'Gia hạn (lần {i})' for i in range(1, 6)]
+    + ['Mức nhuận bút']
+    + [f'Mức nhuận bút gia hạn (lần {i})' for i in range(1, 6)]
+    + ['Error'])
 
-        video_id = str(video_id).strip()
-        time_range = str(time_range).strip()
+# Số dòng mỗi lô khi xử lý streaming
+DEFAULT_CHUNK_SIZE = 5000
 
-        # Kiểm tra video ID hợp lệ (11 ký tự)
-        if len(video_id) != 11:
-            return ""
+# File từ bấy nhiêu dòng trở lên thì tự chuyển sang chế độ streaming
+STREAMING_ROW_THRESHOLD = 50000
 
-        # Kiểm tra có dấu '-' để phân tách khoảng thời gian
-        if '-' not in time_range:
-            return f"https://www.youtube.com/watch?v={video_id}"
 
-        try:
-            # Lấy thời gian bắt đầu (phần trước dấu '-')
-            start_time = time_range.split('-')[0].strip()
-
-            # Chuyển đổi thành giây
-            parts = start_time.split(':')
-
-            if len(parts) == 2:  # Format mm:ss
-                minutes = int(parts[0])
-                seconds = int(parts[1])
-                total_seconds = minutes * 60 + seconds
-            elif len(parts) == 3:  # Format hh:mm:ss
-                hours = int(parts[0])
-                minutes = int(parts[1])
-                seconds = int(parts[2])
-                total_seconds = hours * 3600 + minutes * 60 + seconds
-            else:
-                # Format không hợp lệ, trả về link không có timestamp
-                return f"https://www.youtube.com/watch?v={video_id}"
+class RoyaltyProcessor:
+    """Xử lý file Excel với tính toán nhuận bút"""
 
-            # Tạo link với timestamp
-            return f"https://www.youtube.com/watch?v={video_id}&t={total_seconds}s"
+    def __init__(self, royalty_dict: Dict[str, Tuple[int, int, int]],
+                 hyperlink_mode: str = DEFAULT_HYPERLINK_MODE,
+                 initial_term: int = 2,
+                 ext_term: int = 2,
+                 aliases: Optional[Dict[str, str]] = None):
+        self.royalty_dict = dict(royalty_dict)
+        # Thời hạn ban đầu / gia hạn (năm), khớp với tùy chọn của tab Xử lý chính
+        self.initial_term = initial_term
+        self.ext_term = ext_term
+        # aliases: tên khác đã duyệt -> loại hình trong bảng (xem RateTable)
+        self.calculator = RoyaltyCalculator(royalty_dict, aliases=aliases)
+        self.hyperlink_mode = normalize_mode(hyperlink_mode)
+        self.errors = []
+        # Thống kê của lần process_file gần nhất (dùng cho báo cáo tổng hợp)
+        self.last_summary = {}
 
-        except (ValueError, IndexError):
-            # Lỗi khi parse, trả về link không có timestamp
-            return f"https://www.youtube.com/watch?v={video_id}"
+    @staticmethod
+    def _build_timestamp_links(result_df: pd.DataFrame) -> pd.Series:
+        """Tạo cột Link YouTube với timestamp cho cả bảng một lần"""
+        empty = pd.Series([""] * len(result_df), index=result_df.index)
+        video_ids = result_df['ID Video'] if 'ID Video' in result_df.columns else empty
+        time_ranges = result_df['Thời gian'] if 'Thời gian' in result_df.columns else empty
+        return build_timestamp_urls(video_ids, time_ranges)
 
     def process_file(
             self,
@@ -90,7 +84,12 @@ class RoyaltyProcessor:
                 log_callback("🔍 Đang kiểm tra file đầu vào...")
                 
             # Đọc file Excel
-            df = pd.read_excel(input_path, engine='openpyxl')
+            if self._is_xls(input_path):
+                df = pd.read_excel(input_path)
+            else:
+                df = pd.read_excel(input_path, engine='openpyxl')
+                # File kết quả ghi ở chế độ "formula" có ô ID Video là công thức
+                df = restore_formula_text(df, input_path)
 
             if df.empty:
                 return False, "❌ File Excel không có dữ liệu hoặc định dạng không đúng"
@@ -98,38 +97,11 @@ class RoyaltyProcessor:
             if log_callback:
                 log_callback(f"📊 Đã đọc {len(df)} dòng dữ liệu")
 
-            # Xử lý từng dòng
-            total_rows = len(df)
-            processed_data = []
-            
-            if log_callback:
-                log_callback("⚙️ Bắt đầu xử lý và tính toán nhuận bút...")
-
-            for idx, row in df.iterrows():
-                if progress_callback:
-                    progress = ((idx + 1) / total_rows) * 100
-                    progress_callback(progress)
+            result_df = self.process_dataframe(df, progress_callback, log_callback)
 
-                # +2 vì Excel bắt đầu từ 1 và có header
-                processed_row = self._process_row(row, idx + 2)
-                processed_data.append(processed_row)
-                
             if log_callback:
                 log_callback("💾 Đang tạo file Excel với định dạng...")
 
-            # Tạo DataFrame mới với dữ liệu đã xử lý
-            result_df = pd.DataFrame(processed_data)
-
-            # THÊM CỘT LINK Ở CUỐI CÙNG
-            # Di chuyển cột Link YouTube với timestamp vào cuối
-            if 'Link YouTube Timestamp' in result_df.columns:
-                # Lấy danh sách cột hiện tại trừ cột Link
-                cols = [col for col in result_df.columns if col != 'Link YouTube Timestamp']
-                # Thêm cột Link vào cuối
-                cols.append('Link YouTube Timestamp')
-                # Sắp xếp lại DataFrame
-                result_df = result_df[cols]
-
             # Ghi ra file Excel với định dạng
             success = self._write_formatted_excel(result_df, output_path)
 
@@ -137,7 +109,11 @@ class RoyaltyProcessor:
                 if log_callback:
                     log_callback("✅ Hoàn tất! Đã thêm cột Link YouTube với timestamp")
                     log_callback(f"📁 File kết quả: {output_path}")
-                return True, f"✅ Xử lý thành công!\n\n📁 Kết quả đã được lưu tại:\n{output_path}\n\n🔗 File bao gồm:\n• Mức nhuận bút được tính tự động\n• Link YouTube với timestamp\n• Định dạng Excel chuyên nghiệp"
+                message = f"✅ Xử lý thành công!\n\n📁 Kết quả đã được lưu tại:\n{output_path}\n\n🔗 File bao gồm:\n• Mức nhuận bút được tính tự động\n• Link YouTube với timestamp\n• Định dạng Excel chuyên nghiệp"
+                unmatched = self.last_summary.get('unmatched_usage')
+                if unmatched:
+                    message += "\n\n" + self.format_unmatched_report(unmatched)
+                return True, message
             else:
                 return False, "❌ Lỗi khi ghi file Excel. Vui lòng kiểm tra:\n• File kết quả có đang mở không?\n• Có quyền ghi vào thư mục không?"
 
@@ -150,15 +126,251 @@ class RoyaltyProcessor:
             else:
                 return False, f"❌ Lỗi không xác định:\n\n{error_msg}\n\nVui lòng liên hệ hỗ trợ kỹ thuật."
 
+    def process_dataframe(
+            self,
+            df: pd.DataFrame,
+            progress_callback: Optional[Callable] = None,
+            log_callback: Optional[Callable] = None
+    ) -> pd.DataFrame:
+        """
+        Tính nhuận bút trực tiếp trên DataFrame (không đọc/ghi file).
+        Dùng cho process_file và cho luồng nối tiếp từ pipeline.process_files.
+        Returns: DataFrame kết quả, cột Link YouTube Timestamp ở cuối
+        """
+        df = df.reset_index(drop=True)
+        self.calculator.rate_table.reset_stats()
+
+        if log_callback:
+            log_callback("⚙️ Bắt đầu xử lý và tính toán nhuận bút...")
+            self._log_ambiguous(log_callback)
+
+        result_df = self._process_chunk(df, 0, len(df), progress_callback)
+
+        self.last_summary = self._summarize(result_df)
+        unmatched = self.calculator.rate_table.unmatched_report()
+        self.last_summary['unmatched_usage'] = unmatched
+        if unmatched and log_callback:
+            log_callback(self.format_unmatched_report(unmatched))
+        return result_df
+
+    def _process_chunk(
+            self,
+            df: pd.DataFrame,
+            offset: int,
+            total_rows: int,
+            progress_callback: Optional[Callable] = None
+    ) -> pd.DataFrame:
+        """
+        Xử lý một đoạn dòng liên tiếp (offset = số dòng đã xử lý trước đó).
+        Returns: DataFrame kết quả, cột Link YouTube Timestamp ở cuối
+        """
+        processed_data = []
+        for idx, row in df.iterrows():
+            if progress_callback and total_rows:
+                progress_callback(((offset + idx + 1) / total_rows) * 100)
+
+            # +2 vì Excel bắt đầu từ 1 và có header
+            processed_data.append(self._process_row(row, offset + idx + 2))
+
+        # Tạo DataFrame mới với dữ liệu đã xử lý
+        result_df = pd.DataFrame(processed_data)
+
+        # Tạo link YouTube với timestamp (vector hóa cả cột), đặt ở cuối cùng
+        result_df[LINK_COLUMN] = self._build_timestamp_links(result_df)
+        cols = [col for col in result_df.columns if col != LINK_COLUMN]
+        cols.append(LINK_COLUMN)
+        return result_df[cols]
+
+    @staticmethod
+    def _is_xls(path: str) -> bool:
+        """File Excel 97-2003: openpyxl không đọc được, pandas đọc qua xlrd"""
+        return str(path).lower().endswith('.xls')
+
+    @staticmethod
+    def inspect_file(input_path: str) -> Tuple[int, List[str]]:
+        """
+        Đếm số dòng dữ liệu và đọc header mà không nạp cả file vào bộ nhớ.
+        Returns: (số dòng, danh sách cột)
+        File .xls (tối đa 65536 dòng) được đọc hẳn bằng pandas.
+        """
+        if RoyaltyProcessor._is_xls(input_path):
+            df = pd.read_excel(input_path)
+            return len(df), [str(c).strip() for c in df.columns]
+        wb = load_workbook(input_path, read_only=True)
+        try:
+            ws = wb.worksheets[0]
+            rows = ws.iter_rows(values_only=True)
+            header = [str(v).strip() for v in next(rows, ()) if v is not None]
+            # Ưu tiên dimension ghi trong file, không có thì đếm trực tiếp
+            count = ws.max_row - 1 if ws.max_row else sum(1 for _ in rows)
+            return max(count, 0), header
+        finally:
+            wb.close()
+
+    @staticmethod
+    def _iter_chunks(input_path: str,
+                     chunk_size: int) -> Iterator[pd.DataFrame]:
+        """
+        Đọc sheet đầu tiên theo từng lô chunk_size dòng (openpyxl read-only).
+        Ô công thức =HYPERLINK() (file ghi ở chế độ "formula") được đổi về
+        text hiển thị như restore_formula_text().
+        File .xls (tối đa 65536 dòng) được đọc hẳn bằng pandas rồi chia lô.
+        """
+        if RoyaltyProcessor._is_xls(input_path):
+            df = pd.read_excel(input_path)
+            for start in range(0, len(df), chunk_size):
+                yield df.iloc[start:start + chunk_size].reset_index(drop=True)
+            return
+        wb = load_workbook(input_path, read_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            header = []
+            for i, value in enumerate(next(rows, ())):
+                name = str(value).strip() if value is not None else f'Unnamed: {i}'
+                # Cột trùng tên: đặt hậu tố .1, .2 như pandas
+                base, n = name, 0
+                while name in header:
+                    n += 1
+                    name = f'{base}.{n}'
+                header.append(name)
+            width = len(header)
+
+            buffer = []
+            for values in rows:
+                if values is None or all(v is None for v in values):
+                    continue
+                values = [formula_display_text(v) for v in values[:width]]
+                values += [None] * (width - len(values))
+                buffer.append(values)
+                if len(buffer) >= chunk_size:
+                    yield pd.DataFrame(buffer, columns=header)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=header)
+        finally:
+            wb.close()
+
+    def process_file_streaming(
+            self,
+            input_path: str,
+            output_path: str,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            progress_callback: Optional[Callable] = None,
+            log_callback: Optional[Callable] = None
+    ) -> Tuple[bool, str]:
+        """
+        Như process_file nhưng đọc/tính/ghi theo từng lô chunk_size dòng:
+        đọc bằng openpyxl read-only, ghi vào workbook write-only với định dạng
+        gắn ngay khi ghi. Bộ nhớ không tăng theo số dòng của file.
+        Cột giống process_file (cột tính thêm chỉ có khi có dòng sinh ra nó);
+        khác biệt: giá trị đọc qua openpyxl nên không ép kiểu như pd.read_excel
+        (vd. cột số có ô trống vẫn là int), độ rộng cột tính trước khi gắn link.
+        Returns: (success, message)
+        """
+        writer = None
+        try:
+            if log_callback:
+                log_callback("🔍 Đang kiểm tra file đầu vào...")
+            total_rows, _ = self.inspect_file(input_path)
+            if total_rows <= 0:
+                return False, "❌ File Excel không có dữ liệu hoặc định dạng không đúng"
+            if log_callback:
+                log_callback(f"📊 File có khoảng {total_rows} dòng, xử lý theo lô {chunk_size} dòng")
+                log_callback("⚙️ Bắt đầu xử lý và tính toán nhuận bút...")
+                self._log_ambiguous(log_callback)
+
+            self.calculator.rate_table.reset_stats()
+            writer = _StreamingResultWriter(output_path, self.hyperlink_mode)
+            totals = {'rows': 0, 'base_total': 0, 'renewal_total': 0, 'error_rows': 0}
+            offset = 0
+            for chunk in self._iter_chunks(input_path, chunk_size):
+                result_df = self._process_chunk(
+                    chunk, offset, max(total_rows, offset + len(chunk)),
+                    progress_callback)
+                writer.write_chunk(result_df)
+                for key, value in self._summarize(result_df).items():
+                    totals[key] += value
+                offset += len(chunk)
+                if log_callback:
+                    log_callback(f"   ✔ Đã xử lý {offset}/{max(total_rows, offset)} dòng")
+
+            if offset == 0:
+                return False, "❌ File Excel không có dữ liệu hoặc định dạng không đúng"
+            if progress_callback:
+                progress_callback(100)
+
+            if log_callback:
+                log_callback("💾 Đang lưu file Excel...")
+            writer.save()
+
+            self.last_summary = totals
+            unmatched = self.calculator.rate_table.unmatched_report()
+            self.last_summary['unmatched_usage'] = unmatched
+            if unmatched and log_callback:
+                log_callback(self.format_unmatched_report(unmatched))
+            if log_callback:
+                log_callback("✅ Hoàn tất! Đã thêm cột Link YouTube với timestamp")
+                log_callback(f"📁 File kết quả: {output_path}")
+
+            message = f"✅ Xử lý thành công ({offset} dòng)!\n\n📁 Kết quả đã được lưu tại:\n{output_path}"
+            if unmatched:
+                message += "\n\n" + self.format_unmatched_report(unmatched)
+            return True, message
+
+        except Exception as e:
+            error_msg = str(e)
+            if "Permission denied" in error_msg:
+                return False, "❌ Lỗi quyền truy cập!\n\nVui lòng:\n• Đóng file Excel nếu đang mở\n• Chạy ứng dụng với quyền Administrator\n• Kiểm tra quyền ghi vào thư mục"
+            elif "No such file" in error_msg:
+                return False, "❌ Không tìm thấy file!\n\nVui lòng kiểm tra:\n• Đường dẫn file có đúng không?\n• File có bị di chuyển hoặc xóa không?"
+            else:
+                return False, f"❌ Lỗi không xác định:\n\n{error_msg}\n\nVui lòng liên hệ hỗ trợ kỹ thuật."
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def _log_ambiguous(self, log_callback: Callable):
+        """Báo các loại hình chỉ khác dấu nhưng khác mức (chỉ khớp đúng từng tên)"""
+        for names in self.calculator.rate_table.ambiguous_report():
+            log_callback(f"⚠️ Loại hình chỉ khác nhau ở dấu nhưng khác mức: "
+                         f"{', '.join(repr(n) for n in names)} - chỉ tính khi ghi đúng tên")
+
+    @staticmethod
+    def format_unmatched_report(unmatched) -> str:
+        """Một thông báo gộp cho các loại hình không có trong bảng mức nhuận bút"""
+        total = sum(count for _, count in unmatched)
+        lines = [f"⚠️ {len(unmatched)} loại hình không có trong bảng mức nhuận bút "
+                 f"({total} dòng, mức nhuận bút = 0):"]
+        lines += [f"   • '{usage}': {count} dòng" for usage, count in unmatched]
+        return "\n".join(lines)
+
+    @staticmethod
+    def _summarize(result_df: pd.DataFrame) -> Dict:
+        """Tổng hợp số dòng, tổng nhuận bút và số dòng lỗi của một file"""
+        def _total(col):
+            if col not in result_df.columns:
+                return 0
+            return int(pd.to_numeric(result_df[col], errors='coerce').fillna(0).sum())
+
+        renewal_total = sum(
+            _total(f'Mức nhuận bút gia hạn (lần {i})') for i in range(1, 6))
+        error_rows = 0
+        if 'Error' in result_df.columns:
+            errors = result_df['Error'].fillna('').astype(str).str.strip()
+            error_rows = int((errors != '').sum())
+
+        return {
+            'rows': len(result_df),
+            'base_total': _total('Mức nhuận bút'),
+            'renewal_total': renewal_total,
+            'error_rows': error_rows,
+        }
+
     def _process_row(self, row: pd.Series, excel_row_num: int) -> Dict:
         """Xử lý một dòng dữ liệu"""
         processed = row.to_dict()
         error_notes = []
 
-        # Lấy ID Video và Thời gian để tạo link
-        video_id = row.get('ID Video', '')
-        time_range = row.get('Thời gian', '')
-
         # Xử lý cột Thời gian (cột H - index 7)
         time_val = row.get('Thời gian', '')
         if pd.notna(time_val):
@@ -167,9 +379,6 @@ class RoyaltyProcessor:
             processed['Thời gian'] = formatted_time
             processed['Thời lượng'] = duration
 
-            # Cập nhật time_range với giá trị đã format
-            time_range = formatted_time
-
             if "error" in formatted_time.lower():
                 error_notes.append(
                     f"Lỗi định dạng thời gian ở dòng {excel_row_num}")
@@ -228,9 +437,6 @@ class RoyaltyProcessor:
             for i in range(1, 6):
                 processed[f'Mức nhuận bút gia hạn (lần {i})'] = ''
 
-        # THÊM MỚI: Tạo link YouTube với timestamp
-        processed['Link YouTube Timestamp'] = self._create_youtube_link_with_timestamp(video_id, time_range)
-
         # Ghi chú lỗi nếu có
         if error_notes:
             existing_error = processed.get('Error', '')
@@ -249,8 +455,8 @@ class RoyaltyProcessor:
         if not start_dt:
             return dates
 
-        # Thời hạn kết thúc: +2 năm - 1 ngày
-        end_dt = start_dt + relativedelta(years=2) - relativedelta(days=1)
+        # Thời hạn kết thúc: +initial_term năm - 1 ngày
+        end_dt = start_dt + relativedelta(years=self.initial_term) - relativedelta(days=1)
         dates['Thời hạn kết thúc'] = to_ddmmyyyy(end_dt)
 
         # Tính 5 lần gia hạn - CHỈ khi đã qua thời hạn
@@ -262,8 +468,8 @@ class RoyaltyProcessor:
             if last_date < current_date:
                 # Ngày bắt đầu gia hạn = ngày sau khi kết thúc
                 extension_start = last_date + relativedelta(days=1)
-                # Ngày kết thúc gia hạn = +2 năm từ ngày bắt đầu gia hạn - 1 ngày
-                extension_end = extension_start + relativedelta(years=2) - relativedelta(days=1)
+                # Ngày kết thúc gia hạn = +ext_term năm từ ngày bắt đầu gia hạn - 1 ngày
+                extension_end = extension_start + relativedelta(years=self.ext_term) - relativedelta(days=1)
                 dates[f'Gia hạn (lần {i})'] = to_ddmmyyyy(extension_end)
                 last_date = extension_end
             else:
@@ -272,6 +478,10 @@ class RoyaltyProcessor:
 
         return dates
 
+    def write_result(self, df: pd.DataFrame, output_path: str) -> bool:
+        """Ghi DataFrame kết quả (từ process_dataframe) ra Excel có định dạng"""
+        return self._write_formatted_excel(df, output_path)
+
     def _write_formatted_excel(self, df: pd.DataFrame,
                                output_path: str) -> bool:
         """Ghi file Excel với định dạng"""
@@ -322,6 +532,8 @@ class RoyaltyProcessor:
                 if cell.value == 'Link YouTube Timestamp':
                     link_col_index = i + 1
                     break
+            if self.hyperlink_mode == HYPERLINK_TEXT:
+                link_col_index = None
 
             # Định dạng toàn bộ sheet
             for row_idx, row in enumerate(ws.iter_rows(min_row=2), start=2):
@@ -344,8 +556,8 @@ class RoyaltyProcessor:
                     if col_idx == link_col_index:
                         link_value = cell.value
                         if link_value and str(link_value).startswith('https://'):
-                            cell.hyperlink = str(link_value)
-                            cell.font = hyperlink_font
+                            apply_hyperlink(cell, str(link_value),
+                                            self.hyperlink_mode, hyperlink_font)
 
             # Auto-fit columns
             for column_cells in ws.columns:
@@ -364,15 +576,11 @@ class RoyaltyProcessor:
                     id_col_index = i + 1
                     break
 
-            if id_col_index:
-                for row in ws.iter_rows(
-                        min_row=2, min_col=id_col_index, max_col=id_col_index):
-                    for cell in row:
-                        video_id = cell.value
-                        if video_id and isinstance(
-                                video_id, str) and len(video_id) == 11:
-                            cell.hyperlink = f"https://www.youtube.com/watch?v={video_id}"
-                            cell.font = hyperlink_font
+            if id_col_index and self.hyperlink_mode != HYPERLINK_TEXT:
+                urls = build_watch_urls(df['ID Video']).tolist()
+                for url, row in zip(urls, ws.iter_rows(
+                        min_row=2, min_col=id_col_index, max_col=id_col_index)):
+                    apply_hyperlink(row[0], url, self.hyperlink_mode, hyperlink_font)
 
             wb.save(output_path)
 
@@ -384,4 +592,115 @@ class RoyaltyProcessor:
 
         except Exception as e:
             print(f"Lỗi khi ghi file Excel: {e}")
-            return False
\ No newline at end of file
+            return False
+
+
+class _StreamingResultWriter:
+    """
+    Ghi file kết quả theo từng lô vào workbook write-only, định dạng giống
+    _write_formatted_excel nhưng gắn ngay trên từng ô khi ghi.
+
+    Tập cột giống process_file (DataFrame từ các dòng: cột theo thứ tự xuất
+    hiện đầu tiên, vd. cột Error chỉ có khi có dòng lỗi) nên chỉ biết được khi
+    đã xử lý hết: các lô được tạm ghi ra file đệm (pickle) trên đĩa, save()
+    mới ghi header và dữ liệu. Bộ nhớ vẫn chỉ một lô mỗi lúc.
+    """
+
+    def __init__(self, output_path: str, hyperlink_mode: str):
+        self.output_path = output_path
+        self.hyperlink_mode = hyperlink_mode
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet('Kết quả')
+        self.columns: List[str] = []
+        self._widths: Dict[str, int] = {}
+        self._spill = tempfile.TemporaryFile(prefix='royalty_', suffix='.pkl')
+
+        self.font = Font(name='Times New Roman', size=12)
+        self.hyperlink_font = Font(
+            name='Times New Roman', size=12, color='0000FF', underline='single')
+        self.border = Border(
+            left=Side(style='thin'), right=Side(style='thin'),
+            top=Side(style='thin'), bottom=Side(style='thin'))
+        self.align = Alignment(horizontal='left', vertical='center')
+        self.yellow_fill = PatternFill(
+            start_color="FFFF00", end_color="FFFF00", fill_type="solid")
+
+    def _cell(self, value, fill=None):
+        cell = WriteOnlyCell(self.ws, value=value)
+        cell.font = self.font
+        cell.border = self.border
+        cell.alignment = self.align
+        if fill is not None:
+            cell.fill = fill
+        return cell
+
+    def write_chunk(self, result_df: pd.DataFrame):
+        """Ghi nhận cột/độ rộng của lô rồi đệm lô ra đĩa"""
+        for col in result_df.columns:
+            if col != LINK_COLUMN and col not in self._widths:
+                self.columns.append(col)
+                self._widths[col] = len(str(col))
+            values = result_df[col].dropna().astype(str)
+            if len(values):
+                self._widths[col] = max(self._widths.get(col, len(str(col))),
+                                        int(values.str.len().max()))
+        pickle.dump(result_df, self._spill, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _start(self):
+        """Cố định header và độ rộng cột (phải đặt trước dòng đầu tiên)"""
+        self.columns.append(LINK_COLUMN)
+        for col_idx, col in enumerate(self.columns, start=1):
+            limit = 70 if col == LINK_COLUMN else 50
+            width = self._widths.get(col, len(str(col)))
+            self.ws.column_dimensions[get_column_letter(col_idx)].width = min(width + 2, limit)
+        self.ws.append([self._cell(col, self.yellow_fill) for col in self.columns])
+
+    def _write_rows(self, result_df: pd.DataFrame):
+        df = result_df.reindex(columns=self.columns)
+        with_links = self.hyperlink_mode != HYPERLINK_TEXT
+        id_urls = (build_watch_urls(df['ID Video']).tolist()
+                   if with_links and 'ID Video' in result_df.columns else None)
+        id_pos = self.columns.index('ID Video') if id_urls is not None else -1
+        link_pos = len(self.columns) - 1
+
+        for i, values in enumerate(df.itertuples(index=False, name=None)):
+            cells = []
+            for col_idx, value in enumerate(values, start=1):
+                if value is not None and not isinstance(value, str) and pd.isna(value):
+                    value = None
+                cell = self._cell(value)
+
+                # Cột R-W (18-23): mức nhuận bút có giá trị thì tô vàng
+                if 18 <= col_idx <= 23:
+                    if value and str(value).strip() and str(value) != '0':
+                        cell.fill = self.yellow_fill
+                        if isinstance(value, (int, float)):
+                            cell.number_format = '#,##0'
+
+                pos = col_idx - 1
+                if with_links and pos == link_pos:
+                    if value and str(value).startswith('https://'):
+                        apply_hyperlink(cell, str(value), self.hyperlink_mode,
+                                        self.hyperlink_font)
+                elif pos == id_pos:
+                    apply_hyperlink(cell, id_urls[i], self.hyperlink_mode,
+                                    self.hyperlink_font)
+                cells.append(cell)
+            self.ws.append(cells)
+
+    def save(self):
+        self._start()
+        self._spill.seek(0)
+        while True:
+            try:
+                chunk = pickle.load(self._spill)
+            except EOFError:
+                break
+            self._write_rows(chunk)
+        self.wb.save(self.output_path)
+        self.close()
+
+    def close(self):
+        """Xóa file đệm (gọi cả khi bị lỗi giữa chừng)"""
+        if not self._spill.closed:
+            self._spill.close()
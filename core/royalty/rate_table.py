@@ -0,0 +1,121 @@
+# vcpmctool/core/royalty/rate_table.py
+"""
+Bảng mức nhuận bút đã "biên dịch": chuẩn hóa khóa loại hình một lần
+(Unicode NFC, gộp khoảng trắng, không phân biệt hoa thường, tùy chọn bỏ dấu,
+danh sách alias) và tra cứu mỗi giá trị loại hình khác nhau đúng một lần.
+
+Không có alias mặc định: alias làm loại hình vốn không khớp được tính tiền,
+nên chỉ dùng danh sách đã được người phụ trách nhuận bút duyệt
+(Settings.usage_aliases). Cùng lý do, hai loại hình chỉ khác nhau ở dấu mà
+có mức khác nhau thì không khớp kiểu bỏ dấu cho cả hai (xem ambiguous_report).
+"""
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+Rates = Tuple[int, int, int]
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_usage(value, fold_diacritics: bool = False) -> str:
+    """
+    Chuẩn hóa tên loại hình: NFC, gộp khoảng trắng, chữ thường.
+    fold_diacritics=True bỏ dấu tiếng Việt ("Hát live" -> "hat live").
+    """
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    text = unicodedata.normalize("NFC", str(value))
+    text = _WHITESPACE.sub(" ", text).strip().casefold()
+    if fold_diacritics:
+        text = text.replace("đ", "d")
+        text = "".join(
+            ch for ch in unicodedata.normalize("NFD", text)
+            if not unicodedata.combining(ch))
+    return text
+
+
+class RateTable:
+    """Tra cứu mức nhuận bút theo loại hình với khóa đã chuẩn hóa"""
+
+    def __init__(self, royalty_dict: Dict[str, Rates],
+                 aliases: Optional[Dict[str, str]] = None,
+                 fold_diacritics: bool = True):
+        """
+        royalty_dict: {usage_type: (full_fee, half_fee, renew_fee)}
+        aliases: {tên khác: loại hình trong royalty_dict}, mặc định không có
+        fold_diacritics: cho phép khớp khi bỏ dấu ("Hat live" ~ "Hát live")
+        """
+        self.fold_diacritics = fold_diacritics
+        self._exact: Dict[str, Rates] = {}
+        self._folded: Dict[str, Rates] = {}
+        # Khóa bỏ dấu -> các tên đã thêm; khóa có hai mức khác nhau bị bỏ khỏi _folded
+        self._folded_names: Dict[str, List[str]] = {}
+        self._ambiguous = set()
+        for usage, rates in royalty_dict.items():
+            self._add(usage, rates)
+
+        for alias, target in (aliases or {}).items():
+            rates = self._lookup(target)
+            key = normalize_usage(alias)
+            if rates is not None and key not in self._exact:
+                self._add(alias, rates)
+
+        # Giá trị gốc -> mức đã tra (None nếu không khớp)
+        self._resolved: Dict[str, Optional[Rates]] = {}
+        self.unmatched: Counter = Counter()
+
+    def _add(self, usage: str, rates: Rates):
+        self._exact[normalize_usage(usage)] = rates
+        if not self.fold_diacritics:
+            return
+        key = normalize_usage(usage, fold_diacritics=True)
+        self._folded_names.setdefault(key, []).append(usage)
+        if key in self._ambiguous:
+            return
+        if key in self._folded and self._folded[key] != rates:
+            # Không biết mức nào đúng: chỉ còn khớp chính xác từng tên
+            del self._folded[key]
+            self._ambiguous.add(key)
+        else:
+            self._folded[key] = rates
+
+    def _lookup(self, value) -> Optional[Rates]:
+        key = normalize_usage(value)
+        if key in self._exact:
+            return self._exact[key]
+        if self.fold_diacritics:
+            return self._folded.get(normalize_usage(value, fold_diacritics=True))
+        return None
+
+    def __contains__(self, usage_type) -> bool:
+        return self._lookup(usage_type) is not None
+
+    def resolve(self, usage_type) -> Optional[Rates]:
+        """
+        Trả về (full_fee, half_fee, renew_fee) hoặc None.
+        Mỗi giá trị khác nhau chỉ được chuẩn hóa/tra cứu một lần; giá trị không
+        khớp được đếm vào self.unmatched thay vì báo lỗi từng dòng.
+        """
+        raw = str(usage_type).strip()
+        if raw not in self._resolved:
+            self._resolved[raw] = self._lookup(raw)
+        rates = self._resolved[raw]
+        if rates is None:
+            self.unmatched[raw] += 1
+        return rates
+
+    def reset_stats(self):
+        """Xóa thống kê loại hình không khớp (gọi khi bắt đầu một file mới)"""
+        self.unmatched = Counter()
+
+    def ambiguous_report(self) -> List[List[str]]:
+        """Các nhóm loại hình chỉ khác nhau ở dấu nhưng có mức khác nhau (không khớp kiểu bỏ dấu)"""
+        return [self._folded_names[key] for key in sorted(self._ambiguous)]
+
+    def unmatched_report(self) -> List[Tuple[str, int]]:
+        """Danh sách (loại hình, số dòng) không có trong bảng, nhiều nhất trước"""
+        return self.unmatched.most_common()
@@ -1,5 +1,6 @@
 # vcpmctool/main.py - PySide6 Version
 import sys
+import multiprocessing
 from PySide6.QtWidgets import QApplication
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QIcon, QFont
@@ -37,4 +38,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Cần cho xử lý nhuận bút hàng loạt (ProcessPoolExecutor) khi đóng gói exe
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
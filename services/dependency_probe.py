@@ -0,0 +1,141 @@
+# vcpmctool/services/dependency_probe.py
+"""
+Kiểm tra thư viện của tab AIO (yt-dlp, pandas, openpyxl), có cache.
+
+- Khoá cache: đường dẫn interpreter + version từng gói (đọc metadata, không import)
+- Trúng cache (bộ nhớ hoặc file): không chạy subprocess nào
+- Trượt cache (lần đầu, đổi Python, cài/nâng cấp gói): một subprocess import
+  từng gói và đo thời gian import, kết quả ghi lại cho các lần mở sau
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+from importlib import metadata
+from typing import Dict, List, Optional
+
+# module import -> tên gói trên pip
+REQUIRED = {"yt_dlp": "yt-dlp", "pandas": "pandas", "openpyxl": "openpyxl"}
+PROBE_TIMEOUT = 60
+# Tổng thời gian import vượt mức này thì báo môi trường chậm
+SLOW_IMPORT_SECONDS = 3.0
+
+# Import lần lượt, in thời gian của từng module (None nếu lỗi)
+_PROBE_SCRIPT = (
+    "import importlib, json, sys, time\n"
+    "out = {}\n"
+    "for name in sys.argv[1:]:\n"
+    "    t = time.perf_counter()\n"
+    "    try:\n"
+    "        importlib.import_module(name)\n"
+    "        out[name] = round(time.perf_counter() - t, 3)\n"
+    "    except Exception:\n"
+    "        out[name] = None\n"
+    "print(json.dumps(out))\n"
+)
+
+
+def cache_path() -> str:
+    """Cùng thư mục với cache metadata video của Update (AIO_CACHE_DIR)."""
+    folder = os.environ.get("AIO_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".aio_tool")
+    return os.path.join(folder, "dependency_probe.json")
+
+
+def installed_versions() -> Dict[str, Optional[str]]:
+    versions = {}
+    for dist in REQUIRED.values():
+        try:
+            versions[dist] = metadata.version(dist)
+        except metadata.PackageNotFoundError:
+            versions[dist] = None
+    return versions
+
+
+class ProbeResult:
+    """Kết quả kiểm tra: missing (tên gói pip), versions, import_seconds theo module."""
+
+    def __init__(self, python: str, versions: Dict[str, Optional[str]],
+                 import_seconds: Dict[str, Optional[float]], cached: bool = False):
+        self.python = python
+        self.versions = versions
+        self.import_seconds = import_seconds
+        self.cached = cached
+
+    @property
+    def missing(self) -> List[str]:
+        return [dist for module, dist in REQUIRED.items() if self.import_seconds.get(module) is None]
+
+    @property
+    def ok(self) -> bool:
+        return not self.missing
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(s for s in self.import_seconds.values() if s)
+
+    @property
+    def slow(self) -> bool:
+        return self.total_seconds >= SLOW_IMPORT_SECONDS
+
+    def summary(self) -> str:
+        versions = ", ".join(f"{dist} {v or '?'}" for dist, v in self.versions.items())
+        timing = ", ".join(f"{m} {s:.2f}s" for m, s in self.import_seconds.items() if s is not None)
+        source = "cache" if self.cached else "vừa đo"
+        return f"{versions} | import {self.total_seconds:.2f} giây ({timing}; {source})"
+
+    def to_dict(self) -> dict:
+        return {"python": self.python, "versions": self.versions, "import_seconds": self.import_seconds}
+
+
+_lock = threading.Lock()
+_last: Optional[ProbeResult] = None
+
+
+def _load(python: str, versions: dict) -> Optional[ProbeResult]:
+    try:
+        with open(cache_path(), encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if data.get("python") != python or data.get("versions") != versions:
+        return None
+    return ProbeResult(python, versions, data.get("import_seconds") or {}, cached=True)
+
+
+def _save(result: ProbeResult) -> None:
+    path = cache_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(result.to_dict(), fh, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def probe(force: bool = False, timeout: float = PROBE_TIMEOUT) -> ProbeResult:
+    """Kết quả kiểm tra cho interpreter hiện tại; chỉ chạy subprocess khi
+    interpreter hoặc version gói đã đổi (hoặc force=True).
+    Lỗi khi chạy subprocess (timeout...) được raise, không ghi cache."""
+    global _last
+    python = os.path.abspath(sys.executable)
+    with _lock:
+        versions = installed_versions()
+        if not force:
+            if _last is not None and _last.python == python and _last.versions == versions:
+                return _last
+            cached = _load(python, versions)
+            if cached is not None:
+                _last = cached
+                return cached
+        completed = subprocess.run([python, "-c", _PROBE_SCRIPT, *REQUIRED],
+                                   capture_output=True, text=True, timeout=timeout)
+        lines = completed.stdout.strip().splitlines()
+        if completed.returncode != 0 or not lines:
+            raise RuntimeError(completed.stderr.strip() or f"exit code {completed.returncode}")
+        result = ProbeResult(python, versions, json.loads(lines[-1]))
+        _save(result)
+        _last = result
+        return result
@@ -12,3 +12,8 @@ class Settings:
         self.log_level = "INFO"
         self.multithread = True
         self.ui_scale = 100
+        # "relationship", "formula" hoặc "text" (xem core/hyperlink.py)
+        self.hyperlink_mode = "relationship"
+        # Tên loại hình khác -> loại hình trong bảng mức nhuận bút; để trống
+        # cho tới khi người phụ trách nhuận bút duyệt (xem core/royalty/rate_table.py)
+        self.usage_aliases = {}
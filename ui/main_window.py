@@ -52,7 +52,8 @@ class MainWindow(QMainWindow):
         
         # Tạo các tab
         self.main_tab = MainProcessingTab(self.settings, self.logger)
-        self.royalty_tab = RoyaltyTab(self.logger)
+        self.royalty_tab = RoyaltyTab(self.logger, self.settings)
+        self.main_tab.royalty_rates_provider = self.royalty_tab.get_royalty_rates
         self.update_tab = UpdateTab(self.logger)
         self.settings_tab = SettingsTab(self.settings, self)
         self.help_tab = HelpTab()
@@ -1203,6 +1204,11 @@ class MainWindow(QMainWindow):
             """
         )
         
+    def closeEvent(self, event):
+        """Đóng app: tắt job/daemon AIO trước khi thoát"""
+        self.update_tab.shutdown()
+        super().closeEvent(event)
+        
     def update_status(self, message: str):
         """Cập nhật status bar"""
         self.status_bar.showMessage(f"🚀 {message}")
\ No newline at end of file
@@ -11,7 +11,7 @@ from PySide6.QtGui import QFont
 import pandas as pd
 from pathlib import Path
 
-from core.pipeline import process_files
+from core.pipeline import process_files, process_files_with_royalty
 from services.settings import Settings
 from services.logger import Logger
 
@@ -24,27 +24,45 @@ class ProcessingWorker(QThread):
     finished = Signal(pd.DataFrame, bool)
     error_occurred = Signal(str)
     
-    def __init__(self, files, initial_term, ext_term, logger, auto_proper):
+    def __init__(self, files, initial_term, ext_term, logger, auto_proper,
+                 hyperlink_mode="relationship", royalty_dict=None, aliases=None):
         super().__init__()
         self.files = files
         self.initial_term = initial_term
         self.ext_term = ext_term
         self.logger = logger
         self.auto_proper = auto_proper
+        self.hyperlink_mode = hyperlink_mode
+        self.royalty_dict = royalty_dict
+        self.aliases = aliases
         
     def run(self):
         try:
             self.status_updated.emit("Đang xử lý file...")
             self.progress_updated.emit(10)
             
-            results, success = process_files(
-                self.files,
-                self.initial_term,
-                self.ext_term,
-                self.logger,
-                auto_backup=True,
-                auto_proper=self.auto_proper
-            )
+            if self.royalty_dict:
+                # Chuyển thẳng DataFrame sang tính nhuận bút, chỉ ghi file một lần
+                results, success = process_files_with_royalty(
+                    self.files,
+                    self.initial_term,
+                    self.ext_term,
+                    self.royalty_dict,
+                    self.logger,
+                    auto_proper=self.auto_proper,
+                    hyperlink_mode=self.hyperlink_mode,
+                    aliases=self.aliases
+                )
+            else:
+                results, success = process_files(
+                    self.files,
+                    self.initial_term,
+                    self.ext_term,
+                    self.logger,
+                    auto_backup=True,
+                    auto_proper=self.auto_proper,
+                    hyperlink_mode=self.hyperlink_mode
+                )
             
             self.progress_updated.emit(100)
             self.status_updated.emit("Hoàn tất!" if success else "Hoàn tất với cảnh báo")
@@ -63,6 +81,8 @@ class MainProcessingTab(QWidget):
         self.logger = logger
         self.selected_files = []
         self.worker = None
+        # Hàm lấy bảng mức nhuận bút (MainWindow gắn RoyaltyTab.get_royalty_rates), raise ValueError nếu chưa hợp lệ
+        self.royalty_rates_provider = None
         
         self._setup_ui()
         
@@ -121,6 +141,12 @@ class MainProcessingTab(QWidget):
         self.auto_proper_cb.setToolTip("Tự động viết hoa chữ cái đầu của từng từ")
         options_layout.addRow(self.auto_proper_cb)
         
+        self.with_royalty_cb = QCheckBox("Tính nhuận bút luôn (mức ở tab Nhuận bút)")
+        self.with_royalty_cb.setToolTip(
+            "Chuyển kết quả thẳng sang tính nhuận bút với cùng thời hạn,\n"
+            "ghi một file *_Ket_qua_NhuanBut.xlsx thay vì xuất rồi nạp lại")
+        options_layout.addRow(self.with_royalty_cb)
+        
         layout.addWidget(options_group)
         
         # Process button
@@ -216,6 +242,17 @@ class MainProcessingTab(QWidget):
             QMessageBox.warning(self, "Lỗi", "Vui lòng nhập số hợp lệ cho thời hạn!")
             return
             
+        royalty_dict = None
+        if self.with_royalty_cb.isChecked():
+            if not self.royalty_rates_provider:
+                QMessageBox.warning(self, "Lỗi", "Không lấy được bảng mức nhuận bút!")
+                return
+            try:
+                royalty_dict = self.royalty_rates_provider()
+            except ValueError as e:
+                QMessageBox.warning(self, "Lỗi", f"Bảng mức nhuận bút (tab Nhuận bút) chưa hợp lệ:\n\n{e}")
+                return
+            
         # Disable UI during processing
         self.process_btn.setEnabled(False)
         self.progress_bar.setVisible(True)
@@ -227,7 +264,10 @@ class MainProcessingTab(QWidget):
             initial_term,
             ext_term,
             self.logger,
-            self.auto_proper_cb.isChecked()
+            self.auto_proper_cb.isChecked(),
+            getattr(self.settings, 'hyperlink_mode', 'relationship'),
+            royalty_dict,
+            getattr(self.settings, 'usage_aliases', None)
         )
         
         self.worker.progress_updated.connect(self.progress_bar.setValue)
@@ -10,8 +10,10 @@ from PySide6.QtGui import QFont
 import pandas as pd
 from pathlib import Path
 
-from core.royalty.processor import RoyaltyProcessor
+from core.royalty.processor import STREAMING_ROW_THRESHOLD, RoyaltyProcessor
+from core.royalty.batch import collect_input_files, process_batch
 from services.logger import Logger
+from services.settings import Settings
 
 
 class RoyaltyWorker(QThread):
@@ -21,15 +23,19 @@ class RoyaltyWorker(QThread):
     log_updated = Signal(str)
     finished = Signal(bool, str)
     
-    def __init__(self, processor, input_path, output_path):
+    def __init__(self, processor, input_path, output_path, streaming=False):
         super().__init__()
         self.processor = processor
         self.input_path = input_path
         self.output_path = output_path
+        self.streaming = streaming
         
     def run(self):
         try:
-            success, message = self.processor.process_file(
+            # File rất lớn: đọc/ghi theo lô để bộ nhớ không tăng theo số dòng
+            process = (self.processor.process_file_streaming if self.streaming
+                       else self.processor.process_file)
+            success, message = process(
                 self.input_path,
                 self.output_path,
                 progress_callback=self.progress_updated.emit,
@@ -40,13 +46,45 @@ class RoyaltyWorker(QThread):
             self.finished.emit(False, f"Lỗi không xác định: {str(e)}")
 
 
+class RoyaltyBatchWorker(QThread):
+    """Worker thread cho xử lý nhuận bút hàng loạt (nhiều process)"""
+    
+    progress_updated = Signal(float)
+    log_updated = Signal(str)
+    finished = Signal(bool, str)
+    
+    def __init__(self, royalty_dict, input_paths, hyperlink_mode, aliases=None):
+        super().__init__()
+        self.royalty_dict = royalty_dict
+        self.input_paths = input_paths
+        self.hyperlink_mode = hyperlink_mode
+        self.aliases = aliases
+        
+    def run(self):
+        try:
+            success, message, _ = process_batch(
+                self.royalty_dict,
+                self.input_paths,
+                hyperlink_mode=self.hyperlink_mode,
+                progress_callback=self.progress_updated.emit,
+                log_callback=self.log_updated.emit,
+                aliases=self.aliases
+            )
+            self.finished.emit(success, message)
+        except Exception as e:
+            self.finished.emit(False, f"Lỗi không xác định: {str(e)}")
+
+
 class RoyaltyTab(QWidget):
     """Tab tính nhuận bút"""
     
-    def __init__(self, logger: Logger):
+    def __init__(self, logger: Logger, settings: Settings = None):
         super().__init__()
         self.logger = logger
+        self.settings = settings
         self.input_file_path = None
+        self.input_file_paths = []
+        self.input_row_count = 0
         self.processor = None
         self.worker = None
         
@@ -148,9 +186,19 @@ class RoyaltyTab(QWidget):
         group = QGroupBox("📁 Chọn file Excel")
         layout = QVBoxLayout(group)
         
+        buttons_layout = QHBoxLayout()
+        
         self.select_file_btn = QPushButton("📂 Chọn file Excel")
+        self.select_file_btn.setToolTip("Chọn nhiều file để xử lý hàng loạt")
         self.select_file_btn.clicked.connect(self.select_file)
-        layout.addWidget(self.select_file_btn)
+        buttons_layout.addWidget(self.select_file_btn)
+        
+        self.select_folder_btn = QPushButton("🗂️ Chọn thư mục")
+        self.select_folder_btn.setToolTip("Xử lý hàng loạt tất cả file Excel trong thư mục")
+        self.select_folder_btn.clicked.connect(self.select_folder)
+        buttons_layout.addWidget(self.select_folder_btn)
+        
+        layout.addLayout(buttons_layout)
         
         self.file_label = QLabel("Chưa chọn file")
         self.file_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
@@ -241,13 +289,18 @@ class RoyaltyTab(QWidget):
         
     def select_file(self):
         """Chọn file Excel"""
-        file_path, _ = QFileDialog.getOpenFileName(
+        file_paths, _ = QFileDialog.getOpenFileNames(
             self,
             "Chọn file Excel",
             "",
             "Excel Files (*.xlsx *.xls)"
         )
         
+        if len(file_paths) > 1:
+            self._set_batch_files(collect_input_files(file_paths))
+            return
+            
+        file_path = file_paths[0] if file_paths else None
         if file_path:
             # Kiểm tra file có tồn tại và đọc được không
             try:
@@ -255,18 +308,22 @@ class RoyaltyTab(QWidget):
                 test_df = pd.read_excel(file_path, nrows=1)
                 
                 self.input_file_path = file_path
+                self.input_file_paths = []
                 self.file_label.setText(f"✅ Đã chọn: {Path(file_path).name}")
                 self.file_label.setStyleSheet("font-weight: 700; padding: 8px; color: rgba(34, 197, 94, 0.9);")
                 self.process_btn.setEnabled(True)
                 self.add_log(f"📂 Đã chọn file: {Path(file_path).name}")
                 
-                # Hiển thị thông tin file
-                full_df = pd.read_excel(file_path)
-                self.add_log(f"📊 File chứa {len(full_df)} dòng dữ liệu")
+                # Hiển thị thông tin file (đọc header và số dòng, không nạp cả file)
+                row_count, columns = RoyaltyProcessor.inspect_file(file_path)
+                self.input_row_count = row_count
+                self.add_log(f"📊 File chứa {row_count} dòng dữ liệu")
+                if row_count >= STREAMING_ROW_THRESHOLD:
+                    self.add_log("⚡ File lớn: sẽ xử lý theo lô để tiết kiệm bộ nhớ")
                 
                 # Kiểm tra các cột cần thiết
                 required_cols = ['Hình thức sử dụng', 'Thời lượng']
-                missing_cols = [col for col in required_cols if col not in full_df.columns]
+                missing_cols = [col for col in required_cols if col not in columns]
                 
                 if missing_cols:
                     self.add_log(f"⚠️ Cảnh báo: Thiếu cột {', '.join(missing_cols)}")
@@ -281,6 +338,28 @@ class RoyaltyTab(QWidget):
                 )
                 return
             
+    def select_folder(self):
+        """Chọn thư mục để xử lý hàng loạt"""
+        folder = QFileDialog.getExistingDirectory(self, "Chọn thư mục chứa file Excel")
+        if folder:
+            self._set_batch_files(collect_input_files(folder))
+            
+    def _set_batch_files(self, file_paths: list):
+        """Chuyển sang chế độ hàng loạt với danh sách file đã chọn"""
+        if not file_paths:
+            QMessageBox.warning(self, "⚠️ Không có file", "Không tìm thấy file Excel nào để xử lý!")
+            return
+            
+        self.input_file_path = None
+        self.input_file_paths = file_paths
+        self.input_row_count = 0
+        self.file_label.setText(f"✅ Chế độ hàng loạt: {len(file_paths)} file")
+        self.file_label.setStyleSheet("font-weight: 700; padding: 8px; color: rgba(34, 197, 94, 0.9);")
+        self.process_btn.setEnabled(True)
+        self.add_log(f"📚 Đã chọn {len(file_paths)} file để xử lý hàng loạt")
+        for path in file_paths:
+            self.add_log(f"   • {Path(path).name}")
+            
     def _recalculate_rates(self):
         """Tính lại mức nửa bài và gia hạn"""
         half_percent = self.half_percent_spin.value() / 100.0
@@ -301,10 +380,10 @@ class RoyaltyTab(QWidget):
             except (ValueError, TypeError):
                 pass
                     
-    def _collect_royalty_data(self) -> dict:
-        """Thu thập dữ liệu nhuận bút từ form"""
+    def get_royalty_rates(self) -> dict:
+        """Bảng mức nhuận bút đang nhập {loại hình: (đầy đủ, nửa bài, gia hạn)}.
+        Không hiện hộp thoại; số không hợp lệ hoặc chưa nhập mức nào thì raise ValueError."""
         royalty_dict = {}
-        has_valid_data = False
         errors = []
         
         for usage_type, inputs in self.rate_inputs.items():
@@ -314,24 +393,25 @@ class RoyaltyTab(QWidget):
                 renew_rate = int(float(inputs['renew'].text().replace(',', '') or 0))
                 
                 royalty_dict[usage_type] = (full_rate, half_rate, renew_rate)
-                
-                if full_rate > 0:
-                    has_valid_data = True
                     
             except (ValueError, TypeError) as e:
                 errors.append(f"• {usage_type.title()}: {e}")
                 
         if errors:
-            error_msg = "❌ Lỗi nhập liệu:\n\n" + "\n".join(errors) + "\n\nVui lòng kiểm tra và nhập lại các giá trị hợp lệ."
-            QMessageBox.warning(self, "Lỗi dữ liệu", error_msg)
-            return None
+            raise ValueError("❌ Lỗi nhập liệu:\n\n" + "\n".join(errors) + "\n\nVui lòng kiểm tra và nhập lại các giá trị hợp lệ.")
                 
-        if not has_valid_data:
-            QMessageBox.warning(
-                self, 
-                "Thiếu dữ liệu", 
+        if not any(rates[0] > 0 for rates in royalty_dict.values()):
+            raise ValueError(
                 "⚠️ Vui lòng nhập ít nhất một mức nhuận bút!\n\nHướng dẫn:\n• Nhập mức nhuận bút đầy đủ cho các loại hình cần tính\n• Hệ thống sẽ tự động tính mức nửa bài và gia hạn"
             )
+        return royalty_dict
+        
+    def _collect_royalty_data(self) -> dict:
+        """Thu thập dữ liệu nhuận bút từ form"""
+        try:
+            royalty_dict = self.get_royalty_rates()
+        except ValueError as e:
+            QMessageBox.warning(self, "Lỗi dữ liệu", str(e))
             return None
             
         valid_types = [k for k, v in royalty_dict.items() if v[0] > 0]
@@ -340,6 +420,10 @@ class RoyaltyTab(QWidget):
         
     def process_file(self):
         """Xử lý file Excel"""
+        if self.input_file_paths:
+            self.process_batch()
+            return
+            
         if not self.input_file_path:
             QMessageBox.warning(
                 self, 
@@ -369,8 +453,13 @@ class RoyaltyTab(QWidget):
         self.progress_label.setText("Đang xử lý...")
         
         # Create processor and worker
-        self.processor = RoyaltyProcessor(royalty_dict)
-        self.worker = RoyaltyWorker(self.processor, self.input_file_path, str(output_path))
+        hyperlink_mode = getattr(self.settings, 'hyperlink_mode', 'relationship')
+        self.processor = RoyaltyProcessor(
+            royalty_dict, hyperlink_mode=hyperlink_mode,
+            aliases=getattr(self.settings, 'usage_aliases', None))
+        self.worker = RoyaltyWorker(
+            self.processor, self.input_file_path, str(output_path),
+            streaming=self.input_row_count >= STREAMING_ROW_THRESHOLD)
         
         # Connect signals
         self.worker.progress_updated.connect(self._update_progress)
@@ -380,6 +469,31 @@ class RoyaltyTab(QWidget):
         # Start processing
         self.worker.start()
         
+    def process_batch(self):
+        """Xử lý hàng loạt nhiều file với cùng bảng mức nhuận bút"""
+        royalty_dict = self._collect_royalty_data()
+        if not royalty_dict:
+            return
+            
+        self.add_log(f"🚀 Bắt đầu xử lý hàng loạt {len(self.input_file_paths)} file...")
+        
+        # Disable UI during processing
+        self.process_btn.setEnabled(False)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(0)
+        self.progress_label.setText("Đang xử lý...")
+        
+        hyperlink_mode = getattr(self.settings, 'hyperlink_mode', 'relationship')
+        self.worker = RoyaltyBatchWorker(
+            royalty_dict, self.input_file_paths, hyperlink_mode,
+            aliases=getattr(self.settings, 'usage_aliases', None))
+        
+        self.worker.progress_updated.connect(self._update_progress)
+        self.worker.log_updated.connect(self.add_log)
+        self.worker.finished.connect(self._on_processing_finished)
+        
+        self.worker.start()
+        
     def _update_progress(self, value: float):
         """Cập nhật tiến trình"""
         self.progress_bar.setValue(int(value))
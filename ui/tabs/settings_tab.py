@@ -167,6 +167,17 @@ class SettingsTab(QWidget):
         self.default_ext_spin.setSuffix(" năm")
         layout.addRow("Thời hạn gia hạn mặc định:", self.default_ext_spin)
         
+        # Hyperlink mode
+        self.hyperlink_mode_combo = QComboBox()
+        self.hyperlink_mode_combo.setMinimumWidth(150)
+        self.hyperlink_mode_combo.addItem("🔗 Hyperlink Excel", "relationship")
+        self.hyperlink_mode_combo.addItem("⚡ Công thức HYPERLINK()", "formula")
+        self.hyperlink_mode_combo.addItem("📄 Chỉ văn bản", "text")
+        self.hyperlink_mode_combo.setToolTip(
+            "Cách tạo link cho cột ID Video / Link YouTube Timestamp.\n"
+            "Công thức hoặc văn bản giúp lưu/mở file lớn nhanh hơn nhiều.")
+        layout.addRow("Kiểu link YouTube:", self.hyperlink_mode_combo)
+        
         return group
         
     def _create_advanced_group(self) -> QGroupBox:
@@ -265,6 +276,11 @@ class SettingsTab(QWidget):
         else:
             self.auto_proper_cb.setChecked(True)
             
+        # Hyperlink mode
+        mode_index = self.hyperlink_mode_combo.findData(
+            getattr(self.settings, 'hyperlink_mode', 'relationship'))
+        self.hyperlink_mode_combo.setCurrentIndex(max(mode_index, 0))
+            
     def _on_theme_changed(self, theme_text):
         """Xử lý khi thay đổi theme"""
         if "🌞" in theme_text or "Sáng" in theme_text:
@@ -303,6 +319,7 @@ class SettingsTab(QWidget):
             
             # Update other settings
             self.settings.auto_propercase = self.auto_proper_cb.isChecked()
+            self.settings.hyperlink_mode = self.hyperlink_mode_combo.currentData()
             
             # Apply theme to main window
             if hasattr(self.main_window, '_apply_theme'):
@@ -336,6 +353,7 @@ class SettingsTab(QWidget):
             self.max_preview_spin.setValue(50)
             self.log_level_combo.setCurrentText("INFO")
             self.multithread_cb.setChecked(True)
+            self.hyperlink_mode_combo.setCurrentIndex(0)
             self.ui_scale_slider.setValue(100)
             
             QMessageBox.information(self, "Thành công", "Đã khôi phục cài đặt mặc định!")
@@ -380,6 +398,7 @@ class SettingsTab(QWidget):
                     "max_preview_rows": self.max_preview_spin.value(),
                     "log_level": self.log_level_combo.currentText(),
                     "multithread": self.multithread_cb.isChecked(),
+                    "hyperlink_mode": self.hyperlink_mode_combo.currentData(),
                     "ui_scale": self.ui_scale_slider.value()
                 }
                 
@@ -426,6 +445,9 @@ class SettingsTab(QWidget):
                     self.log_level_combo.setCurrentText(settings_data["log_level"])
                 if "multithread" in settings_data:
                     self.multithread_cb.setChecked(settings_data["multithread"])
+                if "hyperlink_mode" in settings_data:
+                    mode_index = self.hyperlink_mode_combo.findData(settings_data["hyperlink_mode"])
+                    self.hyperlink_mode_combo.setCurrentIndex(max(mode_index, 0))
                 if "ui_scale" in settings_data:
                     self.ui_scale_slider.setValue(settings_data["ui_scale"])
                     
@@ -13,12 +13,146 @@ import pandas as pd
 import os
 import sys
 import json
+import queue
 import threading
+import time
+import uuid
 import subprocess
+from collections import deque
 from pathlib import Path
-from typing import Optional, List, Union, Dict
+from typing import Callable, Optional, List, Union, Dict
 
 from services.logger import Logger
+from services import dependency_probe
+
+
+class AIODaemon:
+    """Process `cli_wrapper.py --serve` dùng chung cho mọi AIOWorker: yt-dlp/pandas
+    chỉ import một lần, mỗi thao tác là một lệnh JSON qua stdin, sự kiện trả về
+    qua stdout và được chia cho đúng job. Process thoát khi app đóng (shutdown_shared)
+    hoặc sau một job bị dừng; lần sau get() tự khởi động lại."""
+    
+    _instance = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self, command: List[str]):
+        self.command = command
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        self._jobs: Dict[str, queue.Queue] = {}
+        self._active: Optional[str] = None
+        self._retiring = False  # job bị dừng: daemon sẽ tự thoát
+        self._lock = threading.Lock()
+        self._stderr = deque(maxlen=50)
+        threading.Thread(target=self._read_stdout, daemon=True).start()
+        threading.Thread(target=self._read_stderr, daemon=True).start()
+        
+    @classmethod
+    def get(cls, make_command: Callable[[], List[str]]) -> 'AIODaemon':
+        """Daemon đang chạy; chưa có (hoặc đã thoát) thì khởi động bằng make_command()."""
+        with cls._instance_lock:
+            if cls._instance is None or not cls._instance.alive():
+                cls._instance = cls(make_command())
+            return cls._instance
+            
+    def alive(self) -> bool:
+        return not self._retiring and self.process.poll() is None
+        
+    def has_job(self, job: str) -> bool:
+        with self._lock:
+            return job in self._jobs
+            
+    def submit(self, job: str, argv: List[str]) -> queue.Queue:
+        """Gửi job; trả về queue nhận từng dòng sự kiện, None khi job kết thúc."""
+        lines: queue.Queue = queue.Queue()
+        with self._lock:
+            self._jobs[job] = lines
+            self._active = job
+            self._stderr.clear()
+        self._send({'cmd': 'run', 'job': job, 'argv': argv})
+        return lines
+        
+    def stop(self, job: str):
+        self._send({'cmd': 'stop', 'job': job})
+        
+    @classmethod
+    def shutdown_shared(cls, timeout: float = 5.0):
+        """Tắt daemon dùng chung (gọi khi đóng app)."""
+        with cls._instance_lock:
+            daemon, cls._instance = cls._instance, None
+        if daemon is not None:
+            daemon.shutdown(timeout)
+            
+    def shutdown(self, timeout: float = 5.0):
+        """Gửi exit và đóng stdin: job đang chạy được dừng như nút Dừng, ghi phần
+        đã xong rồi thoát; quá timeout thì kill."""
+        if self.process.poll() is not None:
+            return
+        try:
+            self._send({'cmd': 'exit'})
+            self.process.stdin.close()
+        except (OSError, ValueError):
+            pass
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.kill()
+            
+    def kill(self):
+        AIOWorker._force_stop(self.process)
+        
+    def stderr_tail(self) -> str:
+        return "\n".join(self._stderr)
+        
+    def _send(self, command: dict):
+        with self._lock:
+            self.process.stdin.write(json.dumps(command, ensure_ascii=False) + "\n")
+            self.process.stdin.flush()
+            
+    def _read_stdout(self):
+        for raw in self.process.stdout:
+            line = raw.strip()
+            if not line:
+                continue
+            job, kind = self._active, None
+            if line.startswith('{'):
+                try:
+                    event = json.loads(line)
+                    job, kind = event.get('job') or job, event.get('type')
+                except ValueError:
+                    pass
+                else:
+                    if kind == 'end' and event.get('stopped'):
+                        self._retiring = True
+            if kind in ('ready', 'pong'):
+                continue
+            with self._lock:
+                lines = self._jobs.get(job)
+                if kind == 'end':
+                    self._jobs.pop(job, None)
+                    if self._active == job:
+                        self._active = None
+            if lines is None:
+                continue
+            lines.put(line)
+            if kind == 'end':
+                lines.put(None)
+        # Daemon đã thoát: báo kết thúc cho các job còn chờ
+        with self._lock:
+            pending = list(self._jobs.values())
+            self._jobs.clear()
+        for lines in pending:
+            lines.put(None)
+            
+    def _read_stderr(self):
+        for raw in self.process.stderr:
+            self._stderr.append(raw.rstrip())
 
 
 class AIOWorker(QThread):
@@ -26,14 +160,29 @@ class AIOWorker(QThread):
     
     progress_updated = Signal(int, int)  # done, total
     detail_progress = Signal(dict)  # detail info for downloads
-    log_updated = Signal(str)
+    logs_updated = Signal(list)  # các dòng log gom theo lô
     finished = Signal(bool, str, str)  # success, message, result_path
     
+    # Thời gian chờ process tự dừng (ghi phần kết quả đã có) trước khi buộc kết thúc
+    STOP_GRACE_SECONDS = 10
+    # Gom cập nhật từ subprocess, mỗi khoảng này mới emit signal một lần
+    BATCH_INTERVAL = 0.1
+    
     def __init__(self, operation: str, **kwargs):
         super().__init__()
         self.operation = operation
         self.kwargs = kwargs
         self.process = None
+        self.daemon = None
+        self.job_id = None
+        self.result_path = ''
+        self.error_message = ''
+        self.exit_code = None
+        self._pending_logs: List[str] = []
+        self._pending_progress = None
+        self._items: Dict[str, dict] = {}
+        self._items_changed = False
+        self._last_flush = 0.0
         
     def run(self):
         try:
@@ -43,38 +192,87 @@ class AIOWorker(QThread):
                 self.finished.emit(False, "Không tìm thấy AIO Tool executable", "")
                 return
                 
-            # Chuẩn bị command
-            cmd = self._build_command(aio_path)
-            
-            # Chạy subprocess
-            self.process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                encoding='utf-8'
-            )
-            
-            # Đọc output
-            while True:
-                output = self.process.stdout.readline()
-                if output == '' and self.process.poll() is not None:
-                    break
-                if output:
-                    self._parse_output(output.strip())
-                    
-            # Kiểm tra kết quả
-            return_code = self.process.poll()
-            if return_code == 0:
-                self.finished.emit(True, "Hoàn thành thành công!", self.kwargs.get('output_dir', ''))
+            if os.path.basename(aio_path) == 'cli_wrapper.py':
+                self._run_daemon(aio_path)
             else:
-                error = self.process.stderr.read()
-                self.finished.emit(False, f"Lỗi: {error}", "")
+                self._run_process(aio_path)
                 
         except Exception as e:
             self.finished.emit(False, f"Lỗi subprocess: {str(e)}", "")
             
-    def _find_aio_executable(self) -> Optional[str]:
+    def _run_daemon(self, aio_path: str):
+        """Chạy job trên daemon dùng chung (không tốn thời gian khởi động Python)."""
+        self.daemon = AIODaemon.get(lambda: self._base_command(aio_path) + ['--serve'])
+        self.job_id = uuid.uuid4().hex[:12]
+        self._pump(self.daemon.submit(self.job_id, self._build_args(aio_path)))
+        if self.exit_code == 0:
+            self.finished.emit(True, "Hoàn thành thành công!",
+                               self.result_path or self.kwargs.get('output_dir', ''))
+        elif self.exit_code is None:
+            self.finished.emit(False, f"Lỗi: AIO worker dừng đột ngột\n{self.daemon.stderr_tail()}", "")
+        else:
+            self.finished.emit(False, f"Lỗi: {self.error_message or self.daemon.stderr_tail()}", "")
+            
+    def _run_process(self, aio_path: str):
+        """Chạy một process riêng cho thao tác (executable không có --serve)."""
+        cmd = self._base_command(aio_path) + self._build_args(aio_path)
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,  # kênh gửi lệnh STOP
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        
+        lines: queue.Queue = queue.Queue()
+        
+        def _read(stream):
+            for raw in stream:
+                lines.put(raw)
+            lines.put(None)
+        
+        threading.Thread(target=_read, args=(self.process.stdout,), daemon=True).start()
+        self._pump(lines)
+        self.process.wait()
+                
+        # Kiểm tra kết quả
+        return_code = self.process.poll()
+        if return_code == 0:
+            self.finished.emit(True, "Hoàn thành thành công!",
+                               self.result_path or self.kwargs.get('output_dir', ''))
+        else:
+            error = self.error_message or self.process.stderr.read()
+            self.finished.emit(False, f"Lỗi: {error}", "")
+            
+    def _pump(self, lines: queue.Queue):
+        """Đọc dòng output tới khi gặp None; gom và emit theo lô."""
+        while True:
+            try:
+                output = lines.get(timeout=self.BATCH_INTERVAL)
+            except queue.Empty:
+                self._flush()
+                continue
+            if output is None:
+                break
+            if output.strip():
+                self._parse_output(output.strip())
+            if time.monotonic() - self._last_flush >= self.BATCH_INTERVAL:
+                self._flush()
+        self._flush()
+            
+    @classmethod
+    def prewarm(cls):
+        """Khởi động sẵn daemon để thao tác đầu tiên không phải chờ import."""
+        aio_path = cls._find_aio_executable()
+        if aio_path and os.path.basename(aio_path) == 'cli_wrapper.py':
+            try:
+                AIODaemon.get(lambda: cls._base_command(aio_path) + ['--serve'])
+            except Exception:
+                pass  # lỗi sẽ được báo khi chạy thao tác
+            
+    @staticmethod
+    def _find_aio_executable() -> Optional[str]:
         """Tìm AIO executable"""
         base_dir = Path(__file__).parent.parent.parent
         possible_paths = [
@@ -89,25 +287,27 @@ class AIOWorker(QThread):
                 return str(path)
         return None
         
-    def _build_command(self, aio_path: str) -> List[str]:
-        """Xây dựng command line"""
-        # Kiểm tra dependencies trước
-        check_cmd = [sys.executable, "-c", "import yt_dlp, pandas, openpyxl; print('OK')"]
+    @staticmethod
+    def _base_command(aio_path: str) -> List[str]:
+        """Lệnh chạy AIO executable (chưa có arguments của thao tác)"""
+        # Kiểm tra dependencies trước (có cache, xem services/dependency_probe.py)
         try:
-            result = subprocess.run(check_cmd, capture_output=True, text=True, timeout=10)
-            if result.returncode != 0 or "OK" not in result.stdout:
-                raise Exception("Missing dependencies: yt-dlp, pandas, or openpyxl")
+            probe = dependency_probe.probe()
         except Exception as e:
             raise Exception(f"Dependency check failed: {e}")
+        if not probe.ok:
+            raise Exception(f"Missing dependencies: {', '.join(probe.missing)}")
         
         # Xây dựng command
         if aio_path.endswith('.py'):
-            cmd = [sys.executable, aio_path]
-        else:
-            cmd = [aio_path]
-            
-        # Thêm arguments dựa trên operation
-        cmd.extend(['--operation', self.operation])
+            return [sys.executable, aio_path]
+        return [aio_path]
+        
+    def _build_args(self, aio_path: str) -> List[str]:
+        """Arguments của thao tác"""
+        cmd = ['--operation', self.operation]
+        if os.path.basename(aio_path) == 'cli_wrapper.py':
+            cmd.append('--events')  # giao thức sự kiện NDJSON (v1)
         
         # Xử lý arguments đúng cách
         for key, value in self.kwargs.items():
@@ -125,31 +325,134 @@ class AIOWorker(QThread):
         return cmd
         
     def _parse_output(self, line: str):
-        """Parse output từ subprocess"""
+        """Parse output từ subprocess: sự kiện NDJSON (--events) hoặc dòng PREFIX: cũ.
+        Chỉ cập nhật trạng thái chờ; _flush() mới emit signal."""
         try:
-            if line.startswith('PROGRESS:'):
+            if line.startswith('{'):
+                self._apply_event(json.loads(line))
+            elif line.startswith('PROGRESS:'):
                 # Format: PROGRESS:done,total
                 parts = line.replace('PROGRESS:', '').split(',')
-                done, total = int(parts[0]), int(parts[1])
-                self.progress_updated.emit(done, total)
+                self._pending_progress = (int(parts[0]), int(parts[1]))
             elif line.startswith('LOG:'):
                 # Format: LOG:message
-                message = line.replace('LOG:', '')
-                self.log_updated.emit(message)
+                self._pending_logs.append(line.replace('LOG:', ''))
             elif line.startswith('DETAIL:'):
                 # Format: DETAIL:json_data
-                data_str = line.replace('DETAIL:', '')
-                data = json.loads(data_str)
-                self.detail_progress.emit(data)
+                data = json.loads(line.replace('DETAIL:', ''))
+                self._set_item(str(data.get('id') or data.get('filename') or ''), data)
             else:
                 # Regular log message
-                self.log_updated.emit(line)
+                self._pending_logs.append(line)
         except Exception:
-            self.log_updated.emit(line)
+            self._pending_logs.append(line)
+            
+    def _apply_event(self, event: dict):
+        """Áp dụng một sự kiện của giao thức v1."""
+        if event.get('v') != 1:
+            self._pending_logs.append(f"Giao thức không hỗ trợ: v{event.get('v')}")
+            return
+        kind = event.get('type')
+        if kind == 'start':
+            self.job_id = event.get('job')
+        elif kind == 'log':
+            self._pending_logs.extend(event.get('lines') or [])
+        elif kind == 'progress':
+            self._pending_progress = (int(event['done']), int(event['total']))
+        elif kind == 'detail':
+            for key, data in (event.get('items') or {}).items():
+                self._set_item(key, data)
+        elif kind == 'result':
+            self.result_path = str(event.get('path') or '')
+        elif kind == 'error':
+            self.error_message = str(event.get('message', ''))
+            self._pending_logs.append(f"❌ {self.error_message}")
+        elif kind == 'end':
+            self.exit_code = int(event.get('code', 1))
+            
+    def _set_item(self, key: str, data: dict):
+        if data.get('phase') == 'downloading':
+            self._items[key] = data
+        else:
+            self._items.pop(key, None)
+            self._items[key] = data  # báo trạng thái cuối một lần ở lần flush tới
+        self._items_changed = True
+        
+    def _flush(self):
+        """Emit các cập nhật đã gom: log một lô, tiến trình và chi tiết mới nhất."""
+        self._last_flush = time.monotonic()
+        if self._pending_logs:
+            logs, self._pending_logs = self._pending_logs, []
+            self.logs_updated.emit(logs)
+        if self._pending_progress:
+            done, total = self._pending_progress
+            self._pending_progress = None
+            self.progress_updated.emit(done, total)
+        if self._items_changed:
+            self._items_changed = False
+            self.detail_progress.emit(self._detail_summary())
+            self._items = {k: v for k, v in self._items.items() if v.get('phase') == 'downloading'}
+            
+    def _detail_summary(self) -> dict:
+        """Một lượt tải: giữ nguyên; nhiều lượt song song: gộp % và tốc độ."""
+        active = [d for d in self._items.values() if d.get('phase') == 'downloading']
+        if not active:
+            last = list(self._items.values())[-1] if self._items else {}
+            return {'phase': last.get('phase', 'finished'), 'filename': last.get('filename')}
+        if len(active) == 1:
+            return active[0]
+        downloaded = sum(d.get('downloaded') or 0 for d in active)
+        total = sum(d.get('total') or 0 for d in active)
+        etas = [d.get('eta') for d in active if d.get('eta')]
+        return {'phase': 'downloading', 'percent': downloaded / total if total else None,
+                'downloaded': downloaded, 'total': total,
+                'speed': sum(d.get('speed') or 0 for d in active),
+                'eta': max(etas) if etas else None,
+                'filename': f"{len(active)} video đang tải"}
             
     def stop(self):
-        if self.process:
-            self.process.terminate()
+        """Yêu cầu dừng qua stdin (process ghi phần đã xong rồi thoát);
+        quá STOP_GRACE_SECONDS thì terminate, vẫn còn chạy thì kill."""
+        daemon = self.daemon
+        if daemon is not None:
+            if not daemon.alive() or not daemon.has_job(self.job_id):
+                return
+            try:
+                daemon.stop(self.job_id)
+            except (OSError, ValueError):
+                daemon.kill()
+                return
+            timer = threading.Timer(self.STOP_GRACE_SECONDS, self._force_stop_job, args=(daemon, self.job_id))
+            timer.daemon = True
+            timer.start()
+            return
+        process = self.process
+        if not process or process.poll() is not None:
+            return
+        try:
+            process.stdin.write("STOP\n")
+            process.stdin.flush()
+        except (OSError, ValueError):
+            process.terminate()
+            return
+        timer = threading.Timer(self.STOP_GRACE_SECONDS, self._force_stop, args=(process,))
+        timer.daemon = True
+        timer.start()
+
+    @staticmethod
+    def _force_stop_job(daemon: AIODaemon, job: str):
+        if daemon.has_job(job):
+            daemon.kill()
+            
+    @staticmethod
+    def _force_stop(process):
+        if process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=3)
+        except subprocess.TimeoutExpired:
+            process.kill()
 
 
 class UpdateTab(QWidget):
@@ -293,6 +596,17 @@ class UpdateTab(QWidget):
         self.include_shorts.setChecked(True)
         options_layout.addRow(self.include_shorts)
         
+        self.scraper_incremental = QCheckBox("Chỉ lấy video mới (cập nhật file cũ)")
+        self.scraper_incremental.setToolTip(
+            "Dừng liệt kê khi gặp video đã lấy ở lần chạy trước và gộp video mới vào file kết quả cũ")
+        options_layout.addRow(self.scraper_incremental)
+        
+        self.scraper_fast = QCheckBox("Quét nhanh (ngày xuất bản ước lượng)")
+        self.scraper_fast.setToolTip(
+            "Lấy tên, thời lượng, lượt xem, ngày đăng ngay từ danh sách kênh; "
+            "chỉ video thiếu thông tin mới được lấy chi tiết")
+        options_layout.addRow(self.scraper_fast)
+        
         layout.addWidget(options_group)
         layout.addStretch()
         
@@ -324,9 +638,31 @@ class UpdateTab(QWidget):
         options_group = QGroupBox("⚙️ Tùy chọn")
         options_layout = QFormLayout(options_group)
         
+        self.checker_mode = QComboBox()
+        self.checker_mode.addItem("Đa luồng (thread)", "thread")
+        self.checker_mode.addItem("Bất đồng bộ (asyncio)", "async")
+        self.checker_mode.addItem("Đa tiến trình (process)", "process")
+        self.checker_mode.setToolTip("Checker chủ yếu chờ mạng: thread/asyncio chạy được hàng chục request cùng lúc\n"
+                                     "(asyncio vẫn chạy yt-dlp trong thread pool, tốc độ như thread)\n"
+                                     "Process chạy như thread khi bật giới hạn tốc độ (mặc định)")
+        options_layout.addRow("Chế độ chạy:", self.checker_mode)
+        
+        self.checker_backend = QComboBox()
+        self.checker_backend.addItem("yt-dlp (đầy đủ)", "ytdlp")
+        self.checker_backend.addItem("Innertube (nhanh, lỗi mới dùng yt-dlp)", "innertube")
+        options_layout.addRow("Nguồn dữ liệu:", self.checker_backend)
+        
+        self.checker_force_refresh = QCheckBox("Lấy mới (bỏ qua cache)")
+        self.checker_force_refresh.setToolTip("Mặc định video đã kiểm tra trong 24 giờ qua được lấy từ cache")
+        options_layout.addRow(self.checker_force_refresh)
+        
+        self.checker_resume = QCheckBox("Tiếp tục lần chạy dở")
+        self.checker_resume.setToolTip("Bỏ qua các video đã kiểm tra xong ở lần chạy bị dừng/lỗi trước đó")
+        options_layout.addRow(self.checker_resume)
+        
         self.checker_workers = QSpinBox()
-        self.checker_workers.setRange(1, 8)
-        self.checker_workers.setValue(4)
+        self.checker_workers.setRange(1, 64)
+        self.checker_workers.setValue(16)
         options_layout.addRow("Số luồng:", self.checker_workers)
         
         layout.addWidget(options_group)
@@ -380,15 +716,28 @@ class UpdateTab(QWidget):
         perf_layout = QFormLayout(perf_group)
         
         self.download_workers = QSpinBox()
-        self.download_workers.setRange(1, 4)
+        self.download_workers.setRange(1, 16)
         self.download_workers.setValue(2)
-        perf_layout.addRow("Số luồng tải:", self.download_workers)
+        perf_layout.addRow("Số luồng tải tối đa:", self.download_workers)
         
         self.concurrent_frags = QSpinBox()
         self.concurrent_frags.setRange(1, 16)
         self.concurrent_frags.setValue(8)
         perf_layout.addRow("Mảnh đồng thời:", self.concurrent_frags)
         
+        self.download_bandwidth = QSpinBox()
+        self.download_bandwidth.setRange(0, 1000)
+        self.download_bandwidth.setValue(0)
+        self.download_bandwidth.setSuffix(" MB/s")
+        self.download_bandwidth.setSpecialValueText("Tự dò")
+        perf_layout.addRow("Băng thông tổng:", self.download_bandwidth)
+        
+        self.download_order = QComboBox()
+        self.download_order.addItem("Theo thứ tự đầu vào", "input")
+        self.download_order.addItem("Video ngắn/nhỏ trước", "shortest")
+        self.download_order.addItem("Video dài/lớn trước", "largest")
+        perf_layout.addRow("Thứ tự tải:", self.download_order)
+        
         layout.addWidget(perf_group)
         
         # Advanced settings
@@ -417,6 +766,10 @@ class UpdateTab(QWidget):
         self.use_archive.setChecked(True)
         advanced_layout.addRow(self.use_archive)
         
+        self.download_resume = QCheckBox("Tiếp tục lần tải dở")
+        self.download_resume.setToolTip("Bỏ qua các video đã tải xong theo manifest của lần chạy bị dừng/lỗi trước đó")
+        advanced_layout.addRow(self.download_resume)
+        
         layout.addWidget(advanced_group)
         layout.addStretch()
         
@@ -571,17 +924,10 @@ class UpdateTab(QWidget):
     def _check_dependencies(self) -> bool:
         """Kiểm tra dependencies cần thiết"""
         try:
-            check_cmd = [sys.executable, "-c", "import yt_dlp, pandas, openpyxl"]
-            result = subprocess.run(check_cmd, capture_output=True, text=True, timeout=10)
-            
-            if result.returncode != 0:
-                missing_deps = []
-                if "yt_dlp" in result.stderr:
-                    missing_deps.append("yt-dlp")
-                if "pandas" in result.stderr:
-                    missing_deps.append("pandas")
-                if "openpyxl" in result.stderr:
-                    missing_deps.append("openpyxl")
+            probe = dependency_probe.probe()
+            
+            if not probe.ok:
+                missing_deps = probe.missing
                     
                 QMessageBox.critical(
                     self,
@@ -610,18 +956,24 @@ class UpdateTab(QWidget):
         """Kiểm tra dependencies không đồng bộ"""
         def check():
             try:
-                result = subprocess.run(
-                    [sys.executable, "-c", "import yt_dlp, pandas, openpyxl"],
-                    capture_output=True, text=True, timeout=5
-                )
-                if result.returncode != 0:
+                probe = dependency_probe.probe()
+                if self.logger:
+                    self.logger.info(f"[AIO] Dependencies: {probe.summary()}")
+                if not probe.ok:
                     self.dep_warning.setText(
-                        "⚠️ Thiếu dependencies: yt-dlp, pandas, openpyxl. "
+                        f"⚠️ Thiếu dependencies: {', '.join(probe.missing)}. "
                         "Chạy: pip install -r Update/requirements.txt"
                     )
                     self.dep_warning.setVisible(True)
+                elif probe.slow:
+                    self.dep_warning.setText(
+                        f"⚠️ Import thư viện chậm: {probe.summary()}"
+                    )
+                    self.dep_warning.setVisible(True)
+                    AIOWorker.prewarm()
                 else:
                     self.dep_warning.setVisible(False)
+                    AIOWorker.prewarm()
             except Exception:
                 self.dep_warning.setText("⚠️ Không thể kiểm tra dependencies")
                 self.dep_warning.setVisible(True)
@@ -645,6 +997,10 @@ class UpdateTab(QWidget):
         # Thêm boolean flags
         if self.include_shorts.isChecked():
             kwargs['include_shorts'] = True
+        if self.scraper_incremental.isChecked():
+            kwargs['incremental'] = True
+        if self.scraper_fast.isChecked():
+            kwargs['fast'] = True
         
         self.worker = AIOWorker(operation="scraper", **kwargs)
         self._connect_worker_signals()
@@ -660,7 +1016,11 @@ class UpdateTab(QWidget):
         
         kwargs = {
             'file_path': self.checker_file_input.text(),
-            'max_workers': self.checker_workers.value()
+            'max_workers': self.checker_workers.value(),
+            'mode': self.checker_mode.currentData(),
+            'backend': self.checker_backend.currentData(),
+            'force_refresh': self.checker_force_refresh.isChecked(),
+            'resume': self.checker_resume.isChecked()
         }
         
         self.worker = AIOWorker(operation="checker", **kwargs)
@@ -681,7 +1041,9 @@ class UpdateTab(QWidget):
             'output_dir': self.output_dir,
             'quality': self.quality_combo.currentText(),
             'max_workers': self.download_workers.value(),
-            'concurrent_frags': self.concurrent_frags.value()
+            'concurrent_frags': self.concurrent_frags.value(),
+            'order': self.download_order.currentData(),
+            'resume': self.download_resume.isChecked()
         }
         
         # Thêm optional parameters
@@ -689,6 +1051,8 @@ class UpdateTab(QWidget):
             kwargs['cookies_file'] = self.cookies_input.text().strip()
         if self.proxy_input.text().strip():
             kwargs['proxy'] = self.proxy_input.text().strip()
+        if self.download_bandwidth.value():
+            kwargs['bandwidth'] = self.download_bandwidth.value()
             
         # Thêm boolean flags
         if self.audio_only.isChecked():
@@ -715,7 +1079,7 @@ class UpdateTab(QWidget):
         """Kết nối signals của worker"""
         self.worker.progress_updated.connect(self._update_progress)
         self.worker.detail_progress.connect(self._update_detail_progress)
-        self.worker.log_updated.connect(self.add_log)
+        self.worker.logs_updated.connect(self.add_logs)
         self.worker.finished.connect(self._on_operation_finished)
         
     def _update_progress(self, done: int, total: int):
@@ -788,6 +1152,12 @@ class UpdateTab(QWidget):
             self.worker.stop()
             self.add_log("⏹️ Đang dừng operation...")
             
+    def shutdown(self):
+        """Gọi khi đóng app: dừng operation đang chạy và tắt daemon AIO."""
+        if self.worker and self.worker.isRunning():
+            self.worker.stop()
+        AIODaemon.shutdown_shared()
+            
     def launch_full_tool(self):
         """Mở AIO Tool đầy đủ"""
         try:
@@ -812,6 +1182,22 @@ class UpdateTab(QWidget):
                 f"Không thể mở AIO Tool:\n{str(e)}"
             )
             
+    def add_logs(self, messages: List[str]):
+        """Thêm một lô log (một lần append, một lần cuộn)"""
+        if not messages:
+            return
+        from datetime import datetime
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        self.log_text.append("\n".join(f"[{timestamp}] {m}" for m in messages))
+        
+        if self.logger:
+            for message in messages:
+                self.logger.info(f"[AIO] {message}")
+                
+        cursor = self.log_text.textCursor()
+        cursor.movePosition(cursor.MoveOperation.End)
+        self.log_text.setTextCursor(cursor)
+        
     def add_log(self, message: str):
         """Thêm log với timestamp"""
         from datetime import datetime